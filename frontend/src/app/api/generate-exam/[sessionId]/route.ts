@@ -12,11 +12,17 @@ export async function POST(request: NextRequest) {
     // Forward the request to the backend API
     const backendUrl = `${API_BASE_URL}${API_ENDPOINTS.GENERATE_EXAM(sessionId)}`;
     
+    const headers: Record<string, string> = {
+      'Content-Type': 'application/json',
+    };
+    const idempotencyKey = request.headers.get('Idempotency-Key');
+    if (idempotencyKey) {
+      headers['Idempotency-Key'] = idempotencyKey;
+    }
+
     const response = await fetch(backendUrl, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
+      headers,
       body: JSON.stringify(jsonData),
     });
     
@@ -121,12 +121,16 @@ export default function CreateExam() {
 
             console.log("DEBUG: Sending exam generation request:", requestBody);
 
+            // One key per submission: a retried request attaches to the running generation
+            const idempotencyKey = crypto.randomUUID();
+
             const generateResponse = await fetch(
                 `${API_BASE_URL}${API_ENDPOINTS.GENERATE_EXAM(session_id)}`,
                 {
                     method: "POST",
                     headers: {
                         "Content-Type": "application/json",
+                        "Idempotency-Key": idempotencyKey,
                     },
                     body: JSON.stringify(requestBody),
                 }
@@ -243,40 +243,26 @@ export default function ExamPage() {
             try {
                 setLoading(true);
 
-                // First, get session information to know exam type, difficulty, and passage type
-                const sessionResponse = await fetch(
-                    `${API_BASE_URL}${API_ENDPOINTS.SESSION_INFO(id as string)}`
+                // Get session information and exam data in one request
+                const bundleResponse = await fetch(
+                    `${API_BASE_URL}${API_ENDPOINTS.EXAM_BUNDLE(id as string)}`
                 );
 
-                if (!sessionResponse.ok) {
-                    throw new Error("Failed to fetch session information");
+                if (!bundleResponse.ok) {
+                    throw new Error("Failed to fetch exam data");
                 }
 
-                const sessionData = await sessionResponse.json();
+                const bundle = await bundleResponse.json();
+                const sessionData = bundle.session;
 
                 // Check if session has no result
-                if (!sessionData.has_result) {
+                if (!sessionData.has_result || !bundle.exam) {
                     throw new Error(
                         "Exam result is not available yet. Please generate the exam first."
                     );
                 }
 
-                // Call API /exam-data/{id} to get the created exam data
-                const examResponse = await fetch(
-                    `${API_BASE_URL}${API_ENDPOINTS.EXAM_DATA(id as string)}`,
-                    {
-                        method: "GET",
-                        headers: {
-                            "Content-Type": "application/json",
-                        },
-                    }
-                );
-
-                if (!examResponse.ok) {
-                    throw new Error("Failed to fetch exam data");
-                }
-
-                const responseData = await examResponse.json();
+                const responseData = bundle.exam;
                 const resultData = responseData.result;
 
                 // Auto-detect exam type based on data structure
@@ -10,5 +10,9 @@ export const API_ENDPOINTS = {
     GENERATE_EXAM: (sessionId: string) => `/generate-exam/${sessionId}`,
     EXAM_DATA: (sessionId: string) => `/exam-data/${sessionId}`,
     SESSION_INFO: (sessionId: string) => `/session-info/${sessionId}`,
-    DOWNLOAD_RESULT: (sessionId: string) => `/download-result/${sessionId}`,
+    EXAM_BUNDLE: (sessionId: string) => `/exam-bundle/${sessionId}`,
+    DOWNLOAD_RESULT: (sessionId: string, format?: "html" | "pdf", document: "exam" | "answer_key" = "exam") =>
+        format
+            ? `/download-result/${sessionId}?format=${format}&document=${document}`
+            : `/download-result/${sessionId}`,
 };
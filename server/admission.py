@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Admission control for the expensive API stages.
+
+Each stage (extraction, generation) runs at most ``max_concurrent`` requests
+and lets at most ``max_queue`` more wait for a slot. Beyond that, requests
+are rejected at once with 429 and a Retry-After estimated from the stage's
+recent service time, so a spike is served at full speed up to capacity
+instead of slowing every request down until they all time out.
+"""
+import os
+import math
+import time
+import asyncio
+import functools
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Dict, Any, Iterator
+
+from fastapi import HTTPException
+
+from metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED
+
+
+class Overloaded(Exception):
+    """The stage's queue is full or the wait for a slot timed out."""
+
+    def __init__(self, stage: str, reason: str, retry_after: int):
+        super().__init__(f"{stage} is overloaded ({reason}), retry after {retry_after}s")
+        self.stage = stage
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded wait queue for one stage.
+
+    Only used from the event loop, so the counters need no lock.
+
+    Args:
+        stage: Stage name for metrics and errors
+        max_concurrent: Requests processed at the same time
+        max_queue: Requests allowed to wait for a slot
+        max_wait: Seconds a request may wait before it is rejected
+        service_seconds: Initial estimate of the time one request takes
+    """
+
+    def __init__(self, stage: str, max_concurrent: int, max_queue: int, max_wait: float, service_seconds: float):
+        self.stage = stage
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.service_seconds = service_seconds
+        self.running = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._semaphore = None
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: the work ahead of a new request spread over the slots."""
+        ahead = max(0, self.running + self.queued - self.max_concurrent) + 1
+        return max(1, math.ceil(self.service_seconds * ahead / self.max_concurrent))
+
+    def _reject(self, reason: str) -> Overloaded:
+        self.rejected += 1
+        ADMISSION_REJECTED.labels(self.stage, reason).inc()
+        return Overloaded(self.stage, reason, self.retry_after())
+
+    async def acquire(self) -> None:
+        if self._semaphore is None:
+            # Created lazily so it belongs to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        if self.running + self.queued >= self.max_concurrent + self.max_queue:
+            raise self._reject("queue_full")
+
+        self.queued += 1
+        ADMISSION_QUEUE_DEPTH.labels(self.stage).set(self.queued)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            raise self._reject("wait_timeout")
+        finally:
+            self.queued -= 1
+            ADMISSION_QUEUE_DEPTH.labels(self.stage).set(self.queued)
+        self.running += 1
+        self.admitted += 1
+
+    def release(self, seconds: float) -> None:
+        self.running -= 1
+        # Exponential moving average of the service time, for Retry-After
+        self.service_seconds = 0.8 * self.service_seconds + 0.2 * seconds
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block; raises Overloaded instead of waiting forever."""
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "service_seconds": round(self.service_seconds, 2),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "retry_after": self.retry_after(),
+        }
+
+
+def _controller_from_env(stage: str, max_concurrent: int, max_queue: int, service_seconds: float) -> AdmissionController:
+    prefix = f"ADMISSION_{stage.upper()}"
+    return AdmissionController(
+        stage,
+        max_concurrent=int(os.getenv(f"{prefix}_CONCURRENCY", str(max_concurrent))),
+        max_queue=int(os.getenv(f"{prefix}_QUEUE", str(max_queue))),
+        max_wait=float(os.getenv("ADMISSION_MAX_WAIT", "60")),
+        service_seconds=service_seconds,
+    )
+
+
+controllers: Dict[str, AdmissionController] = {
+    "extract": _controller_from_env("extract", max_concurrent=4, max_queue=16, service_seconds=20.0),
+    "generate": _controller_from_env("generate", max_concurrent=8, max_queue=32, service_seconds=60.0),
+}
+
+
+def admission_report() -> Dict[str, Dict[str, Any]]:
+    return {stage: controller.snapshot() for stage, controller in controllers.items()}
+
+
+@asynccontextmanager
+async def admission_slot(stage: str) -> AsyncIterator[None]:
+    """
+    Hold a slot of ``stage`` for the block, or raise HTTPException 429 with Retry-After.
+
+    The block should run its blocking work in a thread pool, otherwise it
+    holds the event loop and requests cannot even queue.
+    """
+    try:
+        async with controllers[stage].slot():
+            yield
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Server is busy, retry in {e.retry_after} seconds",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+@contextmanager
+def thread_slot(stage: str, loop: asyncio.AbstractEventLoop) -> Iterator[None]:
+    """
+    Hold a slot of ``stage`` from a worker thread, for background work that
+    outlives the request that admitted it (e.g. progressive extraction).
+
+    The controller lives on the event loop, so the slot is acquired and
+    released there. Background work is not rejected: while the stage is
+    overloaded it waits Retry-After seconds and tries again.
+    """
+    controller = controllers[stage]
+    while True:
+        try:
+            asyncio.run_coroutine_threadsafe(controller.acquire(), loop).result()
+            break
+        except Overloaded as e:
+            time.sleep(e.retry_after)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        loop.call_soon_threadsafe(controller.release, time.perf_counter() - start)
+
+
+def admit(stage: str) -> Callable:
+    """Decorator form of admission_slot for async endpoints."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with admission_slot(stage):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
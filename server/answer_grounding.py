@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Local check that generated answers are grounded in their passage.
+
+The exam rules only count questions and words, so a completion answer that
+never occurs in the passage, or a True/False statement about something the
+passage does not mention, goes unnoticed. Asking the model to judge its own
+exam would double the generation latency; instead each passage is indexed
+once (sentences, word n-grams, vocabulary) and every answer is looked up in
+it, which takes a few milliseconds per exam. Only the suspect questions are
+then sent to a targeted review (see exam_repair.py).
+"""
+import re
+import time
+import difflib
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+
+# Question types whose answer has to be copied from the passage
+COMPLETION_KEYWORDS = ("completion", "short answer", "short-answer", "fill", "gap")
+
+# Question types whose answer is a verdict on a statement
+VERDICT_KEYWORDS = ("true/false", "true / false", "yes/no", "yes / no", "not given")
+VERDICTS = {
+    "true": "true", "t": "true", "yes": "true", "y": "true",
+    "false": "false", "f": "false", "no": "false", "n": "false",
+    "not given": "not_given", "ng": "not_given", "notgiven": "not_given",
+}
+
+# Share of a statement's content words that two neighbouring sentences must
+# contain for a True/False statement to refer to them (statements paraphrase
+# and often combine adjacent sentences), and that one sentence must reach for
+# a Not Given statement to be suspiciously stated in the passage after all
+MIN_STATEMENT_OVERLAP = 0.5
+MAX_NOT_GIVEN_OVERLAP = 0.9
+
+# Words sharing this many leading letters count as the same word in statements
+STEM_LENGTH = 6
+
+# Similarity for a word to count as a misspelling of a passage word
+FUZZY_CUTOFF = 0.8
+
+STOPWORDS = frozenset(
+    "a an the and or but if of to in on at by for with from as into about than then that this these those "
+    "is are was were be been being has have had do does did can could will would shall should may might must "
+    "it its they them their there which who whom whose what when where why how not no only also very more most "
+    "some any all each such other".split()
+)
+
+_WORD = re.compile(r"[a-z0-9]+(?:['’-][a-z0-9]+)*")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def normalize_word(word: str) -> str:
+    """Lowercase word without a plural/possessive ending, so 'networks' matches 'network'."""
+    word = word.lower().replace("’", "'")
+    if word.endswith("'s"):
+        word = word[:-2]
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("sses", "xes", "ches", "shes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [normalize_word(w) for w in _WORD.findall(text.lower())]
+
+
+def content_words(text: str) -> Set[str]:
+    """Stems of the words that carry meaning; the prefix also joins 'expensive' and 'expense'."""
+    return {w[:STEM_LENGTH] for w in tokenize(text) if w not in STOPWORDS}
+
+
+class PassageIndex:
+    """
+    Sentences, word n-grams and vocabulary of one passage.
+
+    Args:
+        text: Passage content (Markdown)
+    """
+
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.vocabulary = set(self.tokens)
+        self.sentences = [s for s in (_SENTENCE_BREAK.split(text)) if s.strip()]
+        self.sentence_words = [content_words(s) for s in self.sentences]
+        self._ngrams: Dict[int, Set[Tuple[str, ...]]] = {}
+
+    def _ngram_set(self, n: int) -> Set[Tuple[str, ...]]:
+        if n not in self._ngrams:
+            self._ngrams[n] = {tuple(self.tokens[i:i + n]) for i in range(len(self.tokens) - n + 1)}
+        return self._ngrams[n]
+
+    def _closest(self, word: str) -> Optional[str]:
+        if word in self.vocabulary:
+            return word
+        matches = difflib.get_close_matches(word, self.vocabulary, n=1, cutoff=FUZZY_CUTOFF)
+        return matches[0] if matches else None
+
+    def find_span(self, answer: str) -> Optional[str]:
+        """
+        How the answer occurs in the passage.
+
+        Returns:
+            "exact" for a verbatim span, "fuzzy" for a span with misspelt or
+            inflected words, None if it does not occur
+        """
+        words = tokenize(answer)
+        if not words:
+            return None
+        if tuple(words) in self._ngram_set(len(words)):
+            return "exact"
+        closest = [self._closest(w) for w in words]
+        if None not in closest and tuple(closest) in self._ngram_set(len(closest)):
+            return "fuzzy"
+        return None
+
+    def best_sentence(self, statement: str, window: int = 1) -> Tuple[float, Optional[str]]:
+        """
+        Run of ``window`` consecutive sentences sharing most of the statement's
+        content words, with the shared fraction.
+        """
+        words = content_words(statement)
+        if not words:
+            return 0.0, None
+        best, best_index = 0.0, None
+        for index in range(len(self.sentence_words)):
+            overlap = len(words & set().union(*self.sentence_words[index:index + window])) / len(words)
+            if overlap > best:
+                best, best_index = overlap, index
+        if best_index is None:
+            return 0.0, None
+        return best, " ".join(self.sentences[best_index:best_index + window])
+
+
+def _question_kind(question: Dict[str, Any]) -> Optional[str]:
+    question_type = str(question.get("question_type") or "").lower()
+    if any(keyword in question_type for keyword in VERDICT_KEYWORDS):
+        return "verdict"
+    if any(keyword in question_type for keyword in COMPLETION_KEYWORDS):
+        return "completion"
+    return None
+
+
+def _answer_alternatives(answer: str) -> List[str]:
+    """Accepted variants of a completion answer, e.g. 'tunnel / tunnelling' or 'VPN (virtual private network)'."""
+    answer = re.sub(r"\(.*?\)", "/", answer)
+    parts = re.split(r"\s*/\s*|\s+or\s+|;", answer.strip().strip("\"'“”"))
+    return [p.strip(" .,\"'“”") for p in parts if p.strip(" .,\"'“”")]
+
+
+def _check_option(question: Dict[str, Any]) -> Optional[str]:
+    """Letter answers must name one of the options."""
+    options = question.get("options")
+    answer = str(question.get("correct_answer") or "").strip().rstrip(".")
+    if not options or not re.fullmatch(r"[A-Za-z]", answer):
+        return None
+    letters = set()
+    for index, option in enumerate(options):
+        match = re.match(r"\s*([A-Za-z])[.)]\s", str(option))
+        letters.add(match.group(1).upper() if match else chr(ord("A") + index))
+    if answer.upper() not in letters:
+        return f"Answer {answer} is not one of the options ({', '.join(sorted(letters))})"
+    return None
+
+
+def _check_completion(question: Dict[str, Any], index: PassageIndex) -> Optional[str]:
+    answer = str(question.get("correct_answer") or "")
+    if question.get("options") and re.fullmatch(r"\s*[A-Za-z]\s*", answer):
+        return None  # completion from a word list, the option check covers it
+    alternatives = _answer_alternatives(answer)
+    if not alternatives:
+        return "Answer is empty"
+    if any(index.find_span(alternative) for alternative in alternatives):
+        return None
+    return f"Answer '{answer}' does not occur in the passage"
+
+
+def _check_verdict(question: Dict[str, Any], index: PassageIndex) -> Optional[str]:
+    answer = str(question.get("correct_answer") or "").strip().strip(".").lower()
+    verdict = VERDICTS.get(answer)
+    if verdict is None:
+        return f"Answer '{question.get('correct_answer')}' is not True/False/Not Given or Yes/No/Not Given"
+    statement = str(question.get("question_text") or "")
+    if verdict == "not_given":
+        overlap, sentence = index.best_sentence(statement)
+        if overlap >= MAX_NOT_GIVEN_OVERLAP:
+            return f"Answer is Not Given but the passage states it: \"{sentence.strip()[:160]}\""
+        return None
+    overlap, _ = index.best_sentence(statement, window=2)
+    if overlap < MIN_STATEMENT_OVERLAP:
+        return f"Statement does not refer to any part of the passage (best overlap {overlap:.0%})"
+    return None
+
+
+def _passage_indexes(result: Dict[str, Any]) -> Dict[str, PassageIndex]:
+    passages = result.get("reading_passages")
+    if passages is None and isinstance(result.get("reading_passage"), dict):
+        passages = [result["reading_passage"]]
+    indexes = {}
+    for position, passage in enumerate(passages or [], start=1):
+        if isinstance(passage, dict) and isinstance(passage.get("content"), str):
+            indexes[str(passage.get("passage_number", position))] = PassageIndex(passage["content"])
+    return indexes
+
+
+def verify_answers(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Check every question's answer against the passage it refers to.
+
+    Args:
+        result: Parsed exam result with reading_passages and questions
+
+    Returns:
+        Report with ``checked`` (questions with a checkable answer), ``suspects``
+        (question_index, question_number, passage_number, check, reason) and ``seconds``
+    """
+    start = time.perf_counter()
+    indexes = _passage_indexes(result)
+    checked, suspects = 0, []
+    for question_index, question in enumerate(result.get("questions") or []):
+        if not isinstance(question, dict):
+            continue
+        passage_number = str(question.get("passage_reference"))
+        # A single passage is what every question refers to, whatever its number says
+        index = indexes.get(passage_number) or (next(iter(indexes.values())) if len(indexes) == 1 else None)
+
+        checks = [("option", _check_option(question))]
+        kind = _question_kind(question)
+        if index is not None and kind == "completion":
+            checks.append((kind, _check_completion(question, index)))
+        elif index is not None and kind == "verdict":
+            checks.append((kind, _check_verdict(question, index)))
+        if kind or question.get("options"):
+            checked += 1
+
+        for check, reason in checks:
+            if reason:
+                suspects.append({
+                    "question_index": question_index,
+                    "question_number": question.get("question_number"),
+                    "passage_number": question.get("passage_reference"),
+                    "check": check,
+                    "reason": reason,
+                })
+                break
+    return {"checked": checked, "suspects": suspects, "seconds": round(time.perf_counter() - start, 4)}
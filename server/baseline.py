@@ -3,9 +3,21 @@ import os
 import sys
 import json
 import argparse
-from typing import Dict, Any, Optional, Union, List
-from pdf_extractor import PDFExtractor
+import functools
+import threading
+from typing import Callable, ContextManager, Dict, Any, Optional, Union, List, Tuple
+from pdf_extractor import PDFExtractor, count_pdf_pages
+from pdf_prescan import prescan_pdf, choose_route
+from progressive_extraction import ProgressiveExtraction
 from llm import LLM
+from usage_ledger import BudgetExceededError
+from exam_validator import load_schema, validate_exam
+from exam_repair import plan_repairs, build_repair_prompt, apply_repair, finalize_questions
+from metrics import observe_stage, PRUNED_CHARS
+from storage_sweeper import atomic_write
+from markdown_pruner import policy_from_env, prune_markdown
+from condenser import DEFAULT_CACHE_DIR, SectionCache, condense_document
+from question_bank import get_bank, paper_hash
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -21,6 +33,17 @@ class ExamRequest(BaseModel):
     difficulty: str
     passage_type: str
     output_format: str = "json"
+    repair: bool = False
+    wait_for_extraction: bool = False
+
+
+def _serialized(method):
+    """Run a PaperToExam method under the instance's generation_lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.generation_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class PaperToExam:   
@@ -35,6 +58,18 @@ class PaperToExam:
             system_prompt_file=system_prompt_file, api_key=api_key
         )
         self.markdown_content = None
+        self.markdown_path = None
+        self.pruning_report = None
+        self.condensation = None
+        self.extraction = None
+        self.last_validation = None
+        # Where the last result came from: llm, bank (assembled from the question bank) or repair
+        self.last_source = None
+        self.paper_hash = None
+        # Every saved JSON result is added to the question bank
+        self.question_bank = get_bank() if os.getenv("QUESTION_BANK", "true").lower() == "true" else None
+        # Generations, repairs and result writes of one instance run one at a time
+        self.generation_lock = threading.RLock()
 
         if output_dir:
             self.output_dir = output_dir
@@ -46,31 +81,168 @@ class PaperToExam:
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
 
-    def extract_pdf(self, pdf_path: str) -> str:
+    def extract_pdf(
+        self,
+        pdf_path: str,
+        page_range: Optional[Tuple[int, int]] = None,
+        max_pages: Optional[int] = None,
+    ) -> str:
+        """
+        Extract the PDF to markdown.
+
+        Args:
+            pdf_path: Local path or URL of the PDF
+            page_range: Only extract these pages, (first, last), 1-based; last = 0 means to the end
+            max_pages: Extract at most this many pages
+
+        Returns:
+            Extracted markdown (after pruning)
+        """
         print(f"Extracting content from PDF: {pdf_path}")
+        self.paper_hash = paper_hash(pdf_path)
         md_filename = os.path.basename(pdf_path).replace(".pdf", ".md")
         md_path = os.path.join(self.output_dir, md_filename)
+        self.pdf_extractor.set_page_range(page_range, max_pages)
         output_path = self.pdf_extractor.process(
             pdf_path, output_path=md_path, clean_images=True
         )
-        self.markdown_content = open(output_path, "r", encoding="utf-8").read()
+        self.markdown_path = output_path
+        self.extraction = None
+        self._prune_markdown(open(output_path, "r", encoding="utf-8").read())
+        self.condensation = None
         word_count = self.count_words(self.markdown_content)
         print(
             f"Extraction successful: {word_count} words, {len(self.markdown_content)} characters"
         )
         return self.markdown_content
 
+    def extract_pdf_progressive(
+        self,
+        pdf_path: str,
+        page_range: Optional[Tuple[int, int]] = None,
+        max_pages: Optional[int] = None,
+        ready_words: int = 2500,
+        batch_pages: int = 10,
+        batch_slot: Optional[Callable[[], ContextManager]] = None,
+    ) -> str:
+        """
+        Extract the PDF in page batches and return as soon as ``ready_words`` words are available.
+
+        The remaining pages keep extracting in the background and extend
+        ``markdown_content`` as they arrive; ``extraction`` reports progress and
+        wait_for_extraction() blocks until the whole range is done. Falls back to
+        extract_pdf when the page count cannot be read (URL or no PDF library).
+        ``batch_slot`` is held around each batch converted in the background.
+
+        Returns:
+            Markdown extracted so far (after pruning)
+        """
+        total = None if pdf_path.startswith(("http://", "https://")) else count_pdf_pages(pdf_path)
+        if total is None:
+            print("Progressive extraction needs a local PDF and a PDF library, extracting in one pass")
+            return self.extract_pdf(pdf_path, page_range, max_pages)
+
+        print(f"Extracting content from PDF progressively: {pdf_path}")
+        self.paper_hash = paper_hash(pdf_path)
+        md_path = os.path.join(self.output_dir, os.path.basename(pdf_path).replace(".pdf", ".md"))
+        self.pdf_extractor.set_page_range(page_range, max_pages)
+        pages = self.pdf_extractor._resolve_pages(total) or (1, total)
+        self.pdf_extractor.pages = {"first": pages[0], "last": pages[1], "total": total}
+        if choose_route(prescan_pdf(pdf_path, pages))[0] == "fast":
+            # The text layer is extracted in well under a second, batching would only add overhead
+            print("Born-digital PDF, extracting from the text layer in one pass")
+            return self.extract_pdf(pdf_path, page_range, max_pages)
+
+        def on_update(content: str, complete: bool) -> None:
+            self._prune_markdown(content, record_metrics=complete)
+            self.condensation = None
+            if complete:
+                atomic_write(md_path, content)
+                self.markdown_path = md_path
+
+        self.extraction = ProgressiveExtraction(
+            pdf_path,
+            pages,
+            on_update,
+            docling_pool=self.pdf_extractor.docling_pool,
+            batch_pages=batch_pages,
+            ready_words=ready_words,
+            batch_slot=batch_slot,
+        ).start()
+        self.extraction.ready.wait()
+
+        if not self.markdown_content:
+            raise RuntimeError(f"Cannot extract content from PDF: {self.extraction.error}")
+        print(
+            f"Extraction ready: {self.count_words(self.markdown_content)} words from "
+            f"{self.extraction.pages_done}/{pages[1] - pages[0] + 1} pages, continuing in background"
+        )
+        return self.markdown_content
+
+    def wait_for_extraction(self, timeout: Optional[float] = None) -> bool:
+        """Block until a progressive extraction has finished; False on timeout."""
+        if self.extraction is None:
+            return True
+        return self.extraction.done.wait(timeout)
+
+    def _prune_markdown(self, content: str, record_metrics: bool = True) -> None:
+        """
+        Set markdown_content to ``content`` without references, equations, image
+        placeholders etc. per MARKDOWN_PRUNE_DROP; the saved .md stays complete.
+        """
+        drop = policy_from_env()
+        if drop is None:
+            self.markdown_content, self.pruning_report = content, None
+            return
+
+        with observe_stage("markdown_pruning"):
+            self.markdown_content, self.pruning_report = prune_markdown(content, drop)
+        if not record_metrics:
+            return
+        for category, stats in self.pruning_report["categories"].items():
+            if stats["dropped"]:
+                PRUNED_CHARS.labels(category).inc(stats["chars"])
+        print(
+            f"Pruned markdown: {self.pruning_report['words_before']} -> {self.pruning_report['words_after']} words "
+            f"({self.pruning_report['saved_ratio']:.0%} of characters removed)"
+        )
+
+    def _get_prompt_source(self) -> str:
+        """
+        Content the exam is generated from.
+
+        Documents longer than CONDENSE_THRESHOLD_WORDS are condensed section by
+        section first (see condenser.py); the digest is computed once and reused.
+        """
+        threshold = int(os.getenv("CONDENSE_THRESHOLD_WORDS", "20000"))
+        if threshold <= 0 or self.count_words(self.markdown_content) <= threshold:
+            return self.markdown_content
+
+        if self.condensation is None:
+            self.condensation = condense_document(
+                self.markdown_content,
+                invoke=lambda prompt: self.llm.invoke(prompt, use_system_prompt=False, job="condense"),
+                model=self.llm.model_name,
+                digest_words=int(os.getenv("CONDENSE_DIGEST_WORDS", "6000")),
+                concurrency=int(os.getenv("CONDENSE_CONCURRENCY", "4")),
+                cache=SectionCache(os.getenv("CONDENSE_CACHE_DIR", DEFAULT_CACHE_DIR)),
+            )
+        return self.condensation["content"]
+
     def count_words(self, text: str) -> int:
         words = text.split()
         return len(words)
 
+    @_serialized
     def generate_exam(
         self,
         exam_type: str,
         difficulty: str,
         passage_type: str,
         output_format: str = "json",
-        output_filename: Optional[str] = None
+        output_filename: Optional[str] = None,
+        repair: bool = False,
+        from_bank: bool = False,
     ) -> Union[Dict[str, Any], str]:
         """
         Create IELTS Reading exam from PDF content.
@@ -81,6 +253,9 @@ class PaperToExam:
             passage_type: Passage type (1, 2, 3)
             output_format: Output format (json, text)
             output_filename: Output filename (without extension)
+            repair: Regenerate only the failing parts if validation fails
+            from_bank: Assemble the exam from the question bank if it has enough
+                matching material, and only call the LLM otherwise
 
         Returns:
             Exam result
@@ -94,6 +269,29 @@ class PaperToExam:
             f"Creating IELTS exam with difficulty {difficulty}, passage type {passage_type}..."
         )
 
+        if from_bank and output_format == "json" and self.question_bank is not None:
+            with observe_stage("bank_assembly"):
+                result = self.question_bank.assemble(
+                    exam_type,
+                    difficulty,
+                    passage_type,
+                    paper=self.paper_hash,
+                    markdown=self.markdown_content,
+                    exclude_source=output_filename,
+                )
+            if result is not None:
+                print("Exam assembled from the question bank")
+                self.last_source = "bank"
+                # Questions flagged by the grounding check are not reused; close the gaps they leave
+                finalize_questions(result, exam_type.upper())
+                self.last_validation = self._validate_result(result, exam_type, passage_type)
+                self._save_result(
+                    result, exam_type, difficulty, passage_type, output_format, output_filename
+                )
+                return result
+            print("Not enough matching material in the question bank, generating with the LLM")
+        self.last_source = "llm"
+
         # Select schema
         schema = self._get_schema(exam_type)
 
@@ -101,15 +299,24 @@ class PaperToExam:
         passage_instruction = self._get_passage_instruction(passage_type)
 
         # Create prompt for LLM
-        prompt = self._create_prompt(exam_type, difficulty, passage_instruction)
+        source = self._get_prompt_source()
+        with observe_stage("prompt_assembly"):
+            prompt = self._create_prompt(exam_type, difficulty, passage_instruction, source)
 
         try:
             # Call LLM to create exam
             if output_format == "json":
-                result = self.llm.invoke_json(prompt, schema=schema)
-                self._validate_result(result, passage_type)
+                result = self.llm.invoke_json(prompt, schema=schema, job="generate")
+                self.last_validation = self._validate_result(result, exam_type, passage_type)
+                if repair and (
+                    not self.last_validation["valid"] or self.last_validation["stats"].get("grounding_suspects")
+                ):
+                    result = self.repair_exam(
+                        result, exam_type, difficulty, passage_type, report=self.last_validation
+                    )
             else:
-                result = self.llm.invoke(prompt)
+                result = self.llm.invoke(prompt, job="generate")
+                self.last_validation = None
 
             # Save results
             self._save_result(
@@ -122,6 +329,59 @@ class PaperToExam:
             print(f"Error processing content: {str(e)}")
             raise
 
+    @_serialized
+    def repair_exam(
+        self,
+        result: Dict[str, Any],
+        exam_type: str,
+        difficulty: str,
+        passage_type: str,
+        report: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Fix the failing parts of an exam without regenerating it.
+
+        Each failing slice (a short passage, missing questions for one passage
+        or category) is sent to the model on its own and merged back.
+
+        Args:
+            result: Exam result to repair, modified in place
+            exam_type: Exam type (IELTS, TOEIC)
+            difficulty: Exam difficulty
+            passage_type: Passage type (1, 2, 3 or TOEIC part 5, 6, 7)
+            report: Validation report of the result, computed if omitted
+
+        Returns:
+            Repaired exam result
+        """
+        report = report or self._validate_result(result, exam_type, passage_type)
+        tasks = plan_repairs(result, report)
+        if not tasks:
+            print("No repairable errors found")
+            return result
+
+        for task in tasks:
+            if task["kind"] == "trim_questions":
+                continue
+            print(f"Repairing exam: {task}")
+            prompt, schema = build_repair_prompt(
+                task, result, exam_type.upper(), difficulty, self._get_prompt_source()
+            )
+            try:
+                response = self.llm.invoke_json(prompt, schema=schema, job="repair")
+            except BudgetExceededError:
+                raise
+            except Exception as e:
+                print(f"Repair failed for {task['kind']}: {str(e)}")
+                continue
+            apply_repair(result, task, response)
+
+        finalize_questions(result, exam_type.upper())
+        self.last_source = "repair"
+        self.last_validation = self._validate_result(result, exam_type, passage_type)
+        self.last_validation["repairs"] = tasks
+        return result
+
     def _get_schema(self, exam_type: str) -> Dict[str, Any]:
         """Return schema for exam type."""
         if exam_type.upper() == "IELTS":
@@ -171,17 +431,19 @@ Create a TYPE 3 PASSAGE:
         return ""
 
     def _create_prompt(
-        self, exam_type: str, difficulty: str, passage_instruction: str
+        self, exam_type: str, difficulty: str, passage_instruction: str, content: Optional[str] = None
     ) -> str:
-        """Create prompt for LLM."""
+        """Create prompt for LLM; ``content`` replaces the extracted markdown (e.g. a condensed digest)."""
         if exam_type == "IELTS":
-            return self._create_ielts_prompt(difficulty, passage_instruction)
+            return self._create_ielts_prompt(difficulty, passage_instruction, content)
         elif exam_type == "TOEIC":
-            return self._create_toeic_prompt(difficulty, passage_instruction)
+            return self._create_toeic_prompt(difficulty, passage_instruction, content)
         else:
             raise ValueError(f"Unsupported exam type: {exam_type}")
 
-    def _create_ielts_prompt(self, difficulty: str, passage_instruction: str) -> str:
+    def _create_ielts_prompt(
+        self, difficulty: str, passage_instruction: str, content: Optional[str] = None
+    ) -> str:
         """Create prompt for IELTS exam."""
         return f"""
 Exam type: IELTS
@@ -223,10 +485,12 @@ FORMAT REQUIREMENTS:
 
 Original text:
 
-{self.markdown_content}
+{content or self.markdown_content}
 """
 
-    def _create_toeic_prompt(self, difficulty: str, passage_instruction: str) -> str:
+    def _create_toeic_prompt(
+        self, difficulty: str, passage_instruction: str, content: Optional[str] = None
+    ) -> str:
         """Create prompt for TOEIC exam."""
         part_number = passage_instruction.strip() if passage_instruction.strip().isdigit() else "5"
         # Add special emphasis for Part 7
@@ -278,7 +542,7 @@ FORMAT REQUIREMENTS:
 
 Original text:
 
-{self.markdown_content}
+{content or self.markdown_content}
 """
 
     def _get_part_specific_instructions(self, part_number: str, difficulty: str) -> str:
@@ -374,167 +638,27 @@ CREATE EXACTLY 20 questions - no more, no less.
         else:
             return "Invalid part number. Must be 5, 6, or 7."
 
-    def _validate_result(self, result: Dict[str, Any], passage_type: str) -> None:
-        """Check results from LLM."""
-        # Determine exam type
-        exam_type = result.get("exam_type", "IELTS")
-        
-        if exam_type == "IELTS":
-            self._validate_ielts_result(result, passage_type)
-        elif exam_type == "TOEIC":
-            self._validate_toeic_result(result)
-        else:
-            print(f"WARNING: Unknown exam type: {exam_type}")
-            
-    def _validate_ielts_result(self, result: Dict[str, Any], passage_type: str) -> None:
-        """Validate IELTS exam result."""
-        # Check passage length
-        if "reading_passage" in result:
-            passage = result["reading_passage"]
-            if "content" in passage:
-                # Calculate word count if not available
-                if "word_count" not in passage or passage["word_count"] == 0:
+    def _validate_result(
+        self, result: Dict[str, Any], exam_type: str, passage_type: str
+    ) -> Dict[str, Any]:
+        """Check results from LLM and return the validation report."""
+        # Fill in missing word counts before validating
+        for passage in result.get("reading_passages") or []:
+            if isinstance(passage, dict) and isinstance(passage.get("content"), str):
+                if not passage.get("word_count"):
                     passage["word_count"] = self.count_words(passage["content"])
 
-                # Check passage length
-                word_count = passage.get("word_count", 0)
-                passage_num = int(passage_type)
-
-                min_words = 700
-                if passage_num == 3:
-                    min_words = 750
-
-                if word_count < min_words:
-                    print(
-                        f"WARNING: Passage has {word_count} words, less than the minimum requirement of {min_words} words."
-                    )
-                else:
-                    print(
-                        f"OK: Passage has {word_count} words (meets the minimum requirement of {min_words} words)."
-                    )
-
-        # Check number of questions
-        if "questions" in result:
-            questions = result["questions"]
-            if not isinstance(questions, list):
-                print("WARNING: Question data is not a list.")
-                return
-
-            question_count = len(questions)
-            if question_count < 14 or question_count > 16:
-                print(
-                    f"WARNING: There are {question_count} questions, not meeting the requirement of 14-16 questions."
-                )
-            else:
-                print(f"OK: Exam has exactly {question_count} questions.")
-
-            # Check number of questions by type
-            question_types = {}
-            for q in questions:
-                q_type = q.get("type", "unknown")
-                if q_type not in question_types:
-                    question_types[q_type] = 0
-                question_types[q_type] += 1
-
-            print(f"Question distribution by type: {question_types}")
-
-    def _validate_toeic_result(self, result: Dict[str, Any]) -> None:
-        # Check part number
-        part_number = result.get("part_number")
-        # Check estimated score
-        if "estimated_score" in result:
-            score = result["estimated_score"]
-        else:
-            print("WARNING: Missing estimated score")
-
-        # Check reading passages based on part
-        if "reading_passages" in result:
-            passages = result["reading_passages"]
-            if not isinstance(passages, list):
-                print("WARNING: Reading passages data is not a list")
-            else:
-                if part_number == 5:
-                    if len(passages) != 0:
-                        print(f"WARNING: Part 5 should have 0 passages, found {len(passages)}")
-                    else:
-                        print("OK: Part 5 has no passages")
-                elif part_number == 6:
-                    if len(passages) != 4:
-                        print(f"WARNING: Part 6 should have 4 passages, found {len(passages)}")
-                    else:
-                        print("OK: Part 6 has 4 passages")
-                elif part_number == 7:
-                    # Part 7 should have: 5 single + 2 double = 7 passages total
-                    expected_passages = 7
-                    if len(passages) != expected_passages:
-                        print(f"WARNING: Part 7 should have {expected_passages} passages (5 single + 2 double), found {len(passages)}")
-                    else:
-                        print(f"OK: Part 7 has {len(passages)} passages")
-        else:
-            print("WARNING: Missing reading passages")
-
-        # Check questions
-        if "questions" in result:
-            questions = result["questions"]
-            if not isinstance(questions, list):
-                print("WARNING: Question data is not a list")
-                return
-
-            question_count = len(questions)
-
-            # Validate question count based on part
-            if part_number == 5:
-                expected_count = 30
-            elif part_number == 6:
-                expected_count = 16
-            elif part_number == 7:
-                expected_count = 20  # Optimized TOEIC Part 7 for LLM processing
-            else:
-                expected_count = 0
-
-            if part_number in [5, 6, 7]:
-                if question_count != expected_count:
-                    print(f"WARNING: Part {part_number} should have {expected_count} questions, found {question_count}")
-                else:
-                    print(f"OK: Part {part_number} has {question_count} questions")
-
-            # Check all questions have correct part number
-            for q in questions:
-                if q.get("part") != part_number:
-                    print(f"WARNING: Question {q.get('question_number', '?')} has wrong part number")
-
-            # Check options format
-            for q in questions:
-                if "options" in q:
-                    options = q["options"]
-                    if not isinstance(options, dict) or len(options) != 4:
-                        print(f"WARNING: Question {q.get('question_number', '?')} does not have exactly 4 options")
-                    elif not all(key in options for key in ["A", "B", "C", "D"]):
-                        print(f"WARNING: Question {q.get('question_number', '?')} missing A, B, C, or D options")
-        else:
-            print("WARNING: Missing questions")
-
-        # Check part analysis
-        if "part_analysis" not in result:
-            print("WARNING: Missing part_analysis")
-        else:
-            analysis = result["part_analysis"]
-            if not isinstance(analysis, dict):
-                print("WARNING: part_analysis is not a dict")
-            else:
-                required_fields = ["vocabulary_level", "estimated_correct", "challenging_areas"]
-                for field in required_fields:
-                    if field not in analysis:
-                        print(f"WARNING: Missing {field} in part_analysis")
-
-        # Check improvement suggestions
-        if "improvement_suggestions" not in result:
-            print("WARNING: Missing improvement suggestions")
-        elif not isinstance(result["improvement_suggestions"], list):
-            print("WARNING: Improvement suggestions is not a list")
-        else:
-            print(f"OK: Found {len(result['improvement_suggestions'])} improvement suggestions")
+        with observe_stage("validation"):
+            report = validate_exam(result, exam_type=exam_type, passage_type=passage_type)
+        for issue in report["errors"] + report["warnings"]:
+            print(f"{issue['severity'].upper()}: {issue['path']}: {issue['reason']}")
+        print(
+            f"Validation {'passed' if report['valid'] else 'failed'}: "
+            f"{len(report['errors'])} errors, {len(report['warnings'])} warnings"
+        )
+        return report
 
+    @_serialized
     def _save_result(
         self,
         result: Union[Dict[str, Any], str],
@@ -553,25 +677,32 @@ CREATE EXACTLY 20 questions - no more, no less.
             # Use default filename
             filename = f"{exam_type.lower()}_p{passage_type}_d{difficulty.replace('.', '')}"
             
-        if output_format == "json":
-            filepath = os.path.join(self.output_dir, f"{filename}.json")
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
-        else:
-            filepath = os.path.join(self.output_dir, f"{filename}.txt")
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(result)
+        with observe_stage("save_result"):
+            # Write atomically so /exam-data never reads a half-written file
+            if output_format == "json":
+                filepath = os.path.join(self.output_dir, f"{filename}.json")
+                atomic_write(filepath, json.dumps(result, ensure_ascii=False, indent=2))
+            else:
+                filepath = os.path.join(self.output_dir, f"{filename}.txt")
+                atomic_write(filepath, result)
 
         print(f"Results saved to: {filepath}")
 
+        # An exam assembled from the bank is already in it
+        if output_format == "json" and isinstance(result, dict) and self.question_bank is not None and self.last_source != "bank":
+            try:
+                with observe_stage("bank_ingest"):
+                    self.question_bank.ingest(
+                        result, filename, self.paper_hash, exam_type, difficulty, passage_type,
+                        report=self.last_validation,
+                    )
+            except Exception as e:
+                print(f"Failed to add result to the question bank: {e}")
+
     def _get_ielts_schema(self) -> Dict[str, Any]:
         """Return schema for IELTS exam."""
         try:
-            schema_path = os.path.join(
-                os.path.dirname(os.path.abspath(__file__)), "schema", "ielts_schema.json"
-            )
-            with open(schema_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return load_schema("IELTS")
         except Exception as e:
             print(f"Failed to read IELTS schema: {e}")
             return self._get_generic_schema()
@@ -579,11 +710,7 @@ CREATE EXACTLY 20 questions - no more, no less.
     def _get_toeic_schema(self) -> Dict[str, Any]:
         """Return schema for TOEIC exam."""
         try:
-            schema_path = os.path.join(
-                os.path.dirname(os.path.abspath(__file__)), "schema", "toeic_schema.json"
-            )
-            with open(schema_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return load_schema("TOEIC")
         except Exception as e:
             print(f"Failed to read TOEIC schema: {e}")
             return self._get_generic_schema()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for docling-serve, used by the load benchmark.
+
+Answers ``POST /v1alpha/convert/file`` with canned Markdown after a
+configurable delay. Documents from ``data/*.pdf`` get a deterministic
+synthetic paper; everything else gets a generic one.
+
+Usage:
+    python -m benchmarks.fake_docling --port 5002 --latency 2.0
+"""
+import os
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from benchmarks.fake_llm import make_text, make_sentence
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+FILENAME_PATTERN = re.compile(rb'filename="([^"]+)"')
+PAGE_BREAK_PATTERN = re.compile(rb'name="md_page_break_placeholder"\r\n\r\n(.*?)\r\n', re.S)
+PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?![s\w])")
+
+
+def count_pages(body: bytes) -> int:
+    """Pages of the PDF in a multipart body; 1 if they cannot be counted."""
+    start, end = body.find(b"%PDF"), body.rfind(b"%%EOF")
+    if start < 0 or end < start:
+        return 1
+    document = body[start:end + 5]
+    try:
+        import fitz  # PyMuPDF
+        with fitz.open(stream=document, filetype="pdf") as doc:
+            return max(1, len(doc))
+    except Exception:
+        return max(1, len(PAGE_PATTERN.findall(document)))
+
+
+def split_pages(markdown: str, pages: int, placeholder: str) -> str:
+    """Spread the paragraphs over the pages and mark the breaks like docling does."""
+    paragraphs = markdown.split("\n\n")
+    size = -(-len(paragraphs) // pages)
+    chunks = ["\n\n".join(paragraphs[i * size:(i + 1) * size]) for i in range(pages)]
+    return f"\n\n{placeholder}\n\n".join(chunks)
+
+
+def build_markdown(name: str, word_count: int = 6000) -> str:
+    """Deterministic paper-like Markdown for a document name."""
+    rng = random.Random(name)
+    sections = ["Abstract", "Introduction", "Related Work", "Method", "Experiments", "Discussion", "Conclusion"]
+    parts = [f"# {make_sentence(rng, 8)}", "<!-- image -->"]
+    per_section = max(word_count // len(sections), 50)
+    for section in sections:
+        parts.append(f"## {section}")
+        parts.append(make_text(rng, per_section))
+    return "\n\n".join(parts)
+
+
+def canned_documents(word_count: int) -> Dict[str, str]:
+    documents = {}
+    if os.path.isdir(DATA_DIR):
+        for name in sorted(os.listdir(DATA_DIR)):
+            if name.lower().endswith(".pdf"):
+                documents[name] = build_markdown(name, word_count)
+    return documents
+
+
+class FakeDoclingHandler(BaseHTTPRequestHandler):
+    server_version = "FakeDocling/1.0"
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def do_POST(self):
+        if not self.path.startswith("/v1alpha/convert"):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        match = FILENAME_PATTERN.search(body)
+        name = os.path.basename(match.group(1).decode("utf-8", "replace")) if match else "document.pdf"
+
+        config = self.server.config
+        delay = config["latency"] + config["latency_per_mb"] * length / (1024 * 1024)
+        if delay > 0:
+            time.sleep(delay)
+
+        # Uploaded files are stored as "<session_id>_<filename>"
+        markdown = None
+        for known, content in config["documents"].items():
+            if name.endswith(known):
+                markdown = content
+                break
+        if markdown is None:
+            markdown = build_markdown(name, config["word_count"])
+
+        placeholder = PAGE_BREAK_PATTERN.search(body)
+        if placeholder:
+            markdown = split_pages(markdown, count_pages(body), placeholder.group(1).decode("utf-8"))
+
+        payload = json.dumps({"document": {"md_content": markdown}, "status": "success"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_docling(
+    host: str = "127.0.0.1",
+    port: int = 5002,
+    latency: float = 0.0,
+    latency_per_mb: float = 0.0,
+    word_count: int = 6000,
+) -> ThreadingHTTPServer:
+    """Start the fake docling-serve in a background thread and return the server."""
+    server = ThreadingHTTPServer((host, port), FakeDoclingHandler)
+    server.config = {
+        "latency": latency,
+        "latency_per_mb": latency_per_mb,
+        "word_count": word_count,
+        "documents": canned_documents(word_count),
+    }
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Fake docling-serve for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5002)
+    parser.add_argument("--latency", type=float, default=0.0, help="Fixed delay per conversion (seconds)")
+    parser.add_argument("--latency-per-mb", type=float, default=0.0, help="Extra delay per MB uploaded (seconds)")
+    parser.add_argument("--words", type=int, default=6000, help="Words in generated documents")
+    args = parser.parse_args(argv)
+
+    server = start_fake_docling(args.host, args.port, args.latency, args.latency_per_mb, args.words)
+    print(f"Fake docling-serve listening on http://{args.host}:{args.port}/v1alpha/convert/file")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Deterministic stand-in for the Gemini model, used by the load benchmark.
+
+Returns schema-valid IELTS and TOEIC exams derived from a hash of the prompt,
+with configurable latency and error rates. Enable it in the server with
+``LLM_BACKEND=fake``.
+"""
+import os
+import re
+import json
+import time
+import random
+import hashlib
+from typing import Dict, Any, List, Optional
+
+
+WORDS = (
+    "research network model analysis data system results method study approach "
+    "performance security protocol learning evaluation experiment design structure "
+    "information process development framework significant efficient reliable "
+    "traditional modern complex important different accurate communication"
+).split()
+
+
+class FakeLLMError(RuntimeError):
+    """Injected failure, stands in for an API error."""
+
+
+class FakeLLM:
+    """Drop-in replacement for the model object behind ``LLM._llm``."""
+
+    # Accepts (and ignores) the system prompt and response schema
+    structured_output = True
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        invalid_json_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.invalid_json_rate = invalid_json_rate
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_env(cls) -> "FakeLLM":
+        seed = os.getenv("FAKE_LLM_SEED")
+        return cls(
+            latency=float(os.getenv("FAKE_LLM_LATENCY", "0")),
+            jitter=float(os.getenv("FAKE_LLM_JITTER", "0")),
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+            invalid_json_rate=float(os.getenv("FAKE_LLM_INVALID_JSON_RATE", "0")),
+            seed=int(seed) if seed else None,
+        )
+
+    def invoke(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if self._random.random() < self.error_rate:
+            raise FakeLLMError("Injected fake LLM error")
+
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        rng = random.Random(digest)
+        result = self._build_result(prompt, rng)
+        text = json.dumps(result, ensure_ascii=False)
+
+        if self._random.random() < self.invalid_json_rate:
+            # Truncated output, the most common way real responses fail to parse
+            return "```json\n" + text[: len(text) // 2]
+        return "```json\n" + text + "\n```"
+
+    def _build_result(self, prompt: str, rng: random.Random) -> Dict[str, Any]:
+        if re.search(r"Exam type:\s*TOEIC", prompt):
+            part = re.search(r"Part:\s*(\d)", prompt)
+            return fake_toeic_exam(int(part.group(1)) if part else 5, rng)
+        return fake_ielts_exam(rng)
+
+
+def make_sentence(rng: random.Random, length: int = 12) -> str:
+    words = [rng.choice(WORDS) for _ in range(length)]
+    return words[0].capitalize() + " " + " ".join(words[1:]) + "."
+
+
+def make_text(rng: random.Random, word_count: int) -> str:
+    sentences = []
+    words = 0
+    while words < word_count:
+        sentences.append(make_sentence(rng))
+        words += len(sentences[-1].split())
+    paragraphs = [" ".join(sentences[i:i + 6]) for i in range(0, len(sentences), 6)]
+    return "\n\n".join(paragraphs)
+
+
+def fake_ielts_exam(rng: random.Random, word_count: int = 820) -> Dict[str, Any]:
+    """Build an IELTS exam that passes schema and rule validation."""
+    content = make_text(rng, word_count)
+    questions = []
+    categories = [1] * 5 + [2] * 4 + [3] * 5
+    types = {1: "True/False/Not Given", 2: "Multiple Choice", 3: "Sentence completion"}
+    for number, category in enumerate(categories, start=1):
+        question = {
+            "question_number": number,
+            "passage_reference": 1,
+            "question_type": types[category],
+            "question_category": category,
+            "question_text": make_sentence(rng),
+            "correct_answer": "True" if category == 1 else ("A" if category == 2 else rng.choice(WORDS)),
+            "explanation": make_sentence(rng),
+        }
+        if category == 2:
+            question["options"] = [f"{letter}. {make_sentence(rng, 4)}" for letter in "ABCD"]
+        questions.append(question)
+
+    return {
+        "overall_score": 7.0,
+        "strengths": [make_sentence(rng, 6)],
+        "weaknesses": [make_sentence(rng, 6)],
+        "reading_passages": [{
+            "passage_number": 1,
+            "title": make_sentence(rng, 5),
+            "content": content,
+            "word_count": len(content.split()),
+            "passage_type": "Passage 1",
+        }],
+        "passage_analysis": [{
+            "passage_number": 1,
+            "difficulty_level": "Medium",
+            "main_topic": make_sentence(rng, 5),
+            "question_types": list(types.values()),
+            "vocabulary_level": "Intermediate",
+            "suggested_time": 20,
+            "target_word_count": {"min": 700, "max": 1200},
+        }],
+        "questions": questions,
+        "improvement_suggestions": [make_sentence(rng, 8)],
+    }
+
+
+def fake_toeic_exam(part_number: int, rng: random.Random) -> Dict[str, Any]:
+    """Build a TOEIC part that passes schema and rule validation."""
+    if part_number == 6:
+        layout = [(n, 4) for n in range(1, 5)]
+        first_question = 131
+    elif part_number == 7:
+        layout = [(1, 3), (2, 3), (3, 3), (4, 3), (5, 3), ("6a", 5), ("6b", 0)]
+        first_question = 147
+    else:
+        part_number = 5
+        layout = [(None, 30)]
+        first_question = 101
+
+    passages = []
+    questions = []
+    number = first_question
+    for passage_number, question_count in layout:
+        if passage_number is not None:
+            content = make_text(rng, 120)
+            passages.append({
+                "passage_number": passage_number,
+                "part": part_number,
+                "title": make_sentence(rng, 4),
+                "content": content,
+                "word_count": len(content.split()),
+                "document_type": rng.choice(["email", "memo", "notice", "advertisement"]),
+            })
+        for _ in range(question_count):
+            questions.append({
+                "question_number": number,
+                "part": part_number,
+                "passage_reference": passage_number,
+                "question_text": make_sentence(rng) if part_number == 7 else make_sentence(rng).replace(" ", " ___ ", 1),
+                "options": {letter: rng.choice(WORDS) for letter in "ABCD"},
+                "correct_answer": rng.choice("ABCD"),
+                "explanation": make_sentence(rng),
+                "question_type": "detail",
+            })
+            number += 1
+
+    return {
+        "exam_type": "TOEIC",
+        "part_number": part_number,
+        "estimated_score": 350,
+        "reading_passages": passages,
+        "questions": questions,
+        "part_analysis": {
+            "grammar_focus": [make_sentence(rng, 3)],
+            "vocabulary_level": "Intermediate",
+            "estimated_correct": len(questions) - 3,
+            "challenging_areas": [make_sentence(rng, 4)],
+        },
+        "improvement_suggestions": [make_sentence(rng, 8)],
+    }
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+End-to-end load benchmark for the Paper To Exam API.
+
+Starts the fake docling-serve and the API server with the fake LLM backend
+(unless ``--url`` points at a running server), then drives
+/upload-pdf -> /generate-exam -> /exam-data at increasing concurrency and
+reports throughput, latency percentiles and server memory.
+
+Usage (from the server/ directory):
+    python -m benchmarks.load_test --concurrency 1 2 4 8 --flows 8
+    python -m benchmarks.load_test --output report.json --baseline baseline.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import socket
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+import requests
+
+from benchmarks.fake_docling import DATA_DIR, start_fake_docling
+
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ("upload", "generate", "exam_data", "flow")
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest-rank percentile
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+class MemorySampler:
+    """Track the peak RSS of the server process while a level runs."""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.pid:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = read_rss_mb(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            self._stop.wait(self.interval)
+
+
+def start_server(port: int, docling_urls: List[str], env_overrides: Dict[str, str]) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "LLM_BACKEND": "fake",
+        "DOCLING_URL": docling_urls[0],
+        "DOCLING_URLS": ",".join(docling_urls),
+    })
+    env.update(env_overrides)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVER_DIR,
+        env=env,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except requests.RequestException:
+            if process.poll() is not None:
+                raise RuntimeError("API server exited during startup")
+            time.sleep(0.3)
+    process.terminate()
+    raise RuntimeError("API server did not start within 60 seconds")
+
+
+def run_flow(base_url: str, pdf_path: str, exam: Dict[str, str]) -> Dict[str, Any]:
+    """Upload one PDF, generate an exam and read it back; return per-step latencies."""
+    timings = {}
+    start = time.perf_counter()
+    try:
+        t = time.perf_counter()
+        with open(pdf_path, "rb") as f:
+            resp = requests.post(
+                f"{base_url}/upload-pdf",
+                files={"pdf_file": (os.path.basename(pdf_path), f, "application/pdf")},
+                timeout=600,
+            )
+        resp.raise_for_status()
+        timings["upload"] = time.perf_counter() - t
+        session_id = resp.json()["session_id"]
+
+        t = time.perf_counter()
+        resp = requests.post(f"{base_url}/generate-exam/{session_id}", json=exam, timeout=600)
+        resp.raise_for_status()
+        timings["generate"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        resp = requests.get(f"{base_url}/exam-data/{session_id}", timeout=60)
+        resp.raise_for_status()
+        timings["exam_data"] = time.perf_counter() - t
+
+        timings["flow"] = time.perf_counter() - start
+        return {"ok": True, "timings": timings}
+    except Exception as e:
+        return {"ok": False, "error": str(e), "timings": timings}
+
+
+def run_level(
+    base_url: str,
+    concurrency: int,
+    flows: int,
+    pdfs: List[str],
+    exams: List[Dict[str, str]],
+    server_pid: Optional[int],
+) -> Dict[str, Any]:
+    jobs = [(pdfs[i % len(pdfs)], exams[i % len(exams)]) for i in range(flows)]
+    with MemorySampler(server_pid) as memory:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda job: run_flow(base_url, *job), jobs))
+        elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r["ok"]]
+    latencies = {}
+    for name in ENDPOINTS:
+        values = [r["timings"][name] for r in ok if name in r["timings"]]
+        latencies[name] = {
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": max(values) if values else None,
+        }
+    errors = [r["error"] for r in results if not r["ok"]]
+    return {
+        "concurrency": concurrency,
+        "flows": flows,
+        "succeeded": len(ok),
+        "failed": len(errors),
+        "errors": sorted(set(errors))[:5],
+        "elapsed": elapsed,
+        "throughput": len(ok) / elapsed if elapsed > 0 else 0.0,
+        "latency": latencies,
+        "peak_rss_mb": memory.peak,
+        "rss_after_mb": read_rss_mb(server_pid) if server_pid else None,
+    }
+
+
+def print_report(levels: List[Dict[str, Any]]) -> None:
+    def fmt(value, unit="s"):
+        return "-" if value is None else f"{value:.3f}{unit}"
+
+    print(f"\n{'conc':>5} {'ok':>5} {'fail':>5} {'flows/s':>9} {'flow p50':>10} {'flow p99':>10} "
+          f"{'upload p99':>11} {'gen p99':>10} {'data p99':>10} {'peak RSS':>10}")
+    for level in levels:
+        lat = level["latency"]
+        print(
+            f"{level['concurrency']:>5} {level['succeeded']:>5} {level['failed']:>5} "
+            f"{level['throughput']:>9.2f} {fmt(lat['flow']['p50']):>10} {fmt(lat['flow']['p99']):>10} "
+            f"{fmt(lat['upload']['p99']):>11} {fmt(lat['generate']['p99']):>10} "
+            f"{fmt(lat['exam_data']['p99']):>10} {fmt(level['peak_rss_mb'], 'MB'):>10}"
+        )
+        for error in level["errors"]:
+            print(f"      error: {error}")
+
+
+def compare_to_baseline(levels: List[Dict[str, Any]], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Return a message for each level whose throughput or p99 regressed past the threshold."""
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    regressions = []
+    for level in levels:
+        old = previous.get(level["concurrency"])
+        if not old:
+            continue
+        if old["throughput"] and level["throughput"] < old["throughput"] * (1 - max_regression):
+            regressions.append(
+                f"concurrency {level['concurrency']}: throughput {level['throughput']:.2f} flows/s "
+                f"vs baseline {old['throughput']:.2f}"
+            )
+        old_p99 = old["latency"]["flow"]["p99"]
+        new_p99 = level["latency"]["flow"]["p99"]
+        if old_p99 and new_p99 and new_p99 > old_p99 * (1 + max_regression):
+            regressions.append(
+                f"concurrency {level['concurrency']}: flow p99 {new_p99:.3f}s vs baseline {old_p99:.3f}s"
+            )
+    return regressions
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load benchmark with fake docling and LLM backends")
+    parser.add_argument("--url", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--flows", type=int, default=8, help="Flows per concurrency level")
+    parser.add_argument("--exam", choices=["IELTS", "TOEIC", "mixed"], default="mixed")
+    parser.add_argument("--docling-latency", type=float, default=0.5)
+    parser.add_argument("--docling-words", type=int, default=6000)
+    parser.add_argument("--docling-instances", type=int, default=1, help="Fake docling-serve instances in the pool")
+    parser.add_argument(
+        "--fast-path",
+        choices=["off", "auto", "always"],
+        default="off",
+        help="Server FAST_PATH (default off: the sample PDFs are born-digital and would never reach docling)",
+    )
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--llm-jitter", type=float, default=0.5)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-invalid-json-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against a previous JSON report")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative regression (default 0.2)")
+    args = parser.parse_args(argv)
+
+    pdfs = [os.path.join(DATA_DIR, name) for name in sorted(os.listdir(DATA_DIR)) if name.endswith(".pdf")]
+    if not pdfs:
+        print(f"No PDFs found in {DATA_DIR}")
+        return 1
+
+    ielts = [{"exam_type": "IELTS", "difficulty": "7.0", "passage_type": p} for p in ("1", "2", "3")]
+    toeic = [{"exam_type": "TOEIC", "difficulty": "700", "passage_type": p} for p in ("5", "6", "7")]
+    exams = {"IELTS": ielts, "TOEIC": toeic, "mixed": ielts + toeic}[args.exam]
+
+    doclings = []
+    server = None
+    base_url = args.url
+    try:
+        if not base_url:
+            docling_urls = []
+            for _ in range(args.docling_instances):
+                docling_port = free_port()
+                doclings.append(start_fake_docling(
+                    port=docling_port, latency=args.docling_latency, word_count=args.docling_words
+                ))
+                docling_urls.append(f"http://127.0.0.1:{docling_port}/v1alpha/convert/file")
+            port = free_port()
+            server = start_server(
+                port,
+                docling_urls,
+                {
+                    "FAST_PATH": args.fast_path,
+                    "FAKE_LLM_LATENCY": str(args.llm_latency),
+                    "FAKE_LLM_JITTER": str(args.llm_jitter),
+                    "FAKE_LLM_ERROR_RATE": str(args.llm_error_rate),
+                    "FAKE_LLM_INVALID_JSON_RATE": str(args.llm_invalid_json_rate),
+                    "FAKE_LLM_SEED": "0",
+                },
+            )
+            base_url = f"http://127.0.0.1:{port}"
+
+        levels = []
+        for concurrency in args.concurrency:
+            print(f"Running {args.flows} flows at concurrency {concurrency}...")
+            levels.append(run_level(
+                base_url, concurrency, args.flows, pdfs, exams, server.pid if server else None
+            ))
+        print_report(levels)
+
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": vars(args),
+            "levels": levels,
+        }
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"\nReport saved to: {args.output}")
+
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+            regressions = compare_to_baseline(levels, baseline, args.max_regression)
+            if regressions:
+                print("\nREGRESSIONS:")
+                for message in regressions:
+                    print(f"  {message}")
+                return 1
+            print("\nNo regressions against baseline")
+        return 0
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+        for docling in doclings:
+            docling.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the text-processing hot paths around the LLM call.
+
+Covers PaperToExam.count_words, PDFExtractor.clean_base64_images, the
+fence and comment stripping used by LLM.invoke_json, markdown pruning and
+IELTS prompt assembly, on synthetic fixtures shaped like real inputs: a
+typical paper, a very large thesis, image-heavy docling output and a large
+LLM response.
+
+Usage (from the server/ directory):
+    python -m benchmarks.micro --save              # record benchmarks/micro_baseline.json
+    python -m benchmarks.micro --check             # compare against it, exit 1 on regression
+    python -m benchmarks.micro --filter clean_images --repeat 10
+"""
+import os
+import sys
+import json
+import random
+import timeit
+import argparse
+import statistics
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from benchmarks.fake_docling import build_markdown
+from benchmarks.fake_llm import fake_ielts_exam, make_sentence
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "micro_baseline.json")
+
+
+def image_heavy_markdown(images: int = 60, image_kb: int = 40, words: int = 8000) -> str:
+    """Docling output with inline base64 images between the sections, as produced with images enabled."""
+    rng = random.Random("images")
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+    parts = build_markdown("image-heavy.pdf", words).split("\n\n")
+    step = max(len(parts) // images, 1)
+    for i in range(images):
+        payload = "".join(rng.choice(alphabet) for _ in range(image_kb * 1024))
+        parts.insert(min(i * step + i, len(parts)), f"![Figure {i}](data:image/png;base64,{payload}=)")
+    return "\n\n".join(parts)
+
+
+def llm_response(with_comments: bool = True) -> str:
+    """A fenced LLM response with a few stray comments, as handled by invoke_json."""
+    exam = fake_ielts_exam(random.Random("response"), word_count=1100)
+    text = json.dumps(exam, ensure_ascii=False, indent=2)
+    if with_comments:
+        lines = text.split("\n")
+        for i in range(10, len(lines), 40):
+            lines[i] = lines[i] + "  // " + make_sentence(random.Random(i), 5)
+        text = "/* generated exam */\n" + "\n".join(lines)
+    return "```json\n" + text + "\n```"
+
+
+def build_fixtures() -> Dict[str, str]:
+    return {
+        "paper_50kb": build_markdown("paper.pdf", 8000),
+        "thesis_500kb": build_markdown("thesis.pdf", 80000),
+        "docling_images": image_heavy_markdown(),
+        "llm_response": llm_response(),
+    }
+
+
+def build_cases(fixtures: Dict[str, str]) -> List[Tuple[str, Callable[[], Any]]]:
+    from baseline import PaperToExam
+    from pdf_extractor import PDFExtractor
+    from llm import strip_json_response
+    from markdown_pruner import prune_markdown
+
+    # Skip __init__, which creates the Gemini client and output directory
+    paper_to_exam = PaperToExam.__new__(PaperToExam)
+    extractor = PDFExtractor()
+    passage_instruction = paper_to_exam._get_passage_instruction("2")
+
+    def clean_images(markdown: str) -> Callable[[], Any]:
+        def run():
+            extractor.markdown_content = markdown
+            return extractor.clean_base64_images()
+        return run
+
+    def create_prompt(markdown: str) -> Callable[[], Any]:
+        def run():
+            paper_to_exam.markdown_content = markdown
+            return paper_to_exam._create_ielts_prompt("7.0", passage_instruction)
+        return run
+
+    return [
+        ("count_words/paper_50kb", lambda: paper_to_exam.count_words(fixtures["paper_50kb"])),
+        ("count_words/thesis_500kb", lambda: paper_to_exam.count_words(fixtures["thesis_500kb"])),
+        ("clean_images/paper_50kb", clean_images(fixtures["paper_50kb"])),
+        ("clean_images/thesis_500kb", clean_images(fixtures["thesis_500kb"])),
+        ("clean_images/docling_images", clean_images(fixtures["docling_images"])),
+        ("strip_json/llm_response", lambda: strip_json_response(fixtures["llm_response"])),
+        ("parse_json/llm_response", lambda: json.loads(strip_json_response(fixtures["llm_response"]))),
+        ("prune/paper_50kb", lambda: prune_markdown(fixtures["paper_50kb"])),
+        ("prune/thesis_500kb", lambda: prune_markdown(fixtures["thesis_500kb"])),
+        ("ielts_prompt/paper_50kb", create_prompt(fixtures["paper_50kb"])),
+        ("ielts_prompt/thesis_500kb", create_prompt(fixtures["thesis_500kb"])),
+    ]
+
+
+def measure(func: Callable[[], Any], repeat: int, min_time: float = 0.2) -> Dict[str, float]:
+    """Time a function; returns seconds per call (best and median over ``repeat`` rounds)."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    # autorange targets 0.2 s; scale up for very fast cases
+    number = max(1, int(number * min_time / 0.2))
+    rounds = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {"best": min(rounds), "median": statistics.median(rounds), "calls": number}
+
+
+def run(filter_text: Optional[str], repeat: int) -> Dict[str, Dict[str, float]]:
+    fixtures = build_fixtures()
+    for name, text in fixtures.items():
+        print(f"fixture {name}: {len(text.encode('utf-8')) / 1024:.0f} KB")
+    print()
+
+    results = {}
+    for name, func in build_cases(fixtures):
+        if filter_text and filter_text not in name:
+            continue
+        results[name] = measure(func, repeat)
+        print(f"{name:<32} best {results[name]['best'] * 1000:>9.3f} ms   median {results[name]['median'] * 1000:>9.3f} ms")
+    return results
+
+
+def check(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Compare best times against the baseline; return one message per regression."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        ratio = result["best"] / previous["best"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {result['best'] * 1000:.3f} ms vs baseline {previous['best'] * 1000:.3f} ms ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for text-processing hot paths")
+    parser.add_argument("--filter", help="Only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds per case")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file")
+    parser.add_argument("--save", action="store_true", help="Save results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Fail if a case regressed past the threshold")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown (default 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.repeat)
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}; run with --save first")
+            return 1
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = check(results, baseline, args.threshold)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print("\nNo regressions against baseline")
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+        print(f"\nBaseline saved to: {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
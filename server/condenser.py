@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Map-reduce condensation of very long documents.
+
+Documents above ``CONDENSE_THRESHOLD_WORDS`` are split into sections along
+their headings, each section is condensed by the LLM in parallel (bounded by
+``CONDENSE_CONCURRENCY``) and the exam is generated from the joined digest.
+Condensed sections are cached on disk by content hash, so regenerating an
+exam or uploading the same thesis again costs no condensation calls.
+"""
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
+
+from markdown_pruner import split_blocks
+from metrics import observe_stage, record_cache
+from storage_sweeper import atomic_write
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "condense")
+
+# Bump when the condensation prompt changes so stale summaries are not reused
+PROMPT_VERSION = 1
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+def split_sections(markdown: str, min_words: int = 400, max_words: int = 3000) -> List[Dict[str, Any]]:
+    """
+    Split markdown into sections of roughly ``min_words`` to ``max_words`` words.
+
+    Sections follow the document's headings; short neighbouring sections are
+    merged and long ones are cut between blocks.
+
+    Returns:
+        List of {"title", "text", "words"}
+    """
+    sections = []
+    title, blocks, words = "Beginning", [], 0
+
+    def flush():
+        if blocks:
+            sections.append({"title": title, "text": "\n\n".join(blocks), "words": words})
+
+    for block in split_blocks(markdown):
+        block_words = _words(block)
+        is_heading = block.lstrip().startswith("#")
+        if (is_heading and words >= min_words) or (words + block_words > max_words and words > 0):
+            flush()
+            title = block.lstrip("# ").strip() if is_heading else f"{title} (cont.)"
+            blocks, words = [], 0
+        elif is_heading and not blocks:
+            title = block.lstrip("# ").strip()
+        blocks.append(block)
+        words += block_words
+    flush()
+    return sections
+
+
+class SectionCache:
+    """Condensed sections on disk, one JSON file per content hash."""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR):
+        self.directory = directory
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    @staticmethod
+    def key(text: str, target_words: int, model: str) -> str:
+        raw = f"{PROMPT_VERSION}\0{model}\0{target_words}\0{text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                summary = json.load(f)["summary"]
+        except (OSError, ValueError, KeyError):
+            record_cache("condense_section", False)
+            return None
+        # Reads count as use for the storage sweeper's LRU
+        os.utime(path)
+        record_cache("condense_section", True)
+        return summary
+
+    def put(self, key: str, summary: str) -> None:
+        atomic_write(self._path(key), json.dumps({
+            "summary": summary,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, ensure_ascii=False))
+
+
+def _condense_prompt(section: Dict[str, Any], target_words: int) -> str:
+    return f"""
+You are condensing one section of a long document. An IELTS/TOEIC reading exam will later be written from the condensed version of the whole document.
+
+Condense the section below to about {target_words} words of plain English prose.
+- Keep the key ideas, arguments, findings, definitions, examples and specific facts (names, numbers, dates)
+- Keep the technical terminology
+- Do not add information that is not in the section, and do not comment on the section itself
+- Return only the condensed text, without headings or bullet points
+
+Section title: {section["title"]}
+
+{section["text"]}
+"""
+
+
+def condense_document(
+    markdown: str,
+    invoke: Callable[[str], str],
+    model: str = "",
+    digest_words: int = 6000,
+    concurrency: int = 4,
+    cache: Optional[SectionCache] = None,
+) -> Dict[str, Any]:
+    """
+    Condense a long document section by section.
+
+    Args:
+        markdown: Document markdown
+        invoke: Function that sends a prompt to the LLM and returns its text
+        model: Model name, part of the cache key
+        digest_words: Approximate length of the whole digest
+        concurrency: Sections condensed at the same time
+        cache: Cache of condensed sections; None disables caching
+
+    Returns:
+        {"content": digest markdown, "sections": per-section stats,
+         "words_before", "words_after", "llm_calls", "cache_hits"}
+    """
+    sections = split_sections(markdown)
+    total_words = sum(section["words"] for section in sections) or 1
+
+    def condense(section: Dict[str, Any]) -> Dict[str, Any]:
+        # Each section gets a share of the digest proportional to its length
+        target = max(80, round(section["words"] * digest_words / total_words))
+        stats = {"title": section["title"], "words": section["words"], "target_words": target, "source": "original"}
+        if section["words"] <= target:
+            return dict(stats, text=section["text"])
+
+        key = SectionCache.key(section["text"], target, model)
+        summary = cache.get(key) if cache else None
+        if summary is not None:
+            return dict(stats, text=f"## {section['title']}\n\n{summary}", source="cache")
+
+        try:
+            with observe_stage("condense_section"):
+                summary = invoke(_condense_prompt(section, target)).strip()
+        except Exception as e:
+            # Losing one section's detail is better than failing the whole exam
+            print(f"condenser: Failed to condense '{section['title']}': {e}; using its beginning instead")
+            excerpt = " ".join(section["text"].split()[:target])
+            return dict(stats, text=excerpt, source="truncated")
+        if cache:
+            cache.put(key, summary)
+        return dict(stats, text=f"## {section['title']}\n\n{summary}", source="llm")
+
+    with observe_stage("condensation"):
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            condensed = list(pool.map(condense, sections))
+
+    content = "\n\n".join(section.pop("text") for section in condensed)
+    report = {
+        "content": content,
+        "sections": condensed,
+        "words_before": _words(markdown),
+        "words_after": _words(content),
+        "llm_calls": sum(1 for section in condensed if section["source"] in ("llm", "truncated")),
+        "cache_hits": sum(1 for section in condensed if section["source"] == "cache"),
+    }
+    print(
+        f"condenser: {len(sections)} sections, {report['words_before']} -> {report['words_after']} words, "
+        f"{report['llm_calls']} LLM calls, {report['cache_hits']} cached"
+    )
+    return report
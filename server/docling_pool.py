@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Pool of docling-serve instances.
+
+A docling-serve instance runs one heavy layout-model conversion at a time,
+so concurrent uploads queue behind each other. The pool sends each
+conversion to the healthy instance with the fewest outstanding requests,
+caps the requests in flight per instance and lets PDFExtractor retry on
+another instance after a failure. Instances are listed in DOCLING_URLS
+(comma separated) or DOCLING_URL.
+"""
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from llm_router import ProviderHealth
+from metrics import DOCLING_OUTSTANDING, DOCLING_REQUESTS
+
+
+DEFAULT_DOCLING_URL = "http://localhost:5001/v1alpha/convert/file"
+
+
+class DoclingPoolTimeout(RuntimeError):
+    """No instance had a free slot within the acquire timeout."""
+
+
+class DoclingInstance:
+    """One docling-serve endpoint and its load and health."""
+
+    def __init__(self, url: str, max_concurrent: int):
+        self.url = url
+        self.max_concurrent = max_concurrent
+        self.outstanding = 0
+        self.completed = 0
+        self.health = ProviderHealth(
+            failure_threshold=int(os.getenv("DOCLING_FAILURE_THRESHOLD", "2")),
+            cooldown=float(os.getenv("DOCLING_COOLDOWN", "30")),
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(
+            self.health.snapshot(),
+            url=self.url,
+            outstanding=self.outstanding,
+            max_concurrent=self.max_concurrent,
+            completed=self.completed,
+        )
+
+
+class DoclingPool:
+    """
+    Least-outstanding-requests balancing over docling-serve instances.
+
+    Args:
+        urls: Convert endpoints of the instances
+        max_concurrent: Requests allowed in flight per instance
+    """
+
+    def __init__(self, urls: List[str], max_concurrent: int = 1):
+        if not urls:
+            raise ValueError("DoclingPool needs at least one URL")
+        self.instances = [DoclingInstance(url, max_concurrent) for url in urls]
+        self._condition = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self.instances)
+
+    def _pick(self, exclude: Set[str]) -> Optional[DoclingInstance]:
+        candidates = [i for i in self.instances if i.url not in exclude and i.outstanding < i.max_concurrent]
+        if not candidates:
+            return None
+        # Healthy instances first, then fewest outstanding, then fewest completed to spread load
+        candidates.sort(key=lambda i: (i.health.degraded(), i.outstanding, i.completed))
+        for instance in candidates:
+            if instance.health.available():
+                return instance
+        # Every circuit is open: trying one beats failing the upload
+        return candidates[0] if len(exclude) == 0 else None
+
+    def acquire(self, exclude: Optional[Set[str]] = None, timeout: Optional[float] = None) -> Optional[DoclingInstance]:
+        """
+        Reserve a slot on the best instance, waiting while all are at their cap.
+
+        Returns:
+            The instance, or None if every instance is excluded or unavailable
+
+        Raises:
+            DoclingPoolTimeout: All slots stayed busy for ``timeout`` seconds
+        """
+        exclude = exclude or set()
+        if all(i.url in exclude for i in self.instances):
+            return None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                instance = self._pick(exclude)
+                if instance is not None:
+                    instance.outstanding += 1
+                    DOCLING_OUTSTANDING.labels(instance.url).set(instance.outstanding)
+                    return instance
+                if not any(i.outstanding >= i.max_concurrent for i in self.instances if i.url not in exclude):
+                    return None  # free slots exist but every remaining instance is unhealthy
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise DoclingPoolTimeout(f"No docling-serve slot became free within {timeout:.0f}s")
+                self._condition.wait(remaining)
+
+    def release(self, instance: DoclingInstance, latency: float, ok: bool) -> None:
+        instance.health.record(latency, ok)
+        DOCLING_REQUESTS.labels(instance.url, "ok" if ok else "error").inc()
+        with self._condition:
+            instance.outstanding -= 1
+            instance.completed += 1
+            DOCLING_OUTSTANDING.labels(instance.url).set(instance.outstanding)
+            self._condition.notify_all()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._condition:
+            return [instance.snapshot() for instance in self.instances]
+
+
+def urls_from_env() -> List[str]:
+    urls = os.getenv("DOCLING_URLS")
+    if urls:
+        return [url.strip() for url in urls.split(",") if url.strip()]
+    return [os.getenv("DOCLING_URL", DEFAULT_DOCLING_URL)]
+
+
+# Pools are shared process-wide so per-instance caps hold across sessions
+_pools: Dict[Tuple[str, ...], DoclingPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(urls: Optional[List[str]] = None) -> DoclingPool:
+    key = tuple(urls or urls_from_env())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = DoclingPool(
+                list(key), max_concurrent=int(os.getenv("DOCLING_MAX_CONCURRENT", "1"))
+            )
+        return _pools[key]
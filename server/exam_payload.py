@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Serialized, precompressed exam payloads for the read endpoints.
+
+Exams are read far more often than they are generated, so the JSON body of
+/exam-data and /exam-bundle is built once per result version and kept with a
+gzip variant and a strong ETag. Repeat views are answered from memory, or
+with 304 when the client already has the current version.
+"""
+import os
+import gzip
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Hashable, Optional, Set, Tuple
+
+from metrics import record_cache
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+    print("exam_payload: orjson not installed, using the standard json module")
+
+
+# Bodies smaller than this are not worth compressing
+MIN_GZIP_BYTES = 1024
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON, with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_result_file(path: str) -> Any:
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+class Payload:
+    """A JSON body with its gzip variant and ETag."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.gzip = gzip.compress(body, compresslevel=6) if len(body) >= MIN_GZIP_BYTES else None
+
+    @property
+    def gzip_etag(self) -> str:
+        # A strong ETag must differ between encodings of the same resource
+        return self.etag[:-1] + '-gz"'
+
+    def not_modified(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.gzip_etag in tags
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[bytes, Dict[str, str]]:
+        """Return the body and headers for a client's Accept-Encoding."""
+        headers = {"Vary": "Accept-Encoding", "Cache-Control": "private, no-cache"}
+        if self.gzip is not None and "gzip" in (accept_encoding or "").lower():
+            headers["Content-Encoding"] = "gzip"
+            headers["ETag"] = self.gzip_etag
+            return self.gzip, headers
+        headers["ETag"] = self.etag
+        return self.body, headers
+
+
+class PayloadCache:
+    """
+    LRU of payloads keyed by (kind, session_id).
+
+    Each entry remembers the version it was built from (e.g. result file
+    mtime); a different version rebuilds it.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Hashable, Payload, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        kind: str,
+        session_id: str,
+        version: Hashable,
+        build: Callable[[], Any],
+        source: Optional[str] = None,
+    ) -> Payload:
+        """Return the cached payload for ``version``, building it if needed; ``source`` is the file it was read from."""
+        key = (kind, session_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                record_cache("exam_payload", True)
+                return entry[1]
+        record_cache("exam_payload", False)
+
+        payload = Payload(dumps(build()))
+        with self._lock:
+            self._entries[key] = (version, payload, source)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    def sources(self) -> Set[str]:
+        """Files that cached payloads were built from."""
+        with self._lock:
+            return {entry[2] for entry in self._entries.values() if entry[2]}
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == session_id]:
+                del self._entries[key]
+
+
+def file_version(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Printable exam and answer-key documents.
+
+Laying out a PDF for every download would put page layout in the request
+handler. Instead, after a result is saved it is rendered in a small worker
+pool and the artifacts are cached on disk under the hash of the result file,
+so /download-result serves them directly and a repaired result (new hash)
+gets new artifacts while unchanged ones are never rendered twice.
+
+PDF output uses PyMuPDF (``pip install pymupdf``); without it only HTML is
+available.
+"""
+import io
+import os
+import re
+import html
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from exam_payload import load_result_file
+from metrics import observe_stage, record_cache
+from storage_sweeper import atomic_write
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "artifacts")
+
+# Bump when the layout changes so cached artifacts are rendered again
+RENDER_VERSION = 1
+
+DOCUMENTS = ("exam", "answer_key")
+MEDIA_TYPES = {"html": "text/html; charset=utf-8", "pdf": "application/pdf"}
+
+# A4 in points
+PAGE_SIZE = (595, 842)
+PAGE_MARGIN = 50
+
+CSS = """
+body { font-family: serif; font-size: 11pt; line-height: 1.4; }
+h1 { font-size: 18pt; }
+h2 { font-size: 14pt; margin-top: 18pt; }
+h3 { font-size: 12pt; }
+.question { margin-bottom: 8pt; }
+.options { margin-top: 2pt; }
+table { border-collapse: collapse; width: 100%; }
+td, th { border: 1px solid #999; padding: 3pt; vertical-align: top; text-align: left; }
+@media print { .passage { page-break-after: always; } }
+"""
+
+
+def _inline(text: str) -> str:
+    """Escape text and render **bold** and *italic*."""
+    text = html.escape(text)
+    text = re.sub(r"\*\*(.+?)\*\*", r"<b>\1</b>", text)
+    return re.sub(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])", r"<i>\1</i>", text)
+
+
+def markdown_to_html(text: str) -> str:
+    """Render the Markdown subset used in passages: headings, paragraphs, lists and emphasis."""
+    parts, paragraph, items = [], [], []
+
+    def flush() -> None:
+        if paragraph:
+            parts.append(f"<p>{_inline(' '.join(paragraph))}</p>")
+            paragraph.clear()
+        if items:
+            parts.append("<ul>" + "".join(f"<li>{_inline(item)}</li>" for item in items) + "</ul>")
+            items.clear()
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        heading = re.match(r"(#{1,6})\s+(.*)", stripped)
+        item = re.match(r"[-*+]\s+(.*)", stripped)
+        if not stripped:
+            flush()
+        elif heading:
+            flush()
+            # Passage headings sit below the document's own h1/h2
+            level = min(len(heading.group(1)) + 2, 6)
+            parts.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+        elif item:
+            if paragraph:
+                flush()
+            items.append(item.group(1))
+        else:
+            if items:
+                flush()
+            paragraph.append(stripped)
+    flush()
+    return "\n".join(parts)
+
+
+def _title(result: Dict[str, Any]) -> str:
+    exam_type = str(result.get("exam_type") or "IELTS").upper()
+    if exam_type == "TOEIC" and result.get("part_number"):
+        return f"TOEIC Reading Part {result['part_number']}"
+    return f"{exam_type} Reading"
+
+
+def _question_groups(questions: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Consecutive questions of the same type, printed under one 'Questions x-y' heading."""
+    groups = []
+    for question in questions:
+        if groups and groups[-1][0].get("question_type") == question.get("question_type"):
+            groups[-1].append(question)
+        else:
+            groups.append([question])
+    return groups
+
+
+def _render_questions(questions: List[Dict[str, Any]]) -> str:
+    parts = []
+    for group in _question_groups(questions):
+        first, last = group[0].get("question_number"), group[-1].get("question_number")
+        numbers = f"Question {first}" if first == last else f"Questions {first}-{last}"
+        question_type = group[0].get("question_type")
+        parts.append(f"<h3>{html.escape(numbers)}{': ' + html.escape(question_type) if question_type else ''}</h3>")
+        for question in group:
+            text = _inline(str(question.get("question_text") or ""))
+            block = f"<div class=\"question\"><b>{html.escape(str(question.get('question_number', '')))}.</b> {text}"
+            options = question.get("options") or []
+            if options:
+                block += "<div class=\"options\">" + "<br>".join(_inline(str(o)) for o in options) + "</div>"
+            parts.append(block + "</div>")
+    return "\n".join(parts)
+
+
+def _answer_text(answer: Any) -> str:
+    """Answers are strings, but models sometimes return a list of letters."""
+    if isinstance(answer, list):
+        return ", ".join(str(a) for a in answer)
+    return str(answer or "")
+
+
+def render_html(result: Dict[str, Any], document: str = "exam") -> str:
+    """
+    Render a printable exam or answer key.
+
+    Args:
+        result: Parsed exam result
+        document: "exam" (passages and questions) or "answer_key" (answers and explanations)
+
+    Returns:
+        Complete HTML document
+    """
+    title = _title(result)
+    questions = [q for q in result.get("questions") or [] if isinstance(q, dict)]
+    body = []
+
+    if document == "answer_key":
+        body.append(f"<h1>{html.escape(title)}: Answer Key</h1>")
+        rows = "".join(
+            f"<tr><td>{html.escape(str(q.get('question_number', '')))}</td>"
+            f"<td><b>{_inline(_answer_text(q.get('correct_answer')))}</b></td>"
+            f"<td>{_inline(str(q.get('explanation') or ''))}</td></tr>"
+            for q in questions
+        )
+        body.append(f"<table><tr><th>No.</th><th>Answer</th><th>Explanation</th></tr>{rows}</table>")
+    else:
+        body.append(f"<h1>{html.escape(title)}</h1>")
+        passages = result.get("reading_passages")
+        if passages is None and isinstance(result.get("reading_passage"), dict):
+            passages = [result["reading_passage"]]
+        passages = [p for p in passages or [] if isinstance(p, dict)]
+        for passage in passages:
+            number = passage.get("passage_number")
+            heading = f"Reading Passage {number}" if number is not None else "Reading Passage"
+            if passage.get("title"):
+                heading += f": {passage['title']}"
+            related = [q for q in questions if str(q.get("passage_reference")) == str(number)]
+            body.append(f"<div class=\"passage\"><h2>{html.escape(heading)}</h2>")
+            if passage.get("document_type"):
+                body.append(f"<p><i>{html.escape(str(passage['document_type']))}</i></p>")
+            body.append(markdown_to_html(str(passage.get("content") or "")))
+            body.append("</div>")
+            # With several passages, questions follow the passage they refer to
+            if related and len(passages) > 1:
+                body.append(_render_questions(related))
+        unplaced = questions if len(passages) <= 1 else [
+            q for q in questions
+            if str(q.get("passage_reference")) not in {str(p.get("passage_number")) for p in passages}
+        ]
+        if unplaced:
+            body.append("<h2>Questions</h2>")
+            body.append(_render_questions(unplaced))
+
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+        f"<title>{html.escape(title)}</title><style>{CSS}</style></head>\n"
+        "<body>\n" + "\n".join(body) + "\n</body></html>\n"
+    )
+
+
+def html_to_pdf(document_html: str) -> bytes:
+    """Lay out the HTML on A4 pages with PyMuPDF."""
+    import fitz  # PyMuPDF
+
+    buffer = io.BytesIO()
+    writer = fitz.DocumentWriter(buffer)
+    story = fitz.Story(html=document_html, user_css=CSS)
+    mediabox = fitz.Rect(0, 0, *PAGE_SIZE)
+    where = mediabox + (PAGE_MARGIN, PAGE_MARGIN, -PAGE_MARGIN, -PAGE_MARGIN)
+    more = True
+    while more:
+        device = writer.begin_page(mediabox)
+        more, _ = story.place(where)
+        story.draw(device)
+        writer.end_page()
+    writer.close()
+    return buffer.getvalue()
+
+
+def pdf_available() -> bool:
+    try:
+        import fitz  # noqa: F401  PyMuPDF
+    except ImportError:
+        return False
+    return True
+
+
+class ArtifactRenderer:
+    """
+    Render exam artifacts in a worker pool and cache them by result hash.
+
+    Args:
+        cache_dir: Directory for rendered artifacts
+        workers: Renders running at the same time
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, workers: int = 2):
+        self.cache_dir = cache_dir
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        self.formats = [fmt for fmt in MEDIA_TYPES if fmt != "pdf" or pdf_available()]
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="render")
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def result_hash(result_file: str) -> str:
+        with open(result_file, "rb") as f:
+            return hashlib.sha256(f.read() + f"v{RENDER_VERSION}".encode()).hexdigest()[:32]
+
+    def path(self, digest: str, document: str, fmt: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.{document}.{fmt}")
+
+    def _render(self, result_file: str, digest: str) -> None:
+        result = load_result_file(result_file)
+        for document in DOCUMENTS:
+            with observe_stage("render_html"):
+                document_html = render_html(result, document)
+            html_path = self.path(digest, document, "html")
+            if not os.path.exists(html_path):
+                atomic_write(html_path, document_html)
+            pdf_path = self.path(digest, document, "pdf")
+            if "pdf" in self.formats and not os.path.exists(pdf_path):
+                with observe_stage("render_pdf"):
+                    atomic_write(pdf_path, html_to_pdf(document_html))
+
+    def _rendered(self, digest: str) -> bool:
+        return all(
+            os.path.exists(self.path(digest, document, fmt)) for document in DOCUMENTS for fmt in self.formats
+        )
+
+    def submit(self, result_file: str) -> Optional[Future]:
+        """Render the artifacts of a saved JSON result in the background; None if already cached."""
+        digest = self.result_hash(result_file)
+        with self._lock:
+            if digest in self._pending:
+                return self._pending[digest]
+            if self._rendered(digest):
+                return None
+            future = self._executor.submit(self._render, result_file, digest)
+            self._pending[digest] = future
+        future.add_done_callback(lambda _: self._forget(digest))
+        return future
+
+    def _forget(self, digest: str) -> None:
+        with self._lock:
+            self._pending.pop(digest, None)
+
+    def get(self, result_file: str, document: str, fmt: str, timeout: Optional[float] = None) -> str:
+        """
+        Path of an artifact, waiting for its render if it is not cached yet.
+
+        Raises:
+            ValueError: Unknown document or unavailable format
+        """
+        if document not in DOCUMENTS:
+            raise ValueError(f"Unknown document: {document} (expected one of {', '.join(DOCUMENTS)})")
+        if fmt not in self.formats:
+            raise ValueError(f"Unavailable format: {fmt} (available: {', '.join(self.formats)})")
+
+        path = self.path(self.result_hash(result_file), document, fmt)
+        if os.path.exists(path):
+            record_cache("artifact", True)
+            return path
+        record_cache("artifact", False)
+        future = self.submit(result_file)
+        if future is not None:
+            future.result(timeout=timeout)
+        return path
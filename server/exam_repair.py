@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+from typing import Dict, Any, List, Optional, Tuple
+
+from exam_validator import IELTS_QUESTION_RANGE, TOEIC_PART_RULES, count_words, load_schema
+
+
+# Question count per IELTS question category (5-4-5)
+IELTS_CATEGORY_COUNTS = {1: 5, 2: 4, 3: 5}
+
+# Passage each TOEIC Part 7 question belongs to
+TOEIC_PART7_LAYOUT = {
+    **{n: 1 for n in range(147, 150)},
+    **{n: 2 for n in range(150, 153)},
+    **{n: 3 for n in range(153, 156)},
+    **{n: 4 for n in range(156, 159)},
+    **{n: 5 for n in range(159, 162)},
+    **{n: "6a" for n in range(162, 167)},
+}
+
+# How much of the source document is sent along with a repair prompt
+REPAIR_SOURCE_WORDS = 1500
+
+
+def _source_excerpt(markdown_content: Optional[str], limit: int = REPAIR_SOURCE_WORDS) -> str:
+    if not markdown_content:
+        return ""
+    words = markdown_content.split()
+    return " ".join(words[:limit])
+
+
+def _question_item_schema(exam_type: str) -> Dict[str, Any]:
+    schema = load_schema(exam_type) or {}
+    return schema.get("properties", {}).get("questions", {}).get("items", {"type": "object"})
+
+
+def _passage_item_schema(exam_type: str) -> Dict[str, Any]:
+    schema = load_schema(exam_type) or {}
+    return schema.get("properties", {}).get("reading_passages", {}).get("items", {"type": "object"})
+
+
+def plan_repairs(result: Dict[str, Any], report: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Turn a validation report into targeted repair tasks.
+
+    Only the rule errors that can be fixed in isolation are planned; schema
+    errors are left to a full regeneration. Questions whose answer is not
+    grounded in the passage (a warning) are reviewed per passage.
+
+    Returns:
+        List of tasks, each with a ``kind`` of extend_passage, add_questions,
+        trim_questions or review_questions
+    """
+    tasks = []
+    exam_type = report.get("exam_type")
+    for error in report.get("errors", []):
+        details = error.get("details", {})
+        if error["code"] == "passage_too_short" and isinstance(result.get("reading_passages"), list):
+            tasks.append({
+                "kind": "extend_passage",
+                "passage_index": details["passage_index"],
+                "min_words": details["min_words"],
+            })
+        elif error["code"] == "question_count":
+            if exam_type == "IELTS":
+                tasks.extend(_plan_ielts_questions(result, details))
+            elif exam_type == "TOEIC":
+                tasks.extend(_plan_toeic_questions(result, details))
+
+    reviews = {}
+    for warning in report.get("warnings", []):
+        if warning["code"] == "answer_not_grounded":
+            details = warning["details"]
+            review = reviews.setdefault(details["passage_number"], {
+                "kind": "review_questions",
+                "passage_number": details["passage_number"],
+                "questions": [],
+            })
+            review["questions"].append({"question_number": details["question_number"], "reason": warning["reason"]})
+    tasks.extend(reviews.values())
+    return tasks
+
+
+def _as_int(value: Any, default: int = 0) -> int:
+    """Question numbers and categories are ints, but models sometimes return "2"."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _plan_ielts_questions(result: Dict[str, Any], details: Dict[str, Any]) -> List[Dict[str, Any]]:
+    questions = result.get("questions") or []
+    if details["found"] > details["expected_max"]:
+        return [{"kind": "trim_questions"}]
+
+    by_category = {}
+    for q in questions:
+        by_category.setdefault(_as_int(q.get("question_category")), []).append(q)
+
+    tasks = []
+    for category, expected in IELTS_CATEGORY_COUNTS.items():
+        existing = by_category.get(category, [])
+        if len(existing) < expected:
+            tasks.append({
+                "kind": "add_questions",
+                "count": expected - len(existing),
+                "category": category,
+                "question_type": existing[0].get("question_type") if existing else None,
+            })
+    return tasks
+
+
+def _plan_toeic_questions(result: Dict[str, Any], details: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if details["found"] > details["expected"]:
+        return [{"kind": "trim_questions"}]
+
+    part_number = result.get("part_number")
+    missing = details.get("missing_numbers") or []
+    if part_number == 7 and missing:
+        # One task per passage, so each prompt only carries the passage it needs
+        groups = {}
+        for number in missing:
+            groups.setdefault(TOEIC_PART7_LAYOUT.get(number), []).append(number)
+        return [
+            {"kind": "add_questions", "numbers": numbers, "passage_number": passage_number}
+            for passage_number, numbers in groups.items()
+        ]
+
+    if part_number == 6:
+        counts = {}
+        for q in result.get("questions") or []:
+            counts[q.get("passage_reference")] = counts.get(q.get("passage_reference"), 0) + 1
+        tasks = []
+        for passage in result.get("reading_passages") or []:
+            found = counts.get(passage.get("passage_number"), 0)
+            if found < 4:
+                tasks.append({
+                    "kind": "add_questions",
+                    "count": 4 - found,
+                    "passage_number": passage.get("passage_number"),
+                })
+        if tasks:
+            return tasks
+
+    return [{"kind": "add_questions", "count": details["expected"] - details["found"]}]
+
+
+def _find_passages(result: Dict[str, Any], passage_number: Any) -> List[Dict[str, Any]]:
+    """Return the passages a task refers to; a double-passage set ("6a") also includes "6b"."""
+    if passage_number is None:
+        return []
+    wanted = {str(passage_number)}
+    if isinstance(passage_number, str) and passage_number.endswith("a"):
+        wanted.add(passage_number[:-1] + "b")
+    return [
+        p for p in result.get("reading_passages") or []
+        if str(p.get("passage_number")) in wanted
+    ]
+
+
+def _existing_questions_text(questions: List[Dict[str, Any]]) -> str:
+    return "\n".join(
+        f"- {q.get('question_number')}: {q.get('question_text', '')}" for q in questions
+    ) or "(none)"
+
+
+def build_repair_prompt(
+    task: Dict[str, Any],
+    result: Dict[str, Any],
+    exam_type: str,
+    difficulty: str,
+    markdown_content: Optional[str] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Create the prompt and response schema for one repair task.
+
+    Returns:
+        Tuple of (prompt, schema)
+    """
+    if task["kind"] == "extend_passage":
+        return _extend_passage_prompt(task, result, difficulty, markdown_content)
+    if task["kind"] == "review_questions":
+        return _review_questions_prompt(task, result, exam_type, difficulty)
+    if exam_type == "IELTS":
+        return _ielts_questions_prompt(task, result, difficulty)
+    return _toeic_questions_prompt(task, result, difficulty, markdown_content)
+
+
+def _extend_passage_prompt(
+    task: Dict[str, Any], result: Dict[str, Any], difficulty: str, markdown_content: Optional[str]
+) -> Tuple[str, Dict[str, Any]]:
+    passage = result["reading_passages"][task["passage_index"]]
+    questions = [
+        q for q in result.get("questions") or []
+        if q.get("passage_reference") in (None, passage.get("passage_number"))
+    ]
+    answers = "\n".join(
+        f"- {q.get('question_text', '')} -> {q.get('correct_answer')}" for q in questions
+    )
+    prompt = f"""
+Exam type: IELTS
+Difficulty: {difficulty}
+
+The following IELTS reading passage is too short. It has {count_words(passage['content'])} words
+and must have AT LEAST {task['min_words']} words.
+
+Extend the passage by adding new paragraphs or developing existing ones.
+- Keep every existing sentence that the questions below depend on, so all answers stay correct
+- Keep the title, style and Markdown format of the passage
+- Only use facts from the source excerpt, without any fabrication
+- Return the complete extended passage in the "content" field
+
+Questions and answers that must remain valid:
+{answers or "(none)"}
+
+Passage:
+
+{passage['content']}
+
+Source excerpt:
+
+{_source_excerpt(markdown_content)}
+"""
+    schema = {
+        "type": "object",
+        "required": ["content"],
+        "properties": {
+            "content": {"type": "string", "description": "Complete extended passage in Markdown"},
+        },
+    }
+    return prompt, schema
+
+
+def _ielts_questions_prompt(
+    task: Dict[str, Any], result: Dict[str, Any], difficulty: str
+) -> Tuple[str, Dict[str, Any]]:
+    passages = result.get("reading_passages") or []
+    passage = passages[0] if passages else {}
+    same_category = [
+        q for q in result.get("questions") or [] if _as_int(q.get("question_category")) == task["category"]
+    ]
+    type_instruction = (
+        f'All new questions must be of type "{task["question_type"]}".'
+        if task.get("question_type")
+        else "Choose one question type that is not used by the other categories."
+    )
+    prompt = f"""
+Exam type: IELTS
+Difficulty: {difficulty}
+
+An IELTS reading exam is missing questions. Create EXACTLY {task['count']} new questions
+for question category {task['category']} about the passage below.
+{type_instruction}
+- Set "question_category" to {task['category']} and "passage_reference" to {passage.get('passage_number', 1)}
+- Do not repeat the existing questions listed below
+- Each question MUST include an explanation field that explains why the answer is correct
+
+Existing questions in this category:
+{_existing_questions_text(same_category)}
+
+Passage:
+
+{passage.get('content', '')}
+"""
+    schema = {
+        "type": "object",
+        "required": ["questions"],
+        "properties": {
+            "questions": {"type": "array", "items": _question_item_schema("IELTS")},
+        },
+    }
+    return prompt, schema
+
+
+def _review_questions_prompt(
+    task: Dict[str, Any], result: Dict[str, Any], exam_type: str, difficulty: str
+) -> Tuple[str, Dict[str, Any]]:
+    passages = _find_passages(result, task["passage_number"]) or (result.get("reading_passages") or [])[:1]
+    reasons = {item["question_number"]: item["reason"] for item in task["questions"]}
+    reviewed = [q for q in result.get("questions") or [] if q.get("question_number") in reasons]
+    problems = "\n".join(
+        f"- Question {q.get('question_number')} ({q.get('question_type')}): {q.get('question_text', '')}\n"
+        f"  Options: {q.get('options') or '(none)'}\n"
+        f"  Answer: {q.get('correct_answer')}\n"
+        f"  Problem: {reasons[q.get('question_number')]}"
+        for q in reviewed
+    )
+    prompt = f"""
+Exam type: {exam_type}
+Difficulty: {difficulty}
+
+An automatic check found that the answers of the questions below are not supported by the passage.
+Correct EACH of them so that it is answerable from the passage and its correct_answer is right:
+- For completion questions, the answer must be words copied exactly from the passage
+- For True/False/Not Given and Yes/No/Not Given, the statement must refer to what the passage says
+- For questions with options, the answer must be the letter of one of the options
+- Keep question_number, question_type, question_category and passage_reference unchanged
+- Return exactly these {len(reviewed)} questions, with an explanation quoting the passage
+
+Questions to correct:
+{problems}
+
+Passage:
+
+{passages[0].get('content', '') if passages else ''}
+"""
+    schema = {
+        "type": "object",
+        "required": ["questions"],
+        "properties": {
+            "questions": {"type": "array", "items": _question_item_schema(exam_type)},
+        },
+    }
+    return prompt, schema
+
+
+def _toeic_questions_prompt(
+    task: Dict[str, Any], result: Dict[str, Any], difficulty: str, markdown_content: Optional[str]
+) -> Tuple[str, Dict[str, Any]]:
+    part_number = result.get("part_number")
+    passages = _find_passages(result, task.get("passage_number"))
+    related = [
+        q for q in result.get("questions") or []
+        if task.get("passage_number") is None
+        or str(q.get("passage_reference")) in {str(p.get("passage_number")) for p in passages}
+    ]
+
+    if task.get("numbers"):
+        count_instruction = (
+            f"Create EXACTLY {len(task['numbers'])} questions numbered "
+            f"{', '.join(str(n) for n in task['numbers'])}."
+        )
+    else:
+        count_instruction = f"Create EXACTLY {task['count']} new questions."
+
+    if passages:
+        context = "\n\n".join(
+            f"Passage {p.get('passage_number')} ({p.get('document_type', '')}):\n\n{p.get('content', '')}"
+            for p in passages
+        )
+        passage_instruction = "- Every question must be answerable from the passage(s) below"
+    elif task.get("passage_number") is not None:
+        # The passage itself is missing, so it has to be written as well
+        context = _source_excerpt(markdown_content)
+        passage_instruction = (
+            f'- Also create the missing passage {task["passage_number"]} in "reading_passages", '
+            f"based on the source excerpt below"
+        )
+    else:
+        context = _source_excerpt(markdown_content)
+        passage_instruction = "- Base the questions on the source excerpt below"
+
+    prompt = f"""
+Exam type: TOEIC
+Part: {part_number}
+Difficulty: {difficulty}
+
+A TOEIC Reading Part {part_number} exam is missing questions. {count_instruction}
+{passage_instruction}
+- Set "part" to {part_number} on every question
+- Set "passage_reference" to the passage_number the question is about (null for Part 5)
+- All questions must have exactly 4 options (A, B, C, D) and a detailed explanation
+- Do not repeat the existing questions listed below
+
+Existing questions:
+{_existing_questions_text(related)}
+
+{context}
+"""
+    schema = {
+        "type": "object",
+        "required": ["questions"],
+        "properties": {
+            "reading_passages": {"type": "array", "items": _passage_item_schema("TOEIC")},
+            "questions": {"type": "array", "items": _question_item_schema("TOEIC")},
+        },
+    }
+    return prompt, schema
+
+
+def apply_repair(result: Dict[str, Any], task: Dict[str, Any], response: Dict[str, Any]) -> None:
+    """Merge the response for one repair task back into the result."""
+    if task["kind"] == "extend_passage":
+        passage = result["reading_passages"][task["passage_index"]]
+        content = response.get("content")
+        # Never replace a passage with a shorter one
+        if isinstance(content, str) and count_words(content) > count_words(passage["content"]):
+            passage["content"] = content
+            passage["word_count"] = count_words(content)
+        return
+
+    new_questions = [q for q in response.get("questions") or [] if isinstance(q, dict)]
+    if task["kind"] == "review_questions":
+        numbers = {item["question_number"] for item in task["questions"]}
+        corrected = {q.get("question_number"): q for q in new_questions if q.get("question_number") in numbers}
+        questions = result.get("questions") or []
+        for index, q in enumerate(questions):
+            if q.get("question_number") in corrected:
+                # The model may not change where the question sits in the exam
+                replacement = dict(corrected[q["question_number"]])
+                for key in ("question_number", "question_category", "passage_reference"):
+                    if key in q:
+                        replacement[key] = q[key]
+                questions[index] = replacement
+        return
+
+    if task.get("category") is not None:
+        for q in new_questions:
+            q["question_category"] = task["category"]
+    if task.get("numbers"):
+        for q, number in zip(new_questions, task["numbers"]):
+            q["question_number"] = number
+        new_questions = new_questions[:len(task["numbers"])]
+    elif task.get("count"):
+        new_questions = new_questions[:task["count"]]
+
+    existing_passages = {str(p.get("passage_number")) for p in result.get("reading_passages") or []}
+    for passage in response.get("reading_passages") or []:
+        if isinstance(passage, dict) and str(passage.get("passage_number")) not in existing_passages:
+            result.setdefault("reading_passages", []).append(passage)
+
+    result.setdefault("questions", []).extend(new_questions)
+
+
+def finalize_questions(result: Dict[str, Any], exam_type: str) -> None:
+    """
+    Restore a consistent question order after merging, and trim questions
+    beyond what the validator accepts.
+    """
+    questions = result.get("questions")
+    if not isinstance(questions, list):
+        return
+
+    if exam_type == "IELTS":
+        questions.sort(key=lambda q: (_as_int(q.get("question_category")), _as_int(q.get("question_number"))))
+        # Only an exam above the accepted range is trimmed, starting with the
+        # last questions of the categories that have more than their 5-4-5 share
+        surplus = len(questions) - IELTS_QUESTION_RANGE[1]
+        if surplus > 0:
+            counts = {}
+            for q in questions:
+                category = _as_int(q.get("question_category"))
+                counts[category] = counts.get(category, 0) + 1
+            dropped = set()
+            for index in range(len(questions) - 1, -1, -1):
+                category = _as_int(questions[index].get("question_category"))
+                if surplus > 0 and counts[category] > IELTS_CATEGORY_COUNTS.get(category, 0):
+                    dropped.add(index)
+                    counts[category] -= 1
+                    surplus -= 1
+            questions = [q for index, q in enumerate(questions) if index not in dropped][:IELTS_QUESTION_RANGE[1]]
+        # Renumber so merged questions continue the sequence
+        for number, q in enumerate(questions, start=1):
+            q["question_number"] = number
+        result["questions"] = questions
+    else:
+        rules = TOEIC_PART_RULES.get(result.get("part_number"))
+        questions.sort(key=lambda q: _as_int(q.get("question_number")))
+        if rules:
+            result["questions"] = questions[:rules["questions"]]
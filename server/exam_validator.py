@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+import os
+import json
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+from answer_grounding import verify_answers
+
+try:
+    from jsonschema import Draft7Validator
+except ImportError:  # pragma: no cover - optional dependency
+    Draft7Validator = None
+    print("exam_validator: jsonschema not installed, only exam rule checks will run")
+
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema")
+
+SCHEMA_FILES = {
+    "IELTS": "ielts_schema.json",
+    "TOEIC": "toeic_schema.json",
+}
+
+# Minimum passage length per IELTS passage type
+IELTS_MIN_WORDS = {1: 700, 2: 700, 3: 750}
+IELTS_QUESTION_RANGE = (14, 16)
+
+# Expected structure per TOEIC part; only Part 7 prescribes question numbers in the prompt
+TOEIC_PART_RULES = {
+    5: {"passages": 0, "questions": 30, "first_question": None},
+    6: {"passages": 4, "questions": 16, "first_question": None},
+    7: {"passages": 7, "questions": 20, "first_question": 147},
+}
+
+
+@lru_cache(maxsize=None)
+def load_schema(exam_type: str) -> Optional[Dict[str, Any]]:
+    """Read and parse the schema for an exam type once.
+
+    The returned dict is shared between callers and must not be modified.
+    """
+    filename = SCHEMA_FILES.get(exam_type.upper())
+    if not filename:
+        return None
+    with open(os.path.join(SCHEMA_DIR, filename), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def get_validator(exam_type: str):
+    """Return the compiled validator for an exam type, or None if unavailable."""
+    if Draft7Validator is None:
+        return None
+    schema = load_schema(exam_type)
+    if schema is None:
+        return None
+    Draft7Validator.check_schema(schema)
+    return Draft7Validator(schema)
+
+
+def preload_validators() -> None:
+    """Load and compile every known schema, so requests never pay for it."""
+    for exam_type in SCHEMA_FILES:
+        try:
+            get_validator(exam_type)
+        except Exception as e:
+            print(f"exam_validator: Failed to compile {exam_type} schema: {e}")
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def _format_path(parts) -> str:
+    """Render a path as a JSON pointer, e.g. /questions/3/options."""
+    return "/" + "/".join(str(p) for p in parts) if parts else "/"
+
+
+def _issue(path: str, reason: str, code: str, severity: str = "error", **details: Any) -> Dict[str, Any]:
+    issue = {"path": path, "reason": reason, "code": code, "severity": severity}
+    if details:
+        issue["details"] = details
+    return issue
+
+
+def _schema_issues(exam_type: str, result: Dict[str, Any], partial: bool) -> List[Dict[str, Any]]:
+    validator = get_validator(exam_type)
+    if validator is None:
+        return []
+
+    issues = []
+    for error in validator.iter_errors(result):
+        # Partial (streamed) results are allowed to miss fields that have not arrived yet
+        if partial and error.validator in ("required", "minItems"):
+            continue
+        issues.append(_issue(_format_path(error.absolute_path), error.message, f"schema.{error.validator}"))
+    return issues
+
+
+def _passage_number(passage: Dict[str, Any], passage_type: Optional[str]) -> int:
+    """Resolve the IELTS passage type (1-3) from the request or the passage itself."""
+    for value in (passage_type, passage.get("passage_type"), passage.get("passage_number")):
+        if value is None:
+            continue
+        digits = "".join(ch for ch in str(value) if ch.isdigit())
+        if digits and int(digits) in IELTS_MIN_WORDS:
+            return int(digits)
+    return 1
+
+
+def _check_ielts_rules(
+    result: Dict[str, Any], passage_type: Optional[str]
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    issues = []
+    stats = {}
+
+    passages = result.get("reading_passages")
+    if passages is None and isinstance(result.get("reading_passage"), dict):
+        passages = [result["reading_passage"]]
+    if isinstance(passages, list):
+        for index, passage in enumerate(passages):
+            if not isinstance(passage, dict) or not isinstance(passage.get("content"), str):
+                continue
+            words = count_words(passage["content"])
+            min_words = IELTS_MIN_WORDS[_passage_number(passage, passage_type)]
+            stats[f"passage_{index}_words"] = words
+            if words < min_words:
+                issues.append(_issue(
+                    f"/reading_passages/{index}/content",
+                    f"Passage has {words} words, less than the minimum of {min_words}",
+                    "passage_too_short",
+                    passage_index=index, word_count=words, min_words=min_words,
+                ))
+
+    questions = result.get("questions")
+    if isinstance(questions, list):
+        low, high = IELTS_QUESTION_RANGE
+        stats["question_count"] = len(questions)
+        if not low <= len(questions) <= high:
+            issues.append(_issue(
+                "/questions",
+                f"There are {len(questions)} questions, expected {low}-{high}",
+                "question_count",
+                found=len(questions), expected_min=low, expected_max=high,
+            ))
+
+        if os.getenv("GROUNDING_CHECK", "true").lower() == "true":
+            grounding = verify_answers(result)
+            stats["grounding_checked"] = grounding["checked"]
+            stats["grounding_suspects"] = len(grounding["suspects"])
+            # Heuristic, so a warning: the exam stays valid but the question is reviewed on repair
+            for suspect in grounding["suspects"]:
+                issues.append(_issue(
+                    f"/questions/{suspect['question_index']}",
+                    f"Question {suspect['question_number']}: {suspect['reason']}",
+                    "answer_not_grounded",
+                    "warning",
+                    question_number=suspect["question_number"],
+                    passage_number=suspect["passage_number"],
+                    check=suspect["check"],
+                ))
+    return issues, stats
+
+
+def _check_toeic_rules(result: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    issues = []
+    stats = {}
+    part_number = result.get("part_number")
+    rules = TOEIC_PART_RULES.get(part_number)
+    if rules is None:
+        return issues, stats
+
+    passages = result.get("reading_passages")
+    if isinstance(passages, list):
+        stats["passage_count"] = len(passages)
+        if len(passages) != rules["passages"]:
+            issues.append(_issue(
+                "/reading_passages",
+                f"Part {part_number} should have {rules['passages']} passages, found {len(passages)}",
+                "passage_count",
+                found=len(passages), expected=rules["passages"],
+            ))
+
+    questions = result.get("questions")
+    if isinstance(questions, list):
+        stats["question_count"] = len(questions)
+        if len(questions) != rules["questions"]:
+            missing_numbers = []
+            if rules["first_question"]:
+                present = {q.get("question_number") for q in questions if isinstance(q, dict)}
+                expected_numbers = range(rules["first_question"], rules["first_question"] + rules["questions"])
+                missing_numbers = [n for n in expected_numbers if n not in present]
+            issues.append(_issue(
+                "/questions",
+                f"Part {part_number} should have {rules['questions']} questions, found {len(questions)}",
+                "question_count",
+                found=len(questions), expected=rules["questions"],
+                missing_numbers=missing_numbers,
+            ))
+        for index, q in enumerate(questions):
+            if isinstance(q, dict) and q.get("part") != part_number:
+                issues.append(_issue(
+                    f"/questions/{index}/part",
+                    f"Question {q.get('question_number', '?')} has part {q.get('part')}, expected {part_number}",
+                    "question_part",
+                ))
+    return issues, stats
+
+
+def validate_exam(
+    result: Any,
+    exam_type: Optional[str] = None,
+    passage_type: Optional[str] = None,
+    partial: bool = False,
+) -> Dict[str, Any]:
+    """
+    Validate an LLM exam result against its compiled schema and the exam rules.
+
+    Args:
+        result: Parsed JSON result
+        exam_type: Exam type (IELTS, TOEIC), detected from the result if omitted
+        passage_type: Requested passage type, used for IELTS length rules
+        partial: Result is still being generated; skip missing-field and count checks
+
+    Returns:
+        Report with ``valid``, ``errors``, ``warnings`` and ``stats``
+    """
+    if not isinstance(result, dict):
+        return {
+            "valid": False,
+            "exam_type": exam_type,
+            "errors": [_issue("/", "Result is not a JSON object", "type")],
+            "warnings": [],
+            "stats": {},
+        }
+
+    exam_type = (exam_type or result.get("exam_type") or "IELTS").upper()
+    issues = _schema_issues(exam_type, result, partial)
+    stats = {}
+
+    if not partial:
+        if exam_type == "IELTS":
+            rule_issues, stats = _check_ielts_rules(result, passage_type)
+        elif exam_type == "TOEIC":
+            rule_issues, stats = _check_toeic_rules(result)
+        else:
+            rule_issues = [_issue("/", f"Unknown exam type: {exam_type}", "exam_type", "warning")]
+        issues.extend(rule_issues)
+
+    errors = [i for i in issues if i["severity"] == "error"]
+    warnings = [i for i in issues if i["severity"] != "error"]
+    return {
+        "valid": not errors,
+        "exam_type": exam_type,
+        "errors": errors,
+        "warnings": warnings,
+        "stats": stats,
+    }
@@ -2,11 +2,22 @@ import os
 from typing import Dict, List, Any, Optional, Union, TypeVar
 import json
 from langchain_google_genai import GoogleGenerativeAI
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
 from langchain_google_genai import HarmBlockThreshold, HarmCategory
 from dotenv import load_dotenv
 import re
+import time
+from metrics import observe_stage, LLM_RETRIES, LLM_BUDGET_ACTIONS
+from llm_backends import (
+    DEFAULT_RECORD_DIR,
+    RecordStore,
+    RecordingBackend,
+    ReplayBackend,
+    parse_latency,
+)
+from llm_hedging import HedgedBackend
+from llm_router import LLMRouter, OpenAICompatibleBackend, Provider, load_provider_configs
+from llm_structured import GeminiBackend, compact_schema, genai, supports_structured_output
+from usage_ledger import BudgetExceededError, estimated_usage, get_ledger, start_call
 
 # Tải biến môi trường từ file .env
 load_dotenv()
@@ -14,6 +25,27 @@ load_dotenv()
 T = TypeVar("T")
 
 
+def strip_json_response(response: str) -> str:
+    """Lấy phần JSON từ câu trả lời của model (bỏ markdown fence và comments)."""
+    # Xử lý kết quả, đảm bảo lấy phần JSON
+    result_text = response.strip()
+
+    # Xóa các ký tự markdown JSON nếu có
+    if result_text.startswith("```json"):
+        result_text = result_text[7:]
+    elif result_text.startswith("```"):
+        result_text = result_text[3:]
+    if result_text.endswith("```"):
+        result_text = result_text[:-3]
+
+    result_text = result_text.strip()
+
+    # Xóa các comments nếu có
+    result_text = re.sub(r"//.*", "", result_text)
+    result_text = re.sub(r"/\*.*?\*/", "", result_text, flags=re.DOTALL)
+    return result_text
+
+
 class LLM:
     """Class đơn giản để làm việc với Google Gemini."""
 
@@ -27,8 +59,16 @@ class LLM:
         api_key: str = None,
         system_prompt: str = None,
         system_prompt_file: str = None,
+        backend: str = None,
+        hedge: bool = None,
+        structured_output: str = None,
     ):
         # Lấy giá trị từ tham số hoặc biến môi trường
+        self.backend = backend or os.getenv("LLM_BACKEND", "gemini")
+        # native: response schema + system instruction when the backend supports them,
+        # compact: minified schema in the prompt, prompt: indented schema in the prompt
+        self.structured_output = (structured_output or os.getenv("LLM_STRUCTURED_OUTPUT", "native")).lower()
+        self.hedge = hedge if hedge is not None else os.getenv("LLM_HEDGE", "false").lower() == "true"
         self.model_name = model_name or os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
         self.temperature = temperature or float(os.getenv("GEMINI_TEMPERATURE", "0.7"))
         self.max_output_tokens = max_output_tokens or int(
@@ -52,6 +92,17 @@ class LLM:
 
         # Initialize model
         self._llm = self._initialize_llm()
+        self.native_structured_output = (
+            self.structured_output == "native" and supports_structured_output(self._llm)
+        )
+
+        # Usage of every call is recorded in the ledger under this session (set by the server)
+        self.usage_session: Optional[str] = None
+        self.ledger = get_ledger()
+        # refuse: raise BudgetExceededError, downgrade: continue on LLM_DOWNGRADE_MODEL (gemini only)
+        self.budget_action = os.getenv("LLM_BUDGET_ACTION", "refuse").lower()
+        self.downgrade_model = os.getenv("LLM_DOWNGRADE_MODEL", "gemini-1.5-flash-8b")
+        self._downgraded_llm = None
 
     def _load_system_prompt(self, file_path: str) -> Optional[str]:
         """Đọc system prompt từ file."""
@@ -62,9 +113,83 @@ class LLM:
             print(f"Không thể đọc file system prompt: {e}")
             return None
 
-    def _initialize_llm(self) -> GoogleGenerativeAI:
-        """Initialize Google Gemini model."""
-        if not self.api_key:
+    def _initialize_llm(self) -> Any:
+        """
+        Initialize the model backend selected by ``backend`` / LLM_BACKEND.
+
+        - gemini: Google Gemini (default)
+        - fake: deterministic local stand-in, see benchmarks/fake_llm.py
+        - record: call LLM_RECORD_BACKEND (default gemini) and save every response to LLM_RECORD_DIR
+        - replay: serve responses saved in LLM_RECORD_DIR, sleeping per LLM_REPLAY_LATENCY
+          (none, recorded or seconds)
+        - router: route between the providers in LLM_PROVIDERS, see llm_router.py
+
+        With ``hedge`` / LLM_HEDGE=true, slow calls are hedged with a second request
+        (see llm_hedging.py).
+        """
+        backend = self._create_backend(self.backend)
+        if self.hedge:
+            name = self.model_name if self.backend == "gemini" else self.backend
+            return HedgedBackend(backend, name=name)
+        return backend
+
+    def _create_backend(self, backend: str) -> Any:
+        if backend == "fake":
+            from benchmarks.fake_llm import FakeLLM
+            return FakeLLM.from_env()
+
+        if backend in ("record", "replay"):
+            store = RecordStore(os.getenv("LLM_RECORD_DIR", DEFAULT_RECORD_DIR))
+            if backend == "record":
+                inner = self._create_backend(os.getenv("LLM_RECORD_BACKEND", "gemini"))
+                return RecordingBackend(inner, store, model_name=self.model_name, mode=self.structured_output)
+            replay = ReplayBackend(store, latency=parse_latency(os.getenv("LLM_REPLAY_LATENCY")))
+            if replay.mode is not None:
+                # Build prompts the way they were built while recording
+                self.structured_output = replay.mode
+            return replay
+
+        if backend == "router":
+            providers = [
+                Provider(
+                    config.get("name") or config.get("model") or config["type"],
+                    self._create_provider(config),
+                    priority=config.get("priority", index),
+                )
+                for index, config in enumerate(load_provider_configs())
+            ]
+            return LLMRouter(providers, slow_factor=float(os.getenv("LLM_ROUTER_SLOW_FACTOR", "3")))
+
+        if backend != "gemini":
+            raise ValueError(f"Unknown LLM backend: {backend}")
+        return self._initialize_gemini()
+
+    def _create_provider(self, config: Dict[str, Any]) -> Any:
+        """Create the backend for one entry of the router configuration."""
+        provider_type = config.get("type", "gemini")
+        if provider_type == "gemini":
+            return self._initialize_gemini(
+                model_name=config.get("model"),
+                api_key=os.getenv(config["api_key_env"]) if config.get("api_key_env") else None,
+            )
+        if provider_type == "openai":
+            return OpenAICompatibleBackend(
+                base_url=config["base_url"],
+                model=config["model"],
+                api_key=os.getenv(config["api_key_env"]) if config.get("api_key_env") else None,
+                temperature=config.get("temperature", self.temperature),
+                max_tokens=config.get("max_tokens", self.max_output_tokens),
+                timeout=config.get("timeout", 300),
+                json_schema=config.get("json_schema", False),
+            )
+        return self._create_backend(provider_type)
+
+    def _initialize_gemini(
+        self, model_name: Optional[str] = None, api_key: Optional[str] = None
+    ) -> Any:
+        """Initialize Google Gemini model (the native SDK backend in structured-output mode native)."""
+        api_key = api_key or self.api_key
+        if not api_key:
             raise ValueError(
                 "API key không được cung cấp và không tìm thấy trong biến môi trường GOOGLE_API_KEY"
             )
@@ -77,24 +202,92 @@ class LLM:
             HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
         }
 
+        if self.structured_output == "native" and genai is not None:
+            return GeminiBackend(
+                model=model_name or self.model_name,
+                api_key=api_key,
+                temperature=self.temperature,
+                max_output_tokens=self.max_output_tokens,
+                top_p=self.top_p,
+                top_k=self.top_k,
+                safety_settings=safety_settings,
+            )
+
         return GoogleGenerativeAI(
-            model=self.model_name,
+            model=model_name or self.model_name,
             temperature=self.temperature,
             max_output_tokens=self.max_output_tokens,
             top_p=self.top_p,
             top_k=self.top_k,
-            google_api_key=self.api_key,
+            google_api_key=api_key,
             safety_settings=safety_settings,
         )
 
+    def _budget_backend(self) -> Any:
+        """
+        Backend for the next call: the configured one while within budget, the
+        downgrade model once a budget is used up and LLM_BUDGET_ACTION=downgrade.
+
+        Raises:
+            BudgetExceededError: A budget is used up and the call cannot be downgraded
+        """
+        reason = self.ledger.check(self.usage_session)
+        if reason is None:
+            return self._llm
+        if self.budget_action == "downgrade" and self.backend == "gemini":
+            if self._downgraded_llm is None:
+                print(f"llm: {reason}, downgrading to {self.downgrade_model}")
+                self._downgraded_llm = self._initialize_gemini(model_name=self.downgrade_model)
+            LLM_BUDGET_ACTIONS.labels("downgrade").inc()
+            return self._downgraded_llm
+        LLM_BUDGET_ACTIONS.labels("refuse").inc()
+        raise BudgetExceededError(reason)
+
     def invoke(
-        self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        use_system_prompt: bool = True,
+        job: str = "llm",
+        attempt: int = 0,
+        **kwargs: Any,
     ) -> str:
-        """Gọi model với prompt."""
-        if self.system_prompt:
-            prompt = f"{self.system_prompt}\n\n{prompt}"
-
-        return self._llm.invoke(prompt, stop=stop, **kwargs)
+        """
+        Gọi model với prompt (use_system_prompt=False cho các tác vụ phụ như tóm tắt).
+
+        ``job`` and ``attempt`` (retry number) are recorded with the call's token usage.
+        """
+        if self.system_prompt and use_system_prompt:
+            if self.native_structured_output:
+                # Sent as system instruction instead of being repeated in every prompt
+                kwargs["system"] = self.system_prompt
+            else:
+                prompt = f"{self.system_prompt}\n\n{prompt}"
+
+        backend = self._budget_backend()
+        model = self.downgrade_model if backend is self._downgraded_llm else (
+            self.model_name if self.backend == "gemini" else self.backend
+        )
+        reported = start_call(self.usage_session, attempt, job)
+        start = time.perf_counter()
+        with observe_stage("llm_call"):
+            text = backend.invoke(prompt, stop=stop, **kwargs)
+        latency = time.perf_counter() - start
+
+        # Backends that know the exact counts report them; otherwise estimate from the text
+        calls = reported.close() or [estimated_usage(model, prompt, text, kwargs.get("system"))]
+        for call in calls:
+            self.ledger.record(
+                self.usage_session,
+                job,
+                call["model"],
+                call["input_tokens"],
+                call["output_tokens"],
+                latency,
+                attempt=attempt,
+                estimated=call.get("estimated", False),
+            )
+        return text
 
     def invoke_json(
         self,
@@ -106,13 +299,21 @@ class LLM:
     ) -> Union[Dict[str, Any], T]:
 
         # Create prompt requesting JSON format response
+        schema_text = self._render_schema(schema)
+        if schema and self.native_structured_output:
+            # The backend constrains the output to the schema itself
+            kwargs["response_schema"] = schema
+            retry_schema = "Follow the response schema."
+        elif schema:
+            retry_schema = f"Follow the schema:\n{schema_text}"
+        else:
+            retry_schema = "Object JSON of your choice, as long as it is valid"
+        schema_section = f"Tuân thủ chính xác schema sau:\n{schema_text}\n" if schema_text else ""
         json_prompt = prompt
         if schema:
             json_prompt = f"""
 Trả lời câu hỏi sau và đảm bảo kết quả trả về là một đối tượng JSON hợp lệ.
-Tuân thủ chính xác schema sau:
-{json.dumps(schema, indent=2, ensure_ascii=False)}
-
+{schema_section}
 Câu hỏi: {prompt}
 
 LƯU Ý QUAN TRỌNG: 
@@ -147,27 +348,13 @@ LƯU Ý QUAN TRỌNG:
         while retry_count <= max_retries:
             try:
                 # Gọi model
-                response = self.invoke(json_prompt, **kwargs)
+                response = self.invoke(json_prompt, attempt=retry_count, **kwargs)
                 
-                # Xử lý kết quả, đảm bảo lấy phần JSON
-                result_text = response.strip()
-
-                # Xóa các ký tự markdown JSON nếu có
-                if result_text.startswith("```json"):
-                    result_text = result_text[7:]
-                elif result_text.startswith("```"):
-                    result_text = result_text[3:]
-                if result_text.endswith("```"):
-                    result_text = result_text[:-3]
+                with observe_stage("json_parse"):
+                    result_text = strip_json_response(response)
 
-                result_text = result_text.strip()
-
-                # Xóa các comments nếu có
-                result_text = re.sub(r"//.*", "", result_text)
-                result_text = re.sub(r"/\*.*?\*/", "", result_text, flags=re.DOTALL)
-
-                # Thử parse JSON
-                json_result = json.loads(result_text)
+                    # Thử parse JSON
+                    json_result = json.loads(result_text)
                 
                 # Nếu thành công, trả về kết quả
                 if type_hint:
@@ -182,6 +369,7 @@ LƯU Ý QUAN TRỌNG:
                 # If error and retries remaining, simplify the prompt
                 if retry_count <= max_retries:
                     print(f"JSON error, retrying {retry_count}/{max_retries}: {str(e)}")
+                    LLM_RETRIES.inc()
                     
                     # Create a simpler prompt with clearer requirements about JSON syntax
                     json_prompt = f"""
@@ -191,8 +379,7 @@ Specific error: {str(e)}
 
 Please fix the error and return completely valid JSON. MAKE SURE TO CHECK JSON SYNTAX before responding.
 
-Follow the schema:
-{json.dumps(schema, indent=2, ensure_ascii=False) if schema else "Object JSON of your choice, as long as it is valid"}
+{retry_schema}
 
 Question: {prompt}
 
@@ -215,10 +402,13 @@ CHÚ Ý:
             f"Không thể parse JSON sau {max_retries} lần thử: {str(last_error)}\nNội dung trả về: {result_text}"
         )
 
-    def create_chain(self, prompt_template: str, output_key: str = "text") -> LLMChain:
-        """Create LLMChain with prompt template."""
-        prompt = PromptTemplate.from_template(prompt_template)
-        return LLMChain(llm=self._llm, prompt=prompt, output_key=output_key)
+    def _render_schema(self, schema: Optional[Dict[str, Any]]) -> str:
+        """Schema text for the prompt: none in native mode, minified in compact mode, indented in prompt mode."""
+        if not schema or self.native_structured_output:
+            return ""
+        if self.structured_output == "prompt":
+            return json.dumps(schema, indent=2, ensure_ascii=False)
+        return compact_schema(schema)
 
     def batch_predict(
         self,
@@ -226,14 +416,20 @@ CHÚ Ý:
         prompt_template: str,
         output_key: str = "text",
     ) -> List[str]:
-        """Dự đoán hàng loạt với danh sách input."""
-        chain = self.create_chain(prompt_template, output_key)
+        """
+        Dự đoán hàng loạt với danh sách input.
+
+        Each input fills ``prompt_template`` (str.format fields) and is sent
+        through invoke() without the system prompt, so every backend works and
+        the usage is recorded. ``output_key`` is kept for compatibility and unused.
+        """
         results = []
 
         for input_data in inputs:
             try:
-                result = chain.invoke(input_data)
-                results.append(result[output_key])
+                results.append(self.invoke(
+                    prompt_template.format(**input_data), use_system_prompt=False, job="batch_predict"
+                ))
             except Exception as e:
                 results.append(f"Error: {str(e)}")
 
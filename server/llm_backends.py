@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Record/replay backends for LLM.
+
+A backend is any object with ``invoke(prompt, stop=None, **kwargs) -> str``,
+the same interface as the Gemini model behind ``LLM._llm``.
+``RecordingBackend`` wraps another backend and saves every response under a
+hash of its request (prompt, stop sequences, system prompt, response schema
+and structured-output mode); ``ReplayBackend`` serves those responses offline.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional, Union
+
+from metrics import record_cache
+
+
+DEFAULT_RECORD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+
+# Mode of the recording, stored next to the responses
+MANIFEST_NAME = "recording"
+
+
+class ReplayMissError(RuntimeError):
+    """No recorded response exists for a prompt."""
+
+
+def prompt_hash(
+    prompt: str,
+    stop: Optional[List[str]] = None,
+    system: Optional[str] = None,
+    response_schema: Optional[Dict[str, Any]] = None,
+    mode: Optional[str] = None,
+) -> str:
+    """
+    Key of a request; the same prompt with another system prompt, response
+    schema or structured-output mode (LLM_STRUCTURED_OUTPUT) is a different request.
+
+    Without system prompt, schema and mode the key is the one recordings
+    were made under before they were part of it, so those still replay.
+    """
+    key = prompt if not stop else prompt + "\0" + "\0".join(stop)
+    if system is not None or response_schema is not None or mode is not None:
+        extra = {"system": system, "response_schema": response_schema, "mode": mode}
+        key += "\0" + json.dumps(extra, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class RecordStore:
+    """
+    Prompt-hash -> responses on disk, one JSON file per prompt.
+
+    A prompt can have several responses (e.g. a malformed one followed by the
+    retry); they are kept in the order they were recorded.
+    """
+
+    def __init__(self, directory: str = DEFAULT_RECORD_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def mode(self) -> Optional[str]:
+        """Structured-output mode the responses were recorded in; None for older recordings."""
+        manifest = self.load(MANIFEST_NAME)
+        return manifest.get("structured_output") if manifest else None
+
+    def set_mode(self, mode: str) -> None:
+        previous = self.mode()
+        if previous is not None and previous != mode:
+            print(f"llm_backends: {self.directory} holds {previous} recordings, now recording {mode}")
+        with self._lock:
+            with open(self._path(MANIFEST_NAME), "w", encoding="utf-8") as f:
+                json.dump({"structured_output": mode}, f)
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def append(self, key: str, prompt: str, text: str, latency: float, model: Optional[str] = None) -> None:
+        with self._lock:
+            entry = self.load(key) or {"prompt_hash": key, "prompt_preview": prompt[:500], "responses": []}
+            entry["responses"].append({
+                "text": text,
+                "latency": latency,
+                "model": model,
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            })
+            # Write atomically so a concurrent replay never reads half a file
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self._path(key))
+
+
+class RecordingBackend:
+    """
+    Pass calls through to another backend and record the responses.
+
+    Args:
+        inner: Backend to call
+        store: Where responses are recorded
+        model_name: Model recorded with each response
+        mode: LLM_STRUCTURED_OUTPUT of the LLM; "native" is recorded as "compact"
+            if the inner backend has no native support, as LLM falls back to it
+    """
+
+    def __init__(self, inner: Any, store: RecordStore, model_name: Optional[str] = None, mode: str = "native"):
+        self.inner = inner
+        self.store = store
+        self.model_name = model_name
+        self.structured_output = getattr(inner, "structured_output", False)
+        self.mode = "compact" if mode == "native" and not self.structured_output else mode
+        store.set_mode(self.mode)
+
+    def invoke(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        start = time.perf_counter()
+        text = self.inner.invoke(prompt, stop=stop, **kwargs)
+        latency = time.perf_counter() - start
+        key = prompt_hash(prompt, stop, kwargs.get("system"), kwargs.get("response_schema"), self.mode)
+        self.store.append(key, prompt, text, latency, self.model_name)
+        return text
+
+
+class ReplayBackend:
+    """
+    Serve recorded responses without calling any API.
+
+    Args:
+        store: Recorded responses
+        latency: "none" to answer immediately, "recorded" to sleep for the
+            recorded latency, or a number of seconds to sleep on every call
+        fallback: Backend to call when a prompt was never recorded; if None,
+            ReplayMissError is raised
+    """
+
+    def __init__(
+        self,
+        store: RecordStore,
+        latency: Union[str, float] = "none",
+        fallback: Optional[Any] = None,
+    ):
+        self.store = store
+        self.latency = latency
+        self.fallback = fallback
+        # Prompts differ between structured-output modes; LLM replays in the recorded one
+        self.mode = store.mode()
+        self.structured_output = self.mode == "native"
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        key = prompt_hash(prompt, stop, kwargs.get("system"), kwargs.get("response_schema"), self.mode)
+        entry = self.store.load(key)
+        record_cache("llm_replay", entry is not None)
+        if entry is None or not entry.get("responses"):
+            if self.fallback is not None:
+                return self.fallback.invoke(prompt, stop=stop, **kwargs)
+            raise ReplayMissError(f"No recorded response for prompt {key[:12]}")
+
+        # Successive calls with the same prompt replay the recorded sequence, then repeat the last one
+        with self._lock:
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+        responses = entry["responses"]
+        response = responses[min(position, len(responses) - 1)]
+
+        delay = response.get("latency", 0) if self.latency == "recorded" else self.latency
+        if isinstance(delay, (int, float)) and delay > 0:
+            time.sleep(delay)
+        return response["text"]
+
+    def reset(self) -> None:
+        """Start every prompt's recorded sequence from the beginning again."""
+        with self._lock:
+            self._positions.clear()
+
+
+def parse_latency(value: Optional[str]) -> Union[str, float]:
+    if not value or value == "none":
+        return "none"
+    if value == "recorded":
+        return value
+    return float(value)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Hedged LLM requests.
+
+``HedgedBackend`` wraps another backend. If a call has not returned after
+the observed p90 latency, an identical second request is sent and whichever
+succeeds first is returned. Hedges are limited to a fraction of all calls so
+a slow API is not hit with twice the traffic.
+
+The blocking SDK calls cannot be interrupted, so the losing request is
+abandoned rather than aborted: its result is discarded when it finishes,
+but its tokens were paid for and are still recorded in the usage ledger.
+"""
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Any, List, Optional
+
+from metrics import LLM_HEDGE_REQUESTS, LLM_HEDGE_WINS, LLM_HEDGE_THRESHOLD
+from usage_ledger import current_call, estimated_usage, start_call
+
+
+class LatencyTracker:
+    """
+    Recent successful call latencies and the hedge budget for one backend.
+
+    Args:
+        quantile: Latency quantile used as the hedge threshold
+        budget: Hedges allowed per call, e.g. 0.1 = at most one extra request per ten calls
+        initial_delay: Threshold used until ``min_samples`` latencies are known
+        min_delay: Lower bound for the threshold, so fast calls are never hedged
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.9,
+        budget: float = 0.1,
+        initial_delay: float = 60.0,
+        min_delay: float = 5.0,
+        window: int = 200,
+        min_samples: int = 20,
+    ):
+        self.quantile = quantile
+        self.budget = budget
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        # Start with enough credit for one hedge; each call earns ``budget`` more
+        self._credit = 1.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def threshold(self) -> float:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < self.min_samples:
+            return self.initial_delay
+        index = min(int(self.quantile * len(latencies)), len(latencies) - 1)
+        return max(latencies[index], self.min_delay)
+
+    def earn(self) -> None:
+        with self._lock:
+            self._credit = min(self._credit + self.budget, 1.0 + self.budget)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._credit < 1.0:
+                return False
+            self._credit -= 1.0
+            return True
+
+
+# Shared by every LLM in the process (the server creates one per session),
+# keyed by backend name so each backend keeps its own latency profile.
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_HEDGE_WORKERS", "32")), thread_name_prefix="llm-hedge"
+)
+
+
+def get_tracker(name: str) -> LatencyTracker:
+    with _trackers_lock:
+        if name not in _trackers:
+            _trackers[name] = LatencyTracker(
+                quantile=float(os.getenv("LLM_HEDGE_QUANTILE", "0.9")),
+                budget=float(os.getenv("LLM_HEDGE_BUDGET", "0.1")),
+                initial_delay=float(os.getenv("LLM_HEDGE_INITIAL_DELAY", "60")),
+                min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "5")),
+            )
+        return _trackers[name]
+
+
+class HedgedBackend:
+    """
+    Backend that hedges slow calls to another backend.
+
+    Args:
+        inner: Backend to call
+        name: Key of the shared latency tracker
+    """
+
+    def __init__(self, inner: Any, name: str):
+        self.inner = inner
+        self.name = name
+        self.tracker = get_tracker(name)
+        self.structured_output = getattr(inner, "structured_output", False)
+
+    def _timed_invoke(
+        self, prompt: str, stop: Optional[List[str]], kwargs: Dict[str, Any], call: Optional[List[Dict[str, Any]]]
+    ) -> str:
+        # Runs in a copy of the caller's context; collect this request's own usage,
+        # estimated if the backend reports none, and pass it on to the caller's call.
+        # A request that loses the race reports after the call was recorded, which
+        # the ledger records separately.
+        own = start_call()
+        start = time.perf_counter()
+        text = self.inner.invoke(prompt, stop=stop, **kwargs)
+        latency = time.perf_counter() - start
+        self.tracker.record(latency)
+        if call is not None:
+            for usage in own.close() or [estimated_usage(self.name, prompt, text, kwargs.get("system"))]:
+                call.add(dict(usage, latency=latency))
+        return text
+
+    def invoke(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        self.tracker.earn()
+        LLM_HEDGE_REQUESTS.labels(self.name, "primary").inc()
+        threshold = self.tracker.threshold()
+        LLM_HEDGE_THRESHOLD.labels(self.name).set(threshold)
+
+        # Run in a copy of the caller's context so both requests report their token usage
+        call = current_call()
+        primary = _executor.submit(contextvars.copy_context().run, self._timed_invoke, prompt, stop, kwargs, call)
+        done, _ = wait([primary], timeout=threshold)
+        if done or not self.tracker.try_spend():
+            return primary.result()
+
+        print(f"llm_hedging: {self.name} call exceeded {threshold:.1f}s, sending hedge request")
+        LLM_HEDGE_REQUESTS.labels(self.name, "hedge").inc()
+        hedge = _executor.submit(contextvars.copy_context().run, self._timed_invoke, prompt, stop, kwargs, call)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                if future is hedge:
+                    LLM_HEDGE_WINS.labels(self.name).inc()
+                for loser in pending:
+                    loser.cancel()
+                return future.result()
+        raise error
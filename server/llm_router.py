@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Health-aware routing over several LLM providers.
+
+Providers are configured with priorities (lower is preferred). The router
+keeps a rolling window of latency and errors per provider and routes around
+providers that are failing or much slower than their peers, so one bad
+provider does not stall every generation.
+"""
+import os
+import json
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+import requests
+
+from metrics import LLM_PROVIDER_REQUESTS, LLM_PROVIDER_SECONDS
+from llm_structured import compact_schema
+from usage_ledger import report_usage
+
+
+class AllProvidersFailedError(RuntimeError):
+    """Every configured provider failed for a request."""
+
+
+class ProviderHealth:
+    """
+    Rolling latency and error statistics for one provider.
+
+    After ``failure_threshold`` consecutive failures the provider is taken
+    out of rotation for ``cooldown`` seconds, then a single request is let
+    through to probe it.
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        max_error_rate: float = 0.5,
+        min_samples: int = 5,
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            self._samples.append((latency, ok))
+            self._probing = False
+            if ok:
+                self._consecutive_failures = 0
+                self._open_until = 0.0
+            else:
+                self._consecutive_failures += 1
+                if self._consecutive_failures >= self.failure_threshold:
+                    self._open_until = time.monotonic() + self.cooldown
+
+    def available(self) -> bool:
+        """Whether a request may be sent; claims the probe slot of a cooled-down provider."""
+        with self._lock:
+            if self._open_until == 0.0:
+                return True
+            if time.monotonic() < self._open_until or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._samples:
+                return 0.0
+            return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    @property
+    def median_latency(self) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[len(latencies) // 2]
+
+    def degraded(self) -> bool:
+        with self._lock:
+            enough = len(self._samples) >= self.min_samples
+        return enough and self.error_rate > self.max_error_rate
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = len(self._samples)
+            circuit_open = self._open_until > time.monotonic()
+            consecutive = self._consecutive_failures
+        return {
+            "samples": samples,
+            "error_rate": round(self.error_rate, 3),
+            "median_latency": self.median_latency,
+            "consecutive_failures": consecutive,
+            "circuit_open": circuit_open,
+            "degraded": self.degraded(),
+        }
+
+
+# Health is shared by every router in the process, keyed by provider name,
+# because the server creates a new LLM per session.
+_health: Dict[str, ProviderHealth] = {}
+_health_lock = threading.Lock()
+
+
+def get_health(name: str) -> ProviderHealth:
+    with _health_lock:
+        if name not in _health:
+            _health[name] = ProviderHealth(
+                failure_threshold=int(os.getenv("LLM_ROUTER_FAILURE_THRESHOLD", "3")),
+                cooldown=float(os.getenv("LLM_ROUTER_COOLDOWN", "30")),
+                max_error_rate=float(os.getenv("LLM_ROUTER_MAX_ERROR_RATE", "0.5")),
+            )
+        return _health[name]
+
+
+def health_report() -> Dict[str, Dict[str, Any]]:
+    with _health_lock:
+        names = list(_health)
+    return {name: get_health(name).snapshot() for name in names}
+
+
+class Provider:
+    """A configured backend with its routing priority."""
+
+    def __init__(self, name: str, backend: Any, priority: int = 0):
+        self.name = name
+        self.backend = backend
+        self.priority = priority
+        self.health = get_health(name)
+
+
+class LLMRouter:
+    """
+    Backend that sends each call to the best available provider.
+
+    Args:
+        providers: Configured providers
+        slow_factor: A provider whose median latency is this many times the
+            fastest healthy provider's is tried after the others
+    """
+
+    def __init__(self, providers: List[Provider], slow_factor: float = 3.0):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = providers
+        self.slow_factor = slow_factor
+        # Every provider must take the schema natively, since any of them may serve a call
+        self.structured_output = all(getattr(p.backend, "structured_output", False) for p in providers)
+
+    def ranked_providers(self) -> List[Provider]:
+        """Providers in the order they should be tried."""
+        latencies = [p.health.median_latency for p in self.providers if not p.health.degraded()]
+        fastest = min((l for l in latencies if l is not None), default=None)
+
+        def rank(provider: Provider):
+            latency = provider.health.median_latency
+            slow = fastest is not None and latency is not None and latency > fastest * self.slow_factor
+            return (provider.health.degraded(), slow, provider.priority)
+
+        return sorted(self.providers, key=rank)
+
+    def invoke(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        ranked = self.ranked_providers()
+        errors = []
+        attempted = False
+        for provider in ranked:
+            if not provider.health.available():
+                continue
+            attempted = True
+            try:
+                return self._call(provider, prompt, stop, **kwargs)
+            except Exception as e:
+                errors.append(f"{provider.name}: {e}")
+
+        if not attempted:
+            # Every circuit is open; trying the preferred provider beats failing outright
+            try:
+                return self._call(ranked[0], prompt, stop, **kwargs)
+            except Exception as e:
+                errors.append(f"{ranked[0].name}: {e}")
+        raise AllProvidersFailedError("All LLM providers failed: " + "; ".join(errors))
+
+    def _call(self, provider: Provider, prompt: str, stop: Optional[List[str]], **kwargs: Any) -> str:
+        start = time.perf_counter()
+        try:
+            text = provider.backend.invoke(prompt, stop=stop, **kwargs)
+        except Exception as e:
+            latency = time.perf_counter() - start
+            provider.health.record(latency, ok=False)
+            LLM_PROVIDER_REQUESTS.labels(provider.name, "error").inc()
+            print(f"llm_router: Provider {provider.name} failed after {latency:.1f}s: {e}")
+            raise
+        latency = time.perf_counter() - start
+        provider.health.record(latency, ok=True)
+        LLM_PROVIDER_REQUESTS.labels(provider.name, "ok").inc()
+        LLM_PROVIDER_SECONDS.labels(provider.name).observe(latency)
+        return text
+
+
+class OpenAICompatibleBackend:
+    """
+    Backend for a self-hosted OpenAI-compatible chat completions endpoint.
+
+    The system prompt is sent as a system message. With ``json_schema``, the
+    response schema is sent as ``response_format`` (vLLM, llama.cpp and
+    recent OpenAI servers support it); otherwise it is appended to the prompt.
+    """
+
+    structured_output = True
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        api_key: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 8192,
+        timeout: float = 300,
+        json_schema: bool = False,
+    ):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.api_key = api_key
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.json_schema = json_schema
+
+    def invoke(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        system: Optional[str] = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> str:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        messages = [{"role": "system", "content": system}] if system else []
+        if response_schema is not None and not self.json_schema:
+            prompt = f"{prompt}\n\nJSON schema:\n{compact_schema(response_schema)}"
+        messages.append({"role": "user", "content": prompt})
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        }
+        if response_schema is not None and self.json_schema:
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "response", "schema": response_schema},
+            }
+        if stop:
+            payload["stop"] = stop
+        resp = requests.post(self.url, headers=headers, json=payload, timeout=self.timeout)
+        resp.raise_for_status()
+        data = resp.json()
+        usage = data.get("usage") or {}
+        if usage:
+            report_usage(self.model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+        return data["choices"][0]["message"]["content"]
+
+
+def load_provider_configs() -> List[Dict[str, Any]]:
+    """
+    Read provider configuration from LLM_PROVIDERS (JSON) or LLM_PROVIDERS_FILE.
+
+    Example:
+        [{"name": "flash", "type": "gemini", "model": "gemini-1.5-flash", "priority": 0},
+         {"name": "local", "type": "openai", "base_url": "http://localhost:8001/v1",
+          "model": "qwen2.5-7b-instruct", "priority": 1}]
+    """
+    raw = os.getenv("LLM_PROVIDERS")
+    if not raw and os.getenv("LLM_PROVIDERS_FILE"):
+        with open(os.getenv("LLM_PROVIDERS_FILE"), "r", encoding="utf-8") as f:
+            raw = f.read()
+    if not raw:
+        raise ValueError("LLM_BACKEND=router requires LLM_PROVIDERS or LLM_PROVIDERS_FILE")
+    configs = json.loads(raw)
+    if not isinstance(configs, list) or not configs:
+        raise ValueError("LLM provider configuration must be a non-empty list")
+    return configs
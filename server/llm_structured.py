@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Structured output for JSON generation.
+
+``invoke_json`` used to paste the indented JSON schema (about 7 KB) into
+every prompt, after the 10 KB system prompt. Backends that support it now
+get the schema as a native response schema and the system prompt through
+the system-instruction channel, so neither counts against the prompt and
+the model is constrained to emit valid JSON. For other backends the schema
+is rendered compactly.
+
+Backends declare support with a ``structured_output = True`` attribute and
+then accept ``system`` and ``response_schema`` keyword arguments in invoke().
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+try:
+    import google.generativeai as genai
+    from google.ai.generativelanguage import GenerativeServiceClient
+except ImportError:  # pragma: no cover - optional dependency
+    genai = None
+
+from usage_ledger import report_usage
+
+
+# Keywords of the OpenAPI subset Gemini accepts as response schema
+_GEMINI_KEYWORDS = ("type", "format", "description", "nullable", "enum", "items", "minItems", "maxItems", "required")
+
+# Schema keywords that only document the schema and never constrain output
+_ANNOTATIONS = ("$schema", "$id", "title", "examples", "default", "$comment")
+
+
+def supports_structured_output(backend: Any) -> bool:
+    return bool(getattr(backend, "structured_output", False))
+
+
+def compact_schema(schema: Dict[str, Any]) -> str:
+    """Schema as minified JSON without annotation keywords, for prompts."""
+    def strip(node: Any, is_properties: bool = False) -> Any:
+        if isinstance(node, dict):
+            return {
+                key: strip(value, is_properties=(key == "properties" and not is_properties))
+                for key, value in node.items()
+                # Inside "properties" the keys are field names (a field may be called "title")
+                if is_properties or key not in _ANNOTATIONS
+            }
+        if isinstance(node, list):
+            return [strip(item) for item in node]
+        return node
+
+    return json.dumps(strip(schema), ensure_ascii=False, separators=(",", ":"))
+
+
+def to_response_schema(schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Convert a JSON schema to Gemini's response-schema subset.
+
+    Local $refs are inlined, ["string", "null"] becomes a nullable string,
+    other unions that include "string" become a string (Gemini has no unions,
+    and only a string can carry e.g. both 6 and "6a"), remaining unions keep
+    their first type, const becomes a one-value enum and only the first
+    branch of anyOf/oneOf is kept. Bounds Gemini cannot express (minimum,
+    pattern, ...) are dropped; the validator still checks them afterwards.
+
+    Returns:
+        The converted schema, or None if it cannot be expressed
+    """
+    definitions = dict(schema.get("definitions", {}), **schema.get("$defs", {}))
+
+    def convert(node: Dict[str, Any], depth: int = 0) -> Optional[Dict[str, Any]]:
+        if depth > 32:
+            return None  # recursive schema
+        if "$ref" in node:
+            name = node["$ref"].rsplit("/", 1)[-1]
+            if name not in definitions:
+                return None
+            return convert(definitions[name], depth + 1)
+        for combinator in ("anyOf", "oneOf", "allOf"):
+            if combinator in node and node[combinator]:
+                merged = dict(node[combinator][0], **{k: v for k, v in node.items() if k != combinator})
+                return convert(merged, depth + 1)
+
+        out = {key: node[key] for key in _GEMINI_KEYWORDS if key in node and key not in ("items", "type")}
+        node_type = node.get("type")
+        if isinstance(node_type, list):
+            types = [t for t in node_type if t != "null"]
+            if not types:
+                return None
+            # Any member of the union satisfies it; a string can hold every other member
+            node_type = "string" if "string" in types else types[0]
+            if "null" in node["type"]:
+                out["nullable"] = True
+        if "const" in node:
+            out["enum"] = [node["const"]]
+            node_type = node_type or "string"
+        if node_type is None:
+            node_type = "object" if "properties" in node else "string"
+        if "enum" in out and (node_type != "string" or not all(isinstance(v, str) for v in out["enum"])):
+            out.pop("enum")  # Gemini only constrains string enums
+        out["type"] = node_type.upper()
+
+        if node_type == "object":
+            properties = {}
+            for name, child in node.get("properties", {}).items():
+                converted = convert(child, depth + 1)
+                if converted is None:
+                    return None
+                properties[name] = converted
+            if not properties:
+                return None  # free-form objects are not supported
+            out["properties"] = properties
+            out["required"] = [name for name in node.get("required", []) if name in properties]
+        elif node_type == "array":
+            items = convert(node.get("items") or {"type": "string"}, depth + 1)
+            if items is None:
+                return None
+            out["items"] = items
+        return out
+
+    return convert(schema)
+
+
+class GeminiBackend:
+    """
+    Google Gemini through the google-generativeai SDK, with native response
+    schema and system instruction.
+    """
+
+    structured_output = True
+
+    def __init__(
+        self,
+        model: str,
+        api_key: str,
+        temperature: float,
+        max_output_tokens: int,
+        top_p: float,
+        top_k: int,
+        safety_settings: Optional[Dict[Any, Any]] = None,
+    ):
+        if genai is None:
+            raise ImportError("google-generativeai is not installed")
+        # genai.configure() sets one key for the whole process; routed providers
+        # may use different keys, so each backend gets its own client
+        self._client = GenerativeServiceClient(client_options={"api_key": api_key})
+        self.model = model
+        self.generation_config = {
+            "temperature": temperature,
+            "max_output_tokens": max_output_tokens,
+            "top_p": top_p,
+            "top_k": top_k,
+        }
+        self.safety_settings = safety_settings
+        # One model object per system prompt; the system prompt is fixed per LLM instance
+        self._models: Dict[Optional[str], Any] = {}
+
+    def _model(self, system: Optional[str]) -> Any:
+        if system not in self._models:
+            model = genai.GenerativeModel(
+                self.model,
+                system_instruction=system,
+                safety_settings=self.safety_settings,
+            )
+            # GenerativeModel only falls back to the process-wide client while _client is unset
+            model._client = self._client
+            self._models[system] = model
+        return self._models[system]
+
+    def invoke(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        system: Optional[str] = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> str:
+        config = dict(self.generation_config)
+        if stop:
+            config["stop_sequences"] = stop
+        if response_schema is not None:
+            config["response_mime_type"] = "application/json"
+            converted = to_response_schema(response_schema)
+            if converted is not None:
+                config["response_schema"] = converted
+            else:
+                prompt = f"{prompt}\n\nJSON schema:\n{compact_schema(response_schema)}"
+        response = self._model(system).generate_content(prompt, generation_config=config)
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            report_usage(self.model, usage.prompt_token_count, usage.candidates_token_count)
+        return response.text
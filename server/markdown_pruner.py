@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Structure-aware pruning of docling markdown before prompting.
+
+The markdown is split into blocks (headings, paragraphs, tables, equations,
+images, ...), each block is tagged with the kind of section it belongs to,
+and blocks whose category is in the drop policy are removed. Reference
+lists, affiliations, equations, numeric tables and image placeholders carry
+no material for reading exams but can be a third of a paper's tokens.
+"""
+import os
+import re
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+
+# Categories removed unless MARKDOWN_PRUNE_DROP says otherwise
+DEFAULT_DROP = frozenset({
+    "references",
+    "acknowledgments",
+    "appendix",
+    "affiliation",
+    "image",
+    "equation",
+    "numeric_table",
+    "code",
+})
+
+# If pruning would keep less than this share of the words, the structure was
+# probably misread (e.g. no headings at all), so the original is used
+MIN_KEEP_RATIO = 0.3
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+_HEADING_NUMBER = re.compile(r"^((\d+|[ivxlcIVXLC]+|[A-Z])([.\d]*)\.?\s+)")
+_IMAGE = re.compile(r"^(!\[[^\]]*\](\([^)]*\))?|<!--\s*image\s*-->)$")
+_FORMULA_MARKER = re.compile(r"^(\$\$|\\\[|\\begin\{(equation|align|eqnarray)|<!--\s*formula)")
+_CAPTION = re.compile(r"^(\*\*)?(figure|fig\.|table|tab\.|hình|bảng)\s*\d+", re.IGNORECASE)
+_AFFILIATION = re.compile(
+    r"(@[\w-]+\.|universit|institut|department|faculty|laborator|school of|college|"
+    r"corresponding author|e-?mail|orcid|trường|khoa |viện )",
+    re.IGNORECASE,
+)
+_NUMERIC_CELL = re.compile(r"^[\s\-+−±~<>≤≥%.,:;()/\[\]×*]*\d[\d\s\-+−±~<>≤≥%.,:;()/\[\]×*eE]*$")
+_MATH_CHARS = re.compile(r"[=^_\\{}∑∫≤≥±×∂∈αβγδθλμσπω]")
+
+_SECTIONS = (
+    ("references", re.compile(r"^(references?|bibliography|works cited|literature cited|tài liệu tham khảo)$")),
+    ("acknowledgments", re.compile(r"^(acknowledge?ments?|funding|lời cảm ơn)$")),
+    ("appendix", re.compile(r"^(appendix|appendices|supplementary|phụ lục)\b")),
+)
+_BODY_START = re.compile(r"^(abstract|introduction|tóm tắt|giới thiệu|mở đầu)\b")
+
+
+def _normalize_heading(text: str) -> str:
+    text = text.strip().strip("*_").strip()
+    text = _HEADING_NUMBER.sub("", text, count=1)
+    return text.strip(" .:").lower()
+
+
+def split_blocks(markdown: str) -> List[str]:
+    """Split markdown into blank-line separated blocks, keeping fenced code and display math whole."""
+    blocks = []
+    current = []
+    fence = None
+    for line in markdown.split("\n"):
+        stripped = line.strip()
+        if fence:
+            current.append(line)
+            if stripped.startswith(fence) or (fence == "$$" and stripped.endswith("$$") and len(current) > 1):
+                blocks.append("\n".join(current))
+                current = []
+                fence = None
+            continue
+        if stripped.startswith("```") or stripped == "$$":
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            fence = "```" if stripped.startswith("```") else "$$"
+            current.append(line)
+            continue
+        if not stripped:
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        if _HEADING.match(stripped) and current:
+            # Headings are always their own block
+            blocks.append("\n".join(current))
+            current = []
+        current.append(line)
+        if _HEADING.match(stripped):
+            blocks.append("\n".join(current))
+            current = []
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _is_numeric_table(lines: List[str]) -> bool:
+    cells = []
+    for line in lines[1:]:  # skip the header row
+        if set(line.strip()) <= set("|-: "):
+            continue  # separator row
+        cells.extend(cell.strip() for cell in line.strip().strip("|").split("|") if cell.strip())
+    if not cells:
+        return False
+    numeric = sum(1 for cell in cells if _NUMERIC_CELL.match(cell))
+    return numeric / len(cells) >= 0.5
+
+
+def _is_equation(text: str) -> bool:
+    if _FORMULA_MARKER.match(text):
+        return True
+    tokens = text.split()
+    if not tokens or len(tokens) > 60:
+        return False
+    words = sum(1 for token in tokens if re.fullmatch(r"[A-Za-zÀ-ỹ]{3,}[.,;:]?", token))
+    return len(_MATH_CHARS.findall(text)) >= 3 and words / len(tokens) < 0.3
+
+
+def classify_block(text: str) -> str:
+    """Kind of a single block: heading, image, table, numeric_table, equation, code, caption, list or text."""
+    stripped = text.strip()
+    lines = [line.strip() for line in stripped.split("\n") if line.strip()]
+    if _HEADING.match(stripped):
+        return "heading"
+    if stripped.startswith("```"):
+        return "code"
+    if all(_IMAGE.match(line) for line in lines):
+        return "image"
+    if all(line.startswith("|") for line in lines):
+        return "numeric_table" if _is_numeric_table(lines) else "table"
+    if _is_equation(stripped):
+        return "equation"
+    if _CAPTION.match(stripped):
+        return "caption"
+    if all(re.match(r"^([-*+]|\d+[.)])\s", line) for line in lines):
+        return "list"
+    return "text"
+
+
+def parse_markdown(markdown: str) -> List[Dict[str, Any]]:
+    """
+    Parse markdown into classified blocks.
+
+    Returns:
+        One dict per block with ``text``, ``kind`` (see classify_block),
+        ``section`` (front_matter, body, references, acknowledgments, appendix)
+        and ``category``, the name the pruning policy matches on
+    """
+    blocks = []
+    section = "front_matter"
+    for text in split_blocks(markdown):
+        kind = classify_block(text)
+        if kind == "heading":
+            title = _normalize_heading(_HEADING.match(text.strip()).group(2))
+            matched = next((name for name, pattern in _SECTIONS if pattern.match(title)), None)
+            if matched:
+                section = matched
+            elif section == "appendix":
+                pass  # appendix subsections (A.1, B, ...) stay in the appendix
+            elif section != "front_matter" or _BODY_START.match(title):
+                section = "body"
+            elif blocks:
+                # Second heading without an abstract: treat the rest as body
+                section = "body"
+
+        if section in ("references", "acknowledgments", "appendix"):
+            category = section
+        elif section == "front_matter" and kind == "text" and _AFFILIATION.search(text) and len(text.split()) < 80:
+            category = "affiliation"
+        else:
+            category = kind
+        blocks.append({"text": text, "kind": kind, "section": section, "category": category})
+    return blocks
+
+
+def policy_from_env() -> Optional[Set[str]]:
+    """Drop policy from MARKDOWN_PRUNE / MARKDOWN_PRUNE_DROP; None disables pruning."""
+    if os.getenv("MARKDOWN_PRUNE", "true").lower() in ("false", "0", "off"):
+        return None
+    drop = os.getenv("MARKDOWN_PRUNE_DROP")
+    if drop is None:
+        return set(DEFAULT_DROP)
+    return {name.strip() for name in drop.split(",") if name.strip()}
+
+
+def prune_markdown(markdown: str, drop: Optional[Iterable[str]] = DEFAULT_DROP) -> Tuple[str, Dict[str, Any]]:
+    """
+    Remove the blocks whose category is in ``drop``.
+
+    Args:
+        markdown: Docling markdown
+        drop: Categories to remove; None keeps everything (statistics are still computed)
+
+    Returns:
+        Pruned markdown and statistics: totals before/after and, per category,
+        block count, blocks dropped, words and characters
+    """
+    drop = set(drop or ())
+    blocks = parse_markdown(markdown)
+    per_category: Dict[str, Dict[str, int]] = {}
+    kept = []
+    for block in blocks:
+        stats = per_category.setdefault(
+            block["category"], {"blocks": 0, "dropped": 0, "words": 0, "chars": 0}
+        )
+        stats["blocks"] += 1
+        stats["words"] += len(block["text"].split())
+        stats["chars"] += len(block["text"])
+        if block["category"] in drop:
+            stats["dropped"] += 1
+        else:
+            kept.append(block["text"])
+
+    pruned = "\n\n".join(kept)
+    words_before = len(markdown.split())
+    words_after = len(pruned.split())
+    fallback = words_before > 0 and words_after < words_before * MIN_KEEP_RATIO
+    if fallback:
+        print(f"markdown_pruner: Pruning would keep only {words_after}/{words_before} words, using original")
+        pruned, words_after = markdown, words_before
+
+    report = {
+        "applied": bool(drop) and not fallback,
+        "dropped_categories": sorted(drop),
+        "words_before": words_before,
+        "words_after": words_after,
+        "chars_before": len(markdown),
+        "chars_after": len(pruned),
+        "saved_ratio": round(1 - len(pruned) / len(markdown), 3) if markdown else 0.0,
+        "categories": per_category,
+    }
+    return pruned, report
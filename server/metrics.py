@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+import time
+import functools
+from contextlib import contextmanager
+from typing import Callable, Iterator, Tuple
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+    )
+except ImportError:  # pragma: no cover - optional dependency
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    print("metrics: prometheus_client not installed, /metrics will be empty")
+
+    class _NoopMetric:
+        """Stand-in used when prometheus_client is not installed."""
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def labels(self, *args, **kwargs):
+            return self
+
+        def observe(self, *args, **kwargs):
+            pass
+
+        def inc(self, *args, **kwargs):
+            pass
+
+        def dec(self, *args, **kwargs):
+            pass
+
+        def set(self, *args, **kwargs):
+            pass
+
+        def set_function(self, *args, **kwargs):
+            pass
+
+    Counter = Gauge = Histogram = _NoopMetric
+
+    def generate_latest(*args, **kwargs) -> bytes:
+        return b""
+
+
+# Stages range from milliseconds (image cleaning) to minutes (LLM call, docling)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 180, 300, 600)
+
+STAGE_SECONDS = Histogram(
+    "paper_to_exam_stage_seconds",
+    "Duration of each pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "paper_to_exam_stage_errors_total",
+    "Pipeline stages that raised an exception",
+    ["stage"],
+)
+LLM_RETRIES = Counter(
+    "paper_to_exam_llm_retries_total",
+    "LLM calls retried after an unparsable JSON response",
+)
+EXTRACTION_FALLBACKS = Counter(
+    "paper_to_exam_extraction_fallbacks_total",
+    "PDF extractions that fell back from docling-serve to a local extractor",
+)
+CACHE_HITS = Counter(
+    "paper_to_exam_cache_hits_total",
+    "Cache hits by cache name",
+    ["cache"],
+)
+CACHE_MISSES = Counter(
+    "paper_to_exam_cache_misses_total",
+    "Cache misses by cache name",
+    ["cache"],
+)
+DOCLING_OUTSTANDING = Gauge(
+    "paper_to_exam_docling_outstanding_requests",
+    "Conversions in flight per docling-serve instance",
+    ["instance"],
+)
+DOCLING_REQUESTS = Counter(
+    "paper_to_exam_docling_requests_total",
+    "Conversions per docling-serve instance and outcome",
+    ["instance", "outcome"],
+)
+EXTRACTION_ROUTES = Counter(
+    "paper_to_exam_extraction_routes_total",
+    "PDF extractions per route chosen by the pre-scan (fast text layer or docling)",
+    ["route"],
+)
+FAST_PATH_SAVED_SECONDS = Counter(
+    "paper_to_exam_fast_path_saved_seconds_total",
+    "Estimated docling seconds saved by extracting from the text layer",
+)
+PRUNED_CHARS = Counter(
+    "paper_to_exam_pruned_chars_total",
+    "Markdown characters removed before prompting, by block category",
+    ["category"],
+)
+LLM_PROVIDER_REQUESTS = Counter(
+    "paper_to_exam_llm_provider_requests_total",
+    "LLM calls per provider and outcome",
+    ["provider", "outcome"],
+)
+LLM_PROVIDER_SECONDS = Histogram(
+    "paper_to_exam_llm_provider_seconds",
+    "Latency of successful LLM calls per provider",
+    ["provider"],
+    buckets=STAGE_BUCKETS,
+)
+LLM_HEDGE_REQUESTS = Counter(
+    "paper_to_exam_llm_hedge_requests_total",
+    "Hedging-enabled LLM calls (kind=primary) and extra hedge requests sent (kind=hedge)",
+    ["backend", "kind"],
+)
+LLM_HEDGE_WINS = Counter(
+    "paper_to_exam_llm_hedge_wins_total",
+    "Hedge requests that returned before the original request",
+    ["backend"],
+)
+LLM_HEDGE_THRESHOLD = Gauge(
+    "paper_to_exam_llm_hedge_threshold_seconds",
+    "Current delay before a hedge request is sent",
+    ["backend"],
+)
+LLM_TOKENS = Counter(
+    "paper_to_exam_llm_tokens_total",
+    "LLM tokens per model and kind (input or output)",
+    ["model", "kind"],
+)
+LLM_COST_USD = Counter(
+    "paper_to_exam_llm_cost_usd_total",
+    "Estimated LLM cost in USD per model",
+    ["model"],
+)
+LLM_BUDGET_ACTIONS = Counter(
+    "paper_to_exam_llm_budget_actions_total",
+    "LLM calls refused or downgraded because a budget was used up",
+    ["action"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "paper_to_exam_admission_queue_depth",
+    "Requests waiting for an admission slot per stage",
+    ["stage"],
+)
+ADMISSION_REJECTED = Counter(
+    "paper_to_exam_admission_rejected_total",
+    "Requests rejected with 429 per stage and reason (queue_full or wait_timeout)",
+    ["stage", "reason"],
+)
+INFLIGHT_JOBS = Gauge(
+    "paper_to_exam_inflight_jobs",
+    "Requests currently being processed",
+    ["job"],
+)
+SESSIONS = Gauge(
+    "paper_to_exam_sessions",
+    "Sessions currently held in memory",
+)
+
+
+@contextmanager
+def observe_stage(stage: str) -> Iterator[None]:
+    """Record the duration of a pipeline stage, and count it as failed if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def track_inflight(job: str) -> Iterator[None]:
+    """Count a request as in flight for the duration of the block."""
+    gauge = INFLIGHT_JOBS.labels(job)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def inflight(job: str) -> Callable:
+    """Decorator form of track_inflight for async endpoints."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with track_inflight(job):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    (CACHE_HITS if hit else CACHE_MISSES).labels(cache).inc()
+
+
+def track_sessions(count: Callable[[], int]) -> None:
+    """Report the session count lazily, at scrape time."""
+    SESSIONS.set_function(count)
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Return the exposition payload and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
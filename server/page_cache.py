@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Per-page cache of docling markdown.
+
+Successive revisions of a paper (arXiv v1, v2, v3, ...) share most of their
+pages. Each page is keyed by a hash of its content stream, its size, its
+fonts and its images, so a new revision only sends the pages that changed
+to docling and the cached markdown of the others is stitched back in.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+from typing import List, Optional
+
+from metrics import record_cache
+from storage_sweeper import atomic_write
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "pages")
+
+# Bump when the docling request options change so stale pages are not reused
+CACHE_VERSION = 1
+
+# Subset fonts get a random prefix (ABCDEF+Times-Roman) that changes between builds
+_SUBSET_PREFIX = re.compile(r"^[A-Z]{6}\+")
+
+
+def page_hashes(file_path: str, first: int, last: int) -> Optional[List[str]]:
+    """
+    Content hash of pages first..last (1-based, inclusive).
+
+    Returns:
+        One hex digest per page, or None if PyMuPDF is not installed
+    """
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        return None
+
+    hashes = []
+    with fitz.open(file_path) as doc:
+        for index in range(first - 1, min(last, len(doc))):
+            page = doc[index]
+            digest = hashlib.sha256(f"{CACHE_VERSION}\0{tuple(page.rect)}\0".encode("utf-8"))
+            digest.update(page.read_contents())
+            for font in sorted(_SUBSET_PREFIX.sub("", font[3]) for font in page.get_fonts()):
+                digest.update(font.encode("utf-8", "replace"))
+            # Replaced figures change the image bytes but not the content stream
+            for info in page.get_image_info(hashes=True):
+                digest.update(info.get("digest") or b"")
+            hashes.append(digest.hexdigest())
+    return hashes
+
+
+class PageCache:
+    """Docling markdown on disk, one JSON file per page hash."""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR):
+        self.directory = directory
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                markdown = json.load(f)["markdown"]
+        except (OSError, ValueError, KeyError):
+            record_cache("extraction_page", False)
+            return None
+        # Reads count as use for the storage sweeper's LRU
+        os.utime(path)
+        record_cache("extraction_page", True)
+        return markdown
+
+    def put(self, key: str, markdown: str) -> None:
+        atomic_write(self._path(key), json.dumps({
+            "markdown": markdown,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, ensure_ascii=False))
+
+
+def stitch_pages(pages: List[str]) -> str:
+    """
+    Join per-page markdown, re-joining paragraphs that run across a page break.
+
+    A page that ends mid-sentence followed by a page that starts in lower case
+    continues the same paragraph.
+    """
+    stitched = ""
+    for page in pages:
+        page = page.strip()
+        if not page:
+            continue
+        if stitched and re.search(r"[\w,;\-]$", stitched) and re.match(r"[a-z]", page):
+            stitched = stitched.rstrip("-") if stitched.endswith("-") else stitched + " "
+            stitched += page
+        else:
+            stitched = f"{stitched}\n\n{page}" if stitched else page
+    return stitched
@@ -4,7 +4,76 @@ import sys
 import requests
 import urllib.parse
 import re
-from typing import Optional, Dict, Any, Union
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Union, Tuple
+from metrics import observe_stage, EXTRACTION_FALLBACKS, EXTRACTION_ROUTES, FAST_PATH_SAVED_SECONDS
+from docling_pool import DEFAULT_DOCLING_URL, DoclingPool, get_pool
+from pdf_prescan import MIN_PAGE_CHARS, prescan_pdf, choose_route, extract_text_layer, docling_speed
+from page_cache import DEFAULT_CACHE_DIR as PAGE_CACHE_DIR, PageCache, page_hashes, stitch_pages
+
+
+def parse_page_range(text: str) -> Tuple[int, int]:
+    """
+    Parse a 1-based page range such as "5", "3-12" or "10-" (to the end).
+
+    Returns:
+        (first, last) with last = 0 meaning "last page of the document"
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*(?:(-)\s*(\d*)\s*)?", text or "")
+    if not match:
+        raise ValueError(f"Invalid page range: {text!r}, expected e.g. 5, 3-12 or 10-")
+    first = int(match.group(1))
+    last = int(match.group(3)) if match.group(3) else (0 if match.group(2) else first)
+    if first < 1 or (last and last < first):
+        raise ValueError(f"Invalid page range: {text!r}")
+    return first, last
+
+
+def count_pdf_pages(file_path: str) -> Optional[int]:
+    """Number of pages, or None if no PDF library is installed."""
+    try:
+        import fitz  # PyMuPDF
+        with fitz.open(file_path) as doc:
+            return len(doc)
+    except ImportError:
+        pass
+    for module in ("pypdf", "PyPDF2"):
+        try:
+            reader_module = __import__(module)
+        except ImportError:
+            continue
+        return len(reader_module.PdfReader(file_path).pages)
+    return None
+
+
+def slice_pdf(file_path: str, first: int, last: int, output_path: str) -> bool:
+    """Write pages first..last (1-based, inclusive) to output_path; False if no PDF library is installed."""
+    try:
+        import fitz  # PyMuPDF
+        with fitz.open(file_path) as src, fitz.open() as dst:
+            dst.insert_pdf(src, from_page=first - 1, to_page=last - 1)
+            dst.save(output_path)
+        return True
+    except ImportError:
+        pass
+    for module in ("pypdf", "PyPDF2"):
+        try:
+            reader_module = __import__(module)
+        except ImportError:
+            continue
+        reader = reader_module.PdfReader(file_path)
+        writer = reader_module.PdfWriter()
+        for page in reader.pages[first - 1:last]:
+            writer.add_page(page)
+        with open(output_path, "wb") as f:
+            writer.write(f)
+        return True
+    return False
+
+
+# Marker docling puts between pages when asked, to split a multi-page conversion per page
+PAGE_BREAK = "<!-- page-break -->"
 
 class PDFExtractor:
     """
@@ -12,53 +81,237 @@ class PDFExtractor:
     Provides methods to extract, clean, and save content.
     """
     
-    DEFAULT_DOCLING_URL = "http://localhost:5001/v1alpha/convert/file"
+    DEFAULT_DOCLING_URL = DEFAULT_DOCLING_URL
     
-    def __init__(self, docling_url: str = None):
+    def __init__(self, docling_url: str = None, docling_pool: Optional[DoclingPool] = None):
         """
         Initialize PDFExtractor object.
         
         Args:
-            docling_url: URL of docling-serve, default is http://localhost:5001/v1alpha/convert/file
+            docling_url: URL of docling-serve; default is the pool in $DOCLING_URLS (comma separated)
+                or $DOCLING_URL or http://localhost:5001/v1alpha/convert/file
+            docling_pool: Pool to use instead of docling_url
         """
-        self.docling_url = docling_url or self.DEFAULT_DOCLING_URL
+        self.docling_pool = docling_pool or get_pool([docling_url] if docling_url else None)
+        self.docling_url = docling_url or self.docling_pool.instances[0].url
         self.markdown_content = None
         self.source_path = None
         self.clean_images = True
         self.use_fallback = False  # Sử dụng phương thức dự phòng nếu docling-serve không khả dụng
+        self.page_range = None  # (first, last), 1-based; last = 0 means to the end
+        self.max_pages = None
+        self.pages = None  # Pages actually extracted: {"first", "last", "total"}
+        self.routing = None  # Pre-scan and route decision of the last extraction
+    
+    def set_page_range(self, page_range: Optional[Tuple[int, int]] = None, max_pages: Optional[int] = None) -> None:
+        """
+        Limit extraction to a page range and/or a maximum number of pages.
+        
+        Args:
+            page_range: (first, last), 1-based and inclusive; last = 0 means to the end
+            max_pages: Maximum number of pages, counted from the first page of the range
+        """
+        if max_pages is not None and max_pages < 1:
+            raise ValueError("max_pages must be at least 1")
+        self.page_range = page_range
+        self.max_pages = max_pages
+    
+    def _resolve_pages(self, total: Optional[int] = None) -> Optional[Tuple[int, int]]:
+        """Pages to extract as (first, last), or None for the whole document; last = 0 if unknown."""
+        if not self.page_range and not self.max_pages:
+            return None
+        first, last = self.page_range or (1, 0)
+        if self.max_pages:
+            limit = first + self.max_pages - 1
+            last = min(last, limit) if last else limit
+        if total is not None:
+            if first > total:
+                raise ValueError(f"Page range starts at page {first} but the document has {total} pages")
+            last = min(last, total) if last else total
+        return first, last
     
     def extract_from_file(self, file_path: str) -> str:
         self.source_path = file_path
         if not os.path.isfile(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        with open(file_path, "rb") as f:
-            files = {
-                "files": (os.path.basename(file_path), f, "application/pdf")
-            }
-            try:
+        pages = None
+        total = None
+        if self.page_range or self.max_pages:
+            total = count_pdf_pages(file_path)
+            pages = self._resolve_pages(total)
+            self.pages = {"first": pages[0], "last": pages[1] or None, "total": total}
+        
+        # The pre-scan reads the source itself, so decide the route before slicing anything
+        if self._extract_fast_path(file_path, pages):
+            return self.markdown_content
+        
+        started = time.perf_counter()
+        try:
+            markdown = self._extract_with_page_cache(file_path, pages)
+            if markdown is None:
                 print("pdf_extractor: Extracting content from PDF...")
-                self.markdown_content = self._send_request(files)
-            except RuntimeError as e:
-                print("pdf_extractor: " + str(e))
-                if "Connection error to docling-serve" in str(e) and not self.use_fallback:
-                    print("pdf_extractor: Docling-serve not available, using fallback methods...")
-                    self.use_fallback = True
-                    self.markdown_content = self._extract_text_fallback(file_path)
-                else:
-                    raise e
-            
+                markdown = self._convert_pages(file_path, pages, total)
+            self.markdown_content = markdown
+        except RuntimeError as e:
+            print("pdf_extractor: " + str(e))
+            if "Connection error to docling-serve" in str(e) and not self.use_fallback:
+                print("pdf_extractor: Docling-serve not available, using fallback methods...")
+                self.use_fallback = True
+                EXTRACTION_FALLBACKS.inc()
+                with observe_stage("fallback_extraction"):
+                    self.markdown_content = self._extract_text_fallback(file_path, pages)
+            else:
+                raise e
+        
+        scan = self.routing.get("scan") if self.routing else None
+        if scan and not self.use_fallback:
+            page_cache = self.routing.get("page_cache")
+            converted = page_cache["extracted"] if page_cache else scan["pages"]
+            if converted:
+                docling_speed.record(time.perf_counter() - started, converted)
         return self.markdown_content
     
-    def _extract_text_fallback(self, file_path: str) -> str:
+    def _convert_pages(
+        self,
+        file_path: str,
+        pages: Optional[Tuple[int, int]],
+        total: Optional[int],
+        options: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """Send pages first..last (the whole document if pages is None) to docling in one request."""
+        # Slice the requested pages locally: docling time scales with page count and
+        # not every docling-serve version supports page_range
+        upload_path = file_path
+        page_range = None
+        if pages and not (total is not None and pages == (1, total)):
+            candidate = f"{file_path}.pages-{pages[0]}-{pages[1]}.pdf"
+            if total is not None and slice_pdf(file_path, pages[0], pages[1], candidate):
+                upload_path = candidate
+            else:
+                page_range = pages
+        try:
+            with open(upload_path, "rb") as f:
+                files = {
+                    "files": (os.path.basename(file_path), f, "application/pdf")
+                }
+                return self._send_request(files, page_range, options)
+        finally:
+            if upload_path != file_path and os.path.exists(upload_path):
+                os.remove(upload_path)
+    
+    def _extract_with_page_cache(self, file_path: str, pages: Optional[Tuple[int, int]]) -> Optional[str]:
+        """
+        Convert only the pages whose content hash is not cached and stitch in the cached ones.
+        
+        Each run of consecutive missing pages goes to docling as one request, so
+        a cold document costs a single conversion with its cross-page layout
+        intact; docling marks the page breaks (md_page_break_placeholder) and
+        the output is split per page for the cache. Runs are converted in
+        parallel up to the pool's capacity. Disabled with PAGE_CACHE=false; the
+        cache lives in PAGE_CACHE_DIR (default cache/pages/).
+        
+        Returns:
+            Markdown of the page range, or None if the page cache cannot be used
+        """
+        if os.getenv("PAGE_CACHE", "true").lower() in ("false", "0", "off"):
+            return None
+        total = count_pdf_pages(file_path)
+        first, last = pages or (1, total or 0)
+        try:
+            hashes = page_hashes(file_path, first, last)
+        except Exception as e:
+            print(f"pdf_extractor: Cannot hash pages, converting the whole range: {e}")
+            hashes = None
+        if not hashes:
+            return None
+        
+        cache = PageCache(os.getenv("PAGE_CACHE_DIR", PAGE_CACHE_DIR))
+        markdown = [cache.get(key) for key in hashes]
+        missing = [index for index, page in enumerate(markdown) if page is None]
+        runs = []
+        for index in missing:
+            if runs and runs[-1][1] == index - 1:
+                runs[-1][1] = index
+            else:
+                runs.append([index, index])
+        print(f"pdf_extractor: {len(hashes) - len(missing)}/{len(hashes)} pages cached, "
+              f"converting {len(missing)} in {len(runs)} request(s)")
+        
+        def convert(run: List[int]) -> List[str]:
+            start, end = run
+            output = self._convert_pages(
+                file_path, (first + start, first + end), total, {"md_page_break_placeholder": PAGE_BREAK}
+            )
+            parts = output.split(PAGE_BREAK)
+            if len(parts) != end - start + 1:
+                # docling-serve without page break markers: use the run as one block, uncached
+                print(f"pdf_extractor: {len(parts)} page parts for {end - start + 1} pages, not caching them")
+                return [output] + [""] * (end - start)
+            for index, page in zip(range(start, end + 1), parts):
+                cache.put(hashes[index], page)
+            return parts
+        
+        workers = max(1, min(len(runs), sum(i.max_concurrent for i in self.docling_pool.instances)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for run, parts in zip(runs, executor.map(convert, runs)):
+                markdown[run[0]:run[1] + 1] = parts
+        
+        if self.routing is not None:
+            self.routing["page_cache"] = {"pages": len(hashes), "reused": len(hashes) - len(missing), "extracted": len(missing)}
+        return stitch_pages(markdown)
+    
+    def _extract_fast_path(self, file_path: str, pages: Optional[Tuple[int, int]]) -> bool:
+        """
+        Pre-scan the PDF and, for simple born-digital layouts, extract it from the text layer.
+        
+        Returns:
+            True if markdown_content was filled from the text layer, False if docling is needed
+        """
+        try:
+            with observe_stage("prescan"):
+                scan = prescan_pdf(file_path, pages)
+        except Exception as e:
+            print(f"pdf_extractor: Pre-scan failed: {e}")
+            scan = None
+        route, reason = choose_route(scan)
+        self.routing = {"route": route, "reason": reason, "scan": scan}
+        
+        if route == "fast":
+            started = time.perf_counter()
+            try:
+                with observe_stage("fast_extraction"):
+                    markdown = extract_text_layer(file_path, pages, scan["columns"])
+            except Exception as e:
+                print(f"pdf_extractor: Text-layer extraction failed: {e}")
+                markdown = ""
+            seconds = time.perf_counter() - started
+            # The sample looked fine but the whole text layer is too sparse to trust
+            if len(markdown) < MIN_PAGE_CHARS * scan["pages"] / 2:
+                route, reason = "docling", "text layer too sparse after extraction"
+                self.routing.update(route=route, reason=reason)
+            else:
+                saved = max(0.0, docling_speed.estimate(scan["pages"]) - seconds)
+                self.routing.update(seconds=round(seconds, 3), saved_seconds=round(saved, 2))
+                FAST_PATH_SAVED_SECONDS.inc(saved)
+                self.markdown_content = markdown
+        
+        EXTRACTION_ROUTES.labels(route).inc()
+        print(f"pdf_extractor: Routing to {route} ({reason})")
+        return route == "fast"
+    
+    def _extract_text_fallback(self, file_path: str, page_range: Optional[Tuple[int, int]] = None) -> str:
+        """Extract plain text locally; page_range is (first, last), 1-based, last = 0 for the end."""
         extracted_text = ""
+        first = page_range[0] - 1 if page_range else 0
+        last = page_range[1] if page_range and page_range[1] else None
         
         # First try fitz (PyMuPDF)
         try:
             import fitz  # PyMuPDF
             print("Trying extraction with fitz (PyMuPDF)...")
             doc = fitz.open(file_path)
-            for page_num in range(len(doc)):
+            for page_num in range(first, min(last or len(doc), len(doc))):
                 page = doc[page_num]
                 extracted_text += page.get_text() + "\n\n"
             doc.close()
@@ -78,7 +331,7 @@ class PDFExtractor:
             print("Trying extraction with PyPDF2...")
             with open(file_path, 'rb') as f:
                 pdf_reader = PyPDF2.PdfReader(f)
-                for page_num in range(len(pdf_reader.pages)):
+                for page_num in range(first, min(last or len(pdf_reader.pages), len(pdf_reader.pages))):
                     page = pdf_reader.pages[page_num]
                     extracted_text += page.extract_text() + "\n\n"
                 
@@ -96,7 +349,7 @@ class PDFExtractor:
             import pdfplumber
             print("Trying extraction with pdfplumber...")
             with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
+                for page in pdf.pages[first:last]:
                     text = page.extract_text()
                     if text:
                         extracted_text += text + "\n\n"
@@ -115,6 +368,9 @@ class PDFExtractor:
             import textract
             print("Trying extraction with textract...")
             extracted_text = textract.process(file_path, method='pdfminer').decode('utf-8')
+            if page_range:
+                # pdfminer separates pages with form feeds
+                extracted_text = "\n\n".join(extracted_text.split("\f")[first:last])
             if extracted_text:
                 print("textract extraction successful")
                 return f"# Extracted content\n\n{extracted_text}"
@@ -135,12 +391,18 @@ class PDFExtractor:
             "url": (None, url)
         }
         
+        # Docling downloads the URL itself, so the range can only be passed along
+        page_range = self._resolve_pages()
+        if page_range:
+            self.pages = {"first": page_range[0], "last": page_range[1] or None, "total": None}
+        
         try:
-            self.markdown_content = self._send_request(files)
+            self.markdown_content = self._send_request(files, page_range)
         except RuntimeError as e:
             if "Error connecting to docling-serve" in str(e) and not self.use_fallback:
                 print("Docling-serve không khả dụng, đang tải PDF từ URL và sử dụng phương thức dự phòng...")
                 self.use_fallback = True
+                EXTRACTION_FALLBACKS.inc()
                 try:
                     temp_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp_download.pdf")
                     r = requests.get(url, stream=True)
@@ -148,7 +410,8 @@ class PDFExtractor:
                     with open(temp_file, 'wb') as f:
                         for chunk in r.iter_content(chunk_size=8192):
                             f.write(chunk)
-                    self.markdown_content = self._extract_text_fallback(temp_file)
+                    with observe_stage("fallback_extraction"):
+                        self.markdown_content = self._extract_text_fallback(temp_file, page_range)
                     if os.path.exists(temp_file):
                         os.remove(temp_file)
                 except Exception as dl_error:
@@ -158,13 +421,52 @@ class PDFExtractor:
         
         return self.markdown_content
     
-    def _send_request(self, files: Dict[str, Any]) -> str:
+    def _send_request(
+        self,
+        files: Dict[str, Any],
+        page_range: Optional[Tuple[int, int]] = None,
+        options: Optional[Dict[str, str]] = None,
+    ) -> str:
         data = {
             "output_formats": "md"
         }
-        try:
-            resp = requests.post(self.docling_url, files=files, data=data, timeout=180)  # Add timeout
-            resp.raise_for_status()
+        data.update(options or {})
+        if page_range:
+            # docling-serve takes page_range as two form values [first, last]
+            data["page_range"] = [str(page_range[0]), str(page_range[1] or sys.maxsize)]
+        # Try another instance after a connection error or 5xx, up to DOCLING_RETRIES times
+        attempts = min(len(self.docling_pool), int(os.getenv("DOCLING_RETRIES", "2")) + 1)
+        tried = set()
+        last_error = None
+        for _ in range(attempts):
+            instance = self.docling_pool.acquire(
+                exclude=tried, timeout=float(os.getenv("DOCLING_ACQUIRE_TIMEOUT", "600"))
+            )
+            if instance is None:
+                break
+            tried.add(instance.url)
+            for value in files.values():
+                # Rewind uploaded files for a retry
+                if isinstance(value, tuple) and hasattr(value[1], "seek"):
+                    value[1].seek(0)
+            
+            start = time.perf_counter()
+            try:
+                with observe_stage("docling_request"):
+                    resp = requests.post(instance.url, files=files, data=data, timeout=180)  # Add timeout
+                resp.raise_for_status()
+            except requests.RequestException as e:
+                response = getattr(e, "response", None)
+                client_error = response is not None and response.status_code < 500
+                # A 4xx is about the document, not the instance, so it is neither retried nor held against it
+                self.docling_pool.release(instance, time.perf_counter() - start, ok=client_error)
+                if client_error:
+                    raise RuntimeError(f"pdf_extractor: docling-serve rejected the document: {str(e)}")
+                print(f"pdf_extractor: docling-serve at {instance.url} failed: {str(e)}")
+                last_error = e
+                continue
+            self.docling_pool.release(instance, time.perf_counter() - start, ok=True)
+            
             result = resp.json()
             md = None
             if "document" in result:
@@ -176,16 +478,16 @@ class PDFExtractor:
                 raise RuntimeError("pdf_extractor: Did not receive Markdown content from server. Response keys: {list(result.keys())}")
             
             return md
-        except requests.RequestException as e:
-            raise RuntimeError(f"pdf_extractor: Connection error to docling-serve: {str(e)}")
+        raise RuntimeError(f"pdf_extractor: Connection error to docling-serve: {str(last_error)}")
     
     def clean_base64_images(self, min_length: int = 100) -> str:
         if not self.markdown_content:
             raise ValueError("pdf_extractor: No Markdown content to clean. Please extract content first.")
-        
+    
         pattern = rf'!\[.*?\]\(data:image\/[^;]+;base64,[a-zA-Z0-9+/=]{{{min_length},}}\)'
-        self.markdown_content = re.sub(pattern, '![Image removed to reduce file size]', self.markdown_content)
-        
+        with observe_stage("image_cleaning"):
+            self.markdown_content = re.sub(pattern, '![Image removed to reduce file size]', self.markdown_content)
+    
         return self.markdown_content
     
     def set_clean_images(self, clean: bool) -> None:
@@ -194,7 +496,7 @@ class PDFExtractor:
     def get_output_filename(self) -> str:
         if not self.source_path:
             raise ValueError("pdf_extractor: No data source. Please call extract_from_file or extract_from_url first.")
-        
+    
         if self.source_path.startswith(("http://", "https://")):
             parsed_url = urllib.parse.urlparse(self.source_path)
             file_name = os.path.basename(parsed_url.path)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Pre-scan of PDFs and a fast text-layer extraction path.
+
+Most uploads are born-digital papers whose text layer is clean, so the
+docling layout and OCR models add little but cost seconds per page. A cheap
+scan of a sample of pages measures text-layer coverage, image area and
+column count; simple documents are extracted locally from the text layer
+with PyMuPDF and docling is kept for scanned or complex layouts.
+"""
+import os
+import re
+import time
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+
+# A page with less text than this is treated as scanned / image-only
+MIN_PAGE_CHARS = 200
+
+
+def _sample_pages(first: int, last: int, sample: int) -> List[int]:
+    """Up to ``sample`` 0-based page indices spread evenly over first..last (1-based)."""
+    count = last - first + 1
+    if count <= sample:
+        return list(range(first - 1, last))
+    step = count / sample
+    return sorted({first - 1 + int(i * step) for i in range(sample)})
+
+
+def _count_columns(blocks: List[Tuple[float, float, float, float]], page_width: float) -> int:
+    """Estimate the column count from where wide text blocks start."""
+    starts = [x0 for x0, y0, x1, y1 in blocks if (x1 - x0) > page_width * 0.2]
+    if len(starts) < 4:
+        return 1
+    # Blocks starting in the right half of the page belong to a second column
+    right = sum(1 for x0 in starts if x0 > page_width * 0.45)
+    narrow = sum(1 for x0, y0, x1, y1 in blocks if (x1 - x0) < page_width * 0.3 and (x1 - x0) > page_width * 0.15)
+    if right >= 2 and narrow >= len(starts) * 0.5:
+        return 3
+    return 2 if right >= 2 else 1
+
+
+def prescan_pdf(file_path: str, pages: Optional[Tuple[int, int]] = None, sample: int = 8) -> Optional[Dict[str, Any]]:
+    """
+    Measure a sample of pages.
+
+    Args:
+        file_path: Local PDF
+        pages: (first, last), 1-based; None for the whole document
+        sample: Pages to inspect
+
+    Returns:
+        {"pages", "sampled", "text_coverage", "chars_per_page", "image_ratio",
+         "columns", "seconds"}, or None if PyMuPDF is not installed
+    """
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        return None
+
+    start = time.perf_counter()
+    with fitz.open(file_path) as doc:
+        total = len(doc)
+        first, last = pages or (1, total)
+        last = min(last or total, total)
+        indices = _sample_pages(first, last, sample)
+        with_text = 0
+        chars = 0
+        image_ratios = []
+        columns = []
+        for index in indices:
+            page = doc[index]
+            area = abs(page.rect) or 1.0
+            text_blocks = []
+            image_area = 0.0
+            page_chars = 0
+            for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks"):
+                if block_type == 1:
+                    image_area += (x1 - x0) * (y1 - y0)
+                else:
+                    page_chars += len(text.strip())
+                    text_blocks.append((x0, y0, x1, y1))
+            for info in page.get_image_info():
+                x0, y0, x1, y1 = info["bbox"]
+                image_area += max(0.0, (x1 - x0) * (y1 - y0))
+            chars += page_chars
+            with_text += page_chars >= MIN_PAGE_CHARS
+            image_ratios.append(min(image_area / area, 1.0))
+            columns.append(_count_columns(text_blocks, page.rect.width))
+
+    sampled = len(indices) or 1
+    return {
+        "pages": last - first + 1,
+        "sampled": len(indices),
+        "text_coverage": round(with_text / sampled, 3),
+        "chars_per_page": round(chars / sampled),
+        "image_ratio": round(sum(image_ratios) / sampled, 3),
+        "columns": Counter(columns).most_common(1)[0][0] if columns else 1,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+def choose_route(scan: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+    """
+    Decide between the fast text-layer path and docling.
+
+    Policy (environment):
+        FAST_PATH: auto (default), off, or always (whenever a text layer exists)
+        FAST_PATH_MIN_TEXT_COVERAGE: share of pages with a text layer (default 0.9)
+        FAST_PATH_MAX_IMAGE_RATIO: average share of page area covered by images (default 0.3)
+        FAST_PATH_MAX_COLUMNS: most columns the fast path handles (default 2)
+
+    Returns:
+        ("fast" or "docling", reason)
+    """
+    mode = os.getenv("FAST_PATH", "auto").lower()
+    if mode == "off":
+        return "docling", "fast path disabled"
+    if scan is None:
+        return "docling", "PyMuPDF not installed"
+    if scan["text_coverage"] == 0:
+        return "docling", "no text layer"
+    if mode == "always":
+        return "fast", "fast path forced"
+
+    if scan["text_coverage"] < float(os.getenv("FAST_PATH_MIN_TEXT_COVERAGE", "0.9")):
+        return "docling", f"text layer on only {scan['text_coverage']:.0%} of pages"
+    if scan["image_ratio"] > float(os.getenv("FAST_PATH_MAX_IMAGE_RATIO", "0.3")):
+        return "docling", f"images cover {scan['image_ratio']:.0%} of the page area"
+    if scan["columns"] > int(os.getenv("FAST_PATH_MAX_COLUMNS", "2")):
+        return "docling", f"{scan['columns']}-column layout"
+    return "fast", "born-digital text layer"
+
+
+def _text_blocks(page: Any) -> List[Dict[str, Any]]:
+    import fitz  # PyMuPDF
+    # TEXTFLAGS_TEXT skips decoding embedded images, which dominates the cost of "dict"
+    return [block for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"] if block.get("type") == 0]
+
+
+def _page_markdown(page: Any, columns: int, body_size: float) -> List[str]:
+    """Text blocks of one page in reading order, with larger-font lines as headings."""
+    width = page.rect.width
+    blocks = _text_blocks(page)
+    if columns > 1:
+        # Left column before right column; full-width blocks (titles) keep their vertical position
+        def order(block):
+            x0, y0, x1, _ = block["bbox"]
+            right_column = x0 >= width * 0.45 and (x1 - x0) <= width * 0.6
+            return (right_column, y0)
+        blocks.sort(key=order)
+    else:
+        blocks.sort(key=lambda block: (block["bbox"][1], block["bbox"][0]))
+
+    parts = []
+    for block in blocks:
+        lines = []
+        largest = 0.0
+        for line in block["lines"]:
+            if abs(line["dir"][1]) > 0.1:
+                continue  # rotated text, e.g. the arXiv identifier in the margin
+            text = "".join(span["text"] for span in line["spans"]).strip()
+            if text:
+                lines.append(text)
+                largest = max([largest] + [span["size"] for span in line["spans"] if span["text"].strip()])
+        if not lines:
+            continue
+        text = " ".join(lines)
+        # Re-join words hyphenated across line breaks
+        text = re.sub(r"(\w)- (\w)", r"\1\2", text)
+        if largest >= body_size * 1.15 and len(text) < 120:
+            parts.append(f"## {text}")
+        else:
+            parts.append(text)
+    return parts
+
+
+def extract_text_layer(file_path: str, pages: Optional[Tuple[int, int]] = None, columns: int = 1) -> str:
+    """
+    Extract markdown from the PDF's text layer with PyMuPDF.
+
+    Args:
+        file_path: Local PDF
+        pages: (first, last), 1-based; None for the whole document
+        columns: Column count from the pre-scan, used for reading order
+
+    Returns:
+        Markdown with headings detected from font size
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(file_path) as doc:
+        first, last = pages or (1, len(doc))
+        last = min(last or len(doc), len(doc))
+        # The most common font size (by characters) is the body text size
+        sizes = Counter()
+        for index in _sample_pages(first, last, 5):
+            for block in _text_blocks(doc[index]):
+                for line in block["lines"]:
+                    for span in line["spans"]:
+                        sizes[round(span["size"], 1)] += len(span["text"])
+        body_size = sizes.most_common(1)[0][0] if sizes else 10.0
+
+        parts = []
+        for index in range(first - 1, last):
+            parts.extend(_page_markdown(doc[index], columns, body_size))
+    return "\n\n".join(parts)
+
+
+class DoclingSpeed:
+    """Rolling docling seconds per page, used to estimate the time the fast path saved."""
+
+    def __init__(self, default: float):
+        self.seconds_per_page = default
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, pages: int) -> None:
+        if pages <= 0:
+            return
+        with self._lock:
+            # Exponential moving average, so the estimate follows the current docling hardware
+            self.seconds_per_page = 0.8 * self.seconds_per_page + 0.2 * (seconds / pages)
+
+    def estimate(self, pages: int) -> float:
+        with self._lock:
+            return self.seconds_per_page * pages
+
+
+docling_speed = DoclingSpeed(float(os.getenv("DOCLING_SECONDS_PER_PAGE", "1.0")))
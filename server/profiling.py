@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+import os
+import io
+import re
+import hmac
+import time
+import uuid
+import pstats
+import random
+import cProfile
+import functools
+import threading
+import contextvars
+import tracemalloc
+from typing import Callable, Dict, Any, Optional, List
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:  # pragma: no cover - optional dependency
+    SamplingProfiler = None
+
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+
+# Request ids end up in file names, so only accept simple tokens
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Profile state of the request being handled, for work it hands to worker threads
+_current_profile: contextvars.ContextVar = contextvars.ContextVar("current_profile", default=None)
+
+
+class RequestProfiler:
+    """
+    Opt-in profiling of individual requests.
+
+    A request is profiled when it carries the admin token in the
+    ``X-Profile-Token`` header, or when it is picked by the sampling rate.
+    At most ``max_concurrent`` requests are profiled at once; others run
+    normally. Each profile is stored as artifacts keyed by request id.
+    """
+
+    TOKEN_HEADER = "x-profile-token"
+
+    def __init__(
+        self,
+        admin_token: Optional[str] = None,
+        sample_rate: Optional[float] = None,
+        max_concurrent: Optional[int] = None,
+        profile_dir: str = PROFILE_DIR,
+        trace_memory: bool = True,
+    ):
+        self.admin_token = admin_token or os.getenv("PROFILE_ADMIN_TOKEN")
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.max_concurrent = max_concurrent or int(os.getenv("PROFILE_MAX_CONCURRENT", "1"))
+        if SamplingProfiler is None:
+            # cProfile traces the whole thread and only one can be active at a time
+            self.max_concurrent = 1
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._tracing = 0
+        self._started_tracing = False
+
+        if not os.path.exists(self.profile_dir):
+            os.makedirs(self.profile_dir)
+
+    def is_admin(self, headers) -> bool:
+        token = headers.get(self.TOKEN_HEADER)
+        return bool(self.admin_token) and token is not None and hmac.compare_digest(
+            token.encode("utf-8"), self.admin_token.encode("utf-8")
+        )
+
+    def should_profile(self, headers) -> bool:
+        if self.is_admin(headers):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def try_acquire(self) -> bool:
+        """Reserve a profiling slot without waiting."""
+        return self._slots.acquire(blocking=False)
+
+    def start(self, request_id: str, method: str, path: str) -> Optional[Dict[str, Any]]:
+        """Start profiling; the caller must own a slot from try_acquire."""
+        try:
+            return self._start(request_id, method, path)
+        except Exception as e:
+            print(f"profiling: Failed to start profiler: {e}")
+            self._slots.release()
+            return None
+
+    def _start(self, request_id: str, method: str, path: str) -> Dict[str, Any]:
+        state = {
+            "request_id": request_id,
+            "method": method,
+            "path": path,
+            "started": time.time(),
+            "wall_start": time.perf_counter(),
+            "workers": [],
+        }
+        if SamplingProfiler is not None:
+            # Async-aware sampling profiler, only attributes time spent in this request
+            profiler = SamplingProfiler(async_mode="enabled")
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        state["profiler"] = profiler
+        state["context_token"] = _current_profile.set(state)
+
+        if self.trace_memory:
+            with self._lock:
+                if self._tracing == 0:
+                    # Leave tracing alone if someone else (e.g. python -X tracemalloc) started it
+                    self._started_tracing = not tracemalloc.is_tracing()
+                    if self._started_tracing:
+                        tracemalloc.start(25)
+                self._tracing += 1
+            state["snapshot"] = tracemalloc.take_snapshot()
+        return state
+
+    def stop(self, state: Dict[str, Any], status_code: Optional[int] = None) -> None:
+        """Stop profiling, write the artifacts and release the slot."""
+        try:
+            _current_profile.reset(state.pop("context_token"))
+            profiler = state["profiler"]
+            if SamplingProfiler is not None:
+                profiler.stop()
+            else:
+                profiler.disable()
+            elapsed = time.perf_counter() - state["wall_start"]
+
+            memory_lines = []
+            if "snapshot" in state:
+                after = tracemalloc.take_snapshot()
+                memory_lines = self._memory_diff(state["snapshot"], after)
+                with self._lock:
+                    self._tracing -= 1
+                    if self._tracing == 0 and self._started_tracing:
+                        tracemalloc.stop()
+
+            self._write_artifacts(state, profiler, elapsed, status_code, memory_lines)
+        except Exception as e:
+            print(f"profiling: Failed to save profile {state.get('request_id')}: {e}")
+        finally:
+            self._slots.release()
+
+    def profile_worker(self, func: Callable) -> Callable:
+        """
+        Wrap blocking work handed to a thread pool so it is profiled along with
+        the current request; unchanged if the request is not profiled.
+
+        The request profiler samples the event-loop thread, where a thread-pool
+        call only shows up as an await.
+        """
+        state = _current_profile.get()
+        if state is None:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            name = getattr(func, "__qualname__", repr(func))
+            started = time.perf_counter()
+            try:
+                if SamplingProfiler is not None:
+                    profiler = SamplingProfiler(async_mode="disabled")
+                    profiler.start()
+                else:
+                    profiler = cProfile.Profile()
+                    profiler.enable()
+            except Exception as e:
+                # cProfile refuses a second active profiler on Python 3.12+
+                print(f"profiling: Cannot profile worker {name}: {e}")
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if SamplingProfiler is not None:
+                    profiler.stop()
+                    text = profiler.output_text(unicode=True, color=False)
+                else:
+                    profiler.disable()
+                    buffer = io.StringIO()
+                    pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(40)
+                    text = buffer.getvalue()
+                state["workers"].append({"name": name, "seconds": time.perf_counter() - started, "text": text})
+        return wrapper
+
+    def _memory_diff(self, before, after, limit: int = 30) -> List[str]:
+        stats = after.compare_to(before, "lineno")
+        return [str(stat) for stat in stats[:limit]]
+
+    def _write_artifacts(
+        self,
+        state: Dict[str, Any],
+        profiler,
+        elapsed: float,
+        status_code: Optional[int],
+        memory_lines: List[str],
+    ) -> None:
+        request_id = state["request_id"]
+        base = os.path.join(self.profile_dir, request_id)
+
+        if SamplingProfiler is not None:
+            with open(f"{base}.html", "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            profile_text = profiler.output_text(unicode=True, color=False)
+        else:
+            profiler.dump_stats(f"{base}.prof")
+            buffer = io.StringIO()
+            pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(40)
+            profile_text = buffer.getvalue()
+
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(f"Request: {state['method']} {state['path']}\n")
+            f.write(f"Request ID: {request_id}\n")
+            f.write(f"Started: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(state['started']))}\n")
+            f.write(f"Status: {status_code}\n")
+            f.write(f"Elapsed: {elapsed:.3f}s\n\n")
+            f.write("== Profile ==\n\n")
+            f.write(profile_text)
+            for worker in state["workers"]:
+                f.write(f"\n\n== Worker thread: {worker['name']} ({worker['seconds']:.3f}s) ==\n\n")
+                f.write(worker["text"])
+            if memory_lines:
+                f.write("\n\n== Memory allocated during request (tracemalloc diff) ==\n\n")
+                f.write("\n".join(memory_lines))
+                f.write("\n")
+
+        print(f"profiling: Saved profile for {state['method']} {state['path']} to {base}.*")
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        profiles = {}
+        for name in os.listdir(self.profile_dir):
+            request_id, ext = os.path.splitext(name)
+            entry = profiles.setdefault(request_id, {"request_id": request_id, "formats": []})
+            entry["formats"].append(ext.lstrip("."))
+            entry["created"] = os.path.getmtime(os.path.join(self.profile_dir, name))
+        return sorted(profiles.values(), key=lambda p: p["created"], reverse=True)
+
+    def artifact_path(self, request_id: str, fmt: str = "txt") -> Optional[str]:
+        if not REQUEST_ID_PATTERN.match(request_id) or fmt not in ("txt", "html", "prof"):
+            return None
+        path = os.path.join(self.profile_dir, f"{request_id}.{fmt}")
+        return path if os.path.exists(path) else None
+
+
+def new_request_id(headers) -> str:
+    """
+    Request id for logs and profile artifacts.
+
+    A caller's X-Request-ID only suffixes a server-generated id, so callers can
+    correlate requests but never choose (and overwrite) another profile's files.
+    """
+    request_id = uuid.uuid4().hex
+    client_id = headers.get("x-request-id")
+    if client_id and REQUEST_ID_PATTERN.match(client_id):
+        request_id = f"{request_id}-{client_id}"[:64]
+    return request_id
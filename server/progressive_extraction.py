@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Progressive PDF extraction in page batches.
+
+The PDF is converted ``batch_pages`` pages at a time in a background thread.
+The extraction counts as ready once ``ready_words`` words are available, so
+an exam can be generated from the first part of a long document while the
+rest is still being converted.
+"""
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, Any, List, Optional, Tuple
+
+from docling_pool import DoclingPool
+from pdf_extractor import PDFExtractor
+from metrics import observe_stage
+
+
+class ProgressiveExtraction:
+    """
+    Extract pages first..last of a PDF in batches on a background thread.
+
+    Args:
+        pdf_path: Local PDF file
+        pages: (first, last), 1-based and inclusive
+        on_update: Called with the markdown extracted so far after every batch
+        docling_pool: docling-serve pool, default of PDFExtractor if None
+        batch_pages: Pages per docling request
+        ready_words: Words after which the extraction counts as ready
+        batch_slot: Returns a context held around each batch converted after the
+            extraction is ready, once the request that started it no longer
+            holds its admission slot
+    """
+
+    def __init__(
+        self,
+        pdf_path: str,
+        pages: Tuple[int, int],
+        on_update: Callable[[str, bool], None],
+        docling_pool: Optional[DoclingPool] = None,
+        batch_pages: int = 10,
+        ready_words: int = 2500,
+        batch_slot: Optional[Callable[[], ContextManager]] = None,
+    ):
+        self.pdf_path = pdf_path
+        self.first, self.last = pages
+        self.on_update = on_update
+        self.docling_pool = docling_pool
+        self.batch_pages = max(1, batch_pages)
+        self.ready_words = ready_words
+        self.batch_slot = batch_slot
+        self.ready = threading.Event()
+        self.done = threading.Event()
+        self.status = "extracting"
+        self.pages_done = 0
+        self.words = 0
+        self.error = None
+        self.started = time.time()
+        self.ready_after = None
+        self._parts: List[str] = []
+        self._thread = threading.Thread(target=self._run, name="progressive-extraction", daemon=True)
+
+    def start(self) -> "ProgressiveExtraction":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        try:
+            for batch_first in range(self.first, self.last + 1, self.batch_pages):
+                batch_last = min(batch_first + self.batch_pages - 1, self.last)
+                # A fresh extractor per batch, so one fallback does not stick for the whole document
+                extractor = PDFExtractor(docling_pool=self.docling_pool)
+                extractor.set_page_range((batch_first, batch_last))
+                slot = self.batch_slot() if self.batch_slot and self.ready.is_set() else nullcontext()
+                with slot, observe_stage("progressive_batch"):
+                    markdown = extractor.extract_from_file(self.pdf_path)
+                    if markdown:
+                        extractor.clean_base64_images()
+                self._parts.append(extractor.markdown_content or "")
+                self.pages_done += batch_last - batch_first + 1
+                complete = batch_last == self.last
+
+                content = "\n\n".join(part for part in self._parts if part)
+                self.words = len(content.split())
+                self.on_update(content, complete)
+                if not self.ready.is_set() and (self.words >= self.ready_words or complete):
+                    self.ready_after = time.time() - self.started
+                    self.status = "ready"
+                    self.ready.set()
+            self.status = "complete"
+        except Exception as e:
+            self.error = str(e)
+            self.status = "failed"
+            print(f"progressive_extraction: Failed after {self.pages_done} pages: {e}")
+        finally:
+            # Wake up waiters even on failure; they check ``status``
+            self.ready.set()
+            self.done.set()
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "pages_done": self.pages_done,
+            "pages_total": self.last - self.first + 1,
+            "words": self.words,
+            "ready_after": round(self.ready_after, 2) if self.ready_after is not None else None,
+            "error": self.error,
+        }
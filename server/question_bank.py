@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Local question bank of generated exams.
+
+Every saved JSON result is ingested into a SQLite database: the exam, its
+passages and its questions, indexed by paper hash, exam type, passage type
+(or TOEIC part), difficulty and question type, with FTS5 full-text indexes
+over passages and questions for keyword search. A generation in bank mode
+assembles the exam from this material in milliseconds when enough of it
+matches, and only calls the LLM otherwise.
+
+Questions flagged by the grounding check (answer_grounding.py) and exams
+that failed validation are stored but never reused.
+"""
+import os
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+
+from answer_grounding import STOPWORDS, tokenize
+from exam_repair import IELTS_CATEGORY_COUNTS
+from exam_validator import IELTS_MIN_WORDS, TOEIC_PART_RULES
+
+
+DEFAULT_BANK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bank", "questions.db")
+
+# First question number of TOEIC parts assembled from several exams
+TOEIC_FIRST_QUESTION = {5: 101, 6: 131}
+
+# Share of the document's keywords a passage must contain to be on its topic
+MIN_KEYWORD_SHARE = 0.5
+KEYWORD_COUNT = 12
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS exams (
+    id INTEGER PRIMARY KEY,
+    source TEXT UNIQUE,
+    result_hash TEXT,
+    paper_hash TEXT,
+    exam_type TEXT,
+    difficulty TEXT,
+    passage_type TEXT,
+    valid INTEGER,
+    created REAL,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS passages (
+    id INTEGER PRIMARY KEY,
+    exam_id INTEGER,
+    passage_number TEXT,
+    title TEXT,
+    content TEXT,
+    word_count INTEGER,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    exam_id INTEGER,
+    passage_id INTEGER,
+    question_type TEXT,
+    question_category INTEGER,
+    question_text TEXT,
+    grounded INTEGER,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS exams_lookup ON exams (exam_type, passage_type, difficulty, valid);
+CREATE INDEX IF NOT EXISTS exams_paper ON exams (paper_hash);
+CREATE INDEX IF NOT EXISTS passages_exam ON passages (exam_id);
+CREATE INDEX IF NOT EXISTS questions_exam ON questions (exam_id, passage_id);
+CREATE INDEX IF NOT EXISTS questions_type ON questions (question_type);
+CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5 (title, content);
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5 (question_text, explanation);
+"""
+
+
+def paper_hash(pdf_path: str) -> str:
+    """Identity of a paper: hash of the PDF file, or of the URL it was read from."""
+    digest = hashlib.sha256()
+    if os.path.exists(pdf_path):
+        with open(pdf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    else:
+        digest.update(pdf_path.encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def document_keywords(text: str, count: int = KEYWORD_COUNT) -> List[str]:
+    """Most frequent content words of a document, for topic matching."""
+    words = Counter(w for w in tokenize(text) if w not in STOPWORDS and len(w) > 3 and not w.isdigit())
+    return [word for word, _ in words.most_common(count)]
+
+
+def _fts_query(keywords: List[str]) -> str:
+    return " OR ".join(f'"{word}"' for word in keywords if '"' not in word)
+
+
+class QuestionBank:
+    """
+    SQLite question bank.
+
+    A connection is opened per operation, so the bank can be used from any
+    thread; writes are serialized by a lock.
+
+    Args:
+        path: Database file
+        scope: "paper" reuses material generated from the same paper only,
+            "topic" also from other papers whose passages share the document's keywords
+    """
+
+    def __init__(self, path: str = DEFAULT_BANK_PATH, scope: str = "paper"):
+        self.path = path
+        self.scope = scope
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def ingest(
+        self,
+        result: Dict[str, Any],
+        source: str,
+        paper: Optional[str],
+        exam_type: str,
+        difficulty: str,
+        passage_type: str,
+        report: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Store a saved result, replacing the previous result of the same source.
+
+        Args:
+            result: Exam result
+            source: Output file name (session id); a repaired result replaces the original
+            paper: Paper hash of the document the exam was generated from
+            exam_type, difficulty, passage_type: Generation parameters
+            report: Validation report of the result
+        """
+        data = json.dumps(result, ensure_ascii=False, sort_keys=True)
+        result_hash = hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+        suspects = {
+            issue["details"]["question_number"]
+            for issue in (report or {}).get("warnings", [])
+            if issue["code"] == "answer_not_grounded"
+        }
+        valid = bool(report and report.get("valid"))
+
+        with self._lock, self._connect() as db:
+            old = db.execute("SELECT id, result_hash FROM exams WHERE source = ?", (source,)).fetchone()
+            if old is not None and old["result_hash"] == result_hash:
+                return
+            if old is not None:
+                self._delete_exam(db, old["id"])
+
+            exam_id = db.execute(
+                "INSERT INTO exams (source, result_hash, paper_hash, exam_type, difficulty, passage_type, valid, created, data)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (source, result_hash, paper, exam_type.upper(), str(difficulty), str(passage_type), int(valid), time.time(), data),
+            ).lastrowid
+
+            passage_ids = {}
+            for passage in result.get("reading_passages") or []:
+                if not isinstance(passage, dict) or not isinstance(passage.get("content"), str):
+                    continue
+                passage_id = db.execute(
+                    "INSERT INTO passages (exam_id, passage_number, title, content, word_count, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        exam_id, str(passage.get("passage_number")), passage.get("title") or "", passage["content"],
+                        len(passage["content"].split()), json.dumps(passage, ensure_ascii=False),
+                    ),
+                ).lastrowid
+                db.execute(
+                    "INSERT INTO passages_fts (rowid, title, content) VALUES (?, ?, ?)",
+                    (passage_id, passage.get("title") or "", passage["content"]),
+                )
+                passage_ids[str(passage.get("passage_number"))] = passage_id
+
+            for question in result.get("questions") or []:
+                if not isinstance(question, dict):
+                    continue
+                question_id = db.execute(
+                    "INSERT INTO questions (exam_id, passage_id, question_type, question_category, question_text, grounded, data)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        exam_id, passage_ids.get(str(question.get("passage_reference"))),
+                        question.get("question_type"), question.get("question_category"),
+                        question.get("question_text") or "", int(question.get("question_number") not in suspects),
+                        json.dumps(question, ensure_ascii=False),
+                    ),
+                ).lastrowid
+                db.execute(
+                    "INSERT INTO questions_fts (rowid, question_text, explanation) VALUES (?, ?, ?)",
+                    (question_id, question.get("question_text") or "", str(question.get("explanation") or "")),
+                )
+
+    @staticmethod
+    def _delete_exam(db: sqlite3.Connection, exam_id: int) -> None:
+        db.execute("DELETE FROM passages_fts WHERE rowid IN (SELECT id FROM passages WHERE exam_id = ?)", (exam_id,))
+        db.execute("DELETE FROM questions_fts WHERE rowid IN (SELECT id FROM questions WHERE exam_id = ?)", (exam_id,))
+        db.execute("DELETE FROM passages WHERE exam_id = ?", (exam_id,))
+        db.execute("DELETE FROM questions WHERE exam_id = ?", (exam_id,))
+        db.execute("DELETE FROM exams WHERE id = ?", (exam_id,))
+
+    def _candidate_exams(
+        self,
+        db: sqlite3.Connection,
+        exam_type: str,
+        difficulty: str,
+        passage_type: str,
+        paper: Optional[str],
+        keywords: List[str],
+        exclude_source: Optional[str],
+    ) -> List[int]:
+        """Valid exams with the same parameters on the paper or, in topic scope, on its topic, best first."""
+        rows = db.execute(
+            "SELECT id, paper_hash FROM exams WHERE exam_type = ? AND passage_type = ? AND difficulty = ?"
+            " AND valid = 1 AND source IS NOT ? ORDER BY created DESC",
+            (exam_type, passage_type, difficulty, exclude_source),
+        ).fetchall()
+        same_paper = [row["id"] for row in rows if paper and row["paper_hash"] == paper]
+        if self.scope != "topic" or not keywords:
+            return same_paper
+
+        others = {row["id"] for row in rows if row["id"] not in same_paper}
+        on_topic = []
+        if others:
+            matches = db.execute(
+                "SELECT p.exam_id, p.content FROM passages_fts JOIN passages p ON p.id = passages_fts.rowid"
+                " WHERE passages_fts MATCH ? ORDER BY bm25(passages_fts) LIMIT 200",
+                (_fts_query(keywords),),
+            ).fetchall()
+            for match in matches:
+                if match["exam_id"] in others and match["exam_id"] not in on_topic:
+                    vocabulary = set(tokenize(match["content"]))
+                    if sum(word in vocabulary for word in keywords) >= MIN_KEYWORD_SHARE * len(keywords):
+                        on_topic.append(match["exam_id"])
+        return same_paper + on_topic
+
+    def assemble(
+        self,
+        exam_type: str,
+        difficulty: str,
+        passage_type: str,
+        paper: Optional[str] = None,
+        markdown: Optional[str] = None,
+        exclude_source: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Build an exam from banked material.
+
+        IELTS passages and TOEIC Part 7 sets are reused with their own
+        questions; TOEIC Part 5 questions and Part 6 passages are combined
+        from several exams.
+
+        Args:
+            exam_type, difficulty, passage_type: Requested exam
+            paper: Paper hash of the current document
+            markdown: Current document, for keyword matching in topic scope
+            exclude_source: Source whose own result must not be served back
+
+        Returns:
+            Exam result, or None if the bank has not enough matching material
+        """
+        exam_type = exam_type.upper()
+        keywords = document_keywords(markdown) if markdown and self.scope == "topic" else []
+        with self._connect() as db:
+            candidates = self._candidate_exams(
+                db, exam_type, str(difficulty), str(passage_type), paper, keywords, exclude_source
+            )
+            if not candidates:
+                return None
+            if exam_type == "TOEIC" and str(passage_type) in ("5", "6"):
+                return self._combine_toeic(db, int(passage_type), candidates)
+            for exam_id in candidates:
+                result = self._reuse_exam(db, exam_type, str(passage_type), exam_id)
+                if result is not None:
+                    return result
+        return None
+
+    def _questions(self, db: sqlite3.Connection, exam_id: int, passage_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        query = "SELECT data FROM questions WHERE exam_id = ? AND grounded = 1"
+        params: List[Any] = [exam_id]
+        if passage_id is not None:
+            query += " AND passage_id = ?"
+            params.append(passage_id)
+        return [json.loads(row["data"]) for row in db.execute(query + " ORDER BY id", params)]
+
+    def _reuse_exam(
+        self, db: sqlite3.Connection, exam_type: str, passage_type: str, exam_id: int
+    ) -> Optional[Dict[str, Any]]:
+        """A banked exam, if all the questions it needs are still usable."""
+        result = json.loads(db.execute("SELECT data FROM exams WHERE id = ?", (exam_id,)).fetchone()["data"])
+        questions = self._questions(db, exam_id)
+        if exam_type == "IELTS":
+            counts = Counter(q.get("question_category") for q in questions)
+            if any(counts[category] < expected for category, expected in IELTS_CATEGORY_COUNTS.items()):
+                return None
+            passages = result.get("reading_passages") or []
+            min_words = IELTS_MIN_WORDS.get(int(passage_type) if passage_type.isdigit() else 1, 700)
+            if not passages or any(len(str(p.get("content", "")).split()) < min_words for p in passages):
+                return None
+        else:
+            rules = TOEIC_PART_RULES.get(int(passage_type)) if passage_type.isdigit() else None
+            if rules and len(questions) < rules["questions"]:
+                return None
+        result["questions"] = questions
+        return result
+
+    def _combine_toeic(self, db: sqlite3.Connection, part: int, candidates: List[int]) -> Optional[Dict[str, Any]]:
+        """TOEIC Part 5 (single questions) or Part 6 (passages with 4 questions) from several exams."""
+        rules = TOEIC_PART_RULES[part]
+        first_number = TOEIC_FIRST_QUESTION[part]
+        # Material of the best candidates first, shuffled within each exam for variety
+        units, seen = [], set()
+        for exam_id in candidates:
+            if part == 5:
+                exam_units = [[q] for q in self._questions(db, exam_id)]
+            else:
+                exam_units = []
+                for row in db.execute("SELECT id, data FROM passages WHERE exam_id = ?", (exam_id,)):
+                    questions = self._questions(db, exam_id, row["id"])
+                    if len(questions) >= rules["questions"] // rules["passages"]:
+                        exam_units.append((json.loads(row["data"]), questions[:rules["questions"] // rules["passages"]]))
+            random.shuffle(exam_units)
+            for unit in exam_units:
+                key = unit[0].get("question_text") if part == 5 else unit[0].get("content")
+                if key not in seen:
+                    seen.add(key)
+                    units.append((exam_id, unit))
+        needed = rules["questions"] if part == 5 else rules["passages"]
+        if len(units) < needed:
+            return None
+
+        units = units[:needed]
+        base = json.loads(db.execute("SELECT data FROM exams WHERE id = ?", (units[0][0],)).fetchone()["data"])
+        passages, questions = [], []
+        for index, (_, unit) in enumerate(units, start=1):
+            if part == 5:
+                unit_questions = unit
+            else:
+                passage, unit_questions = dict(unit[0]), unit[1]
+                passage["passage_number"] = index
+                passages.append(passage)
+            for question in unit_questions:
+                question = dict(question, question_number=first_number + len(questions))
+                if part == 6:
+                    question["passage_reference"] = index
+                questions.append(question)
+        base["reading_passages"] = passages
+        base["questions"] = questions
+        return base
+
+    def stats(self) -> Dict[str, Any]:
+        """Banked exams and reusable questions per exam type, passage type and difficulty."""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT e.exam_type, e.passage_type, e.difficulty, COUNT(DISTINCT e.id) AS exams,"
+                " SUM(q.grounded) AS questions FROM exams e LEFT JOIN questions q ON q.exam_id = e.id"
+                " WHERE e.valid = 1 GROUP BY e.exam_type, e.passage_type, e.difficulty"
+            ).fetchall()
+            papers = db.execute("SELECT COUNT(DISTINCT paper_hash) FROM exams WHERE valid = 1").fetchone()[0]
+        return {
+            "scope": self.scope,
+            "papers": papers,
+            "groups": [dict(row) for row in rows],
+        }
+
+
+_bank: Optional[QuestionBank] = None
+_bank_lock = threading.Lock()
+
+
+def get_bank() -> QuestionBank:
+    """Process-wide bank at QUESTION_BANK_PATH."""
+    global _bank
+    with _bank_lock:
+        if _bank is None:
+            _bank = QuestionBank(
+                os.getenv("QUESTION_BANK_PATH", DEFAULT_BANK_PATH),
+                scope=os.getenv("QUESTION_BANK_SCOPE", "paper"),
+            )
+        return _bank
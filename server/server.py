@@ -2,20 +2,38 @@
 import os
 import sys
 import json
+import time
 import uuid
 import shutil
 import uvicorn
 import asyncio
 import requests
+import functools
 from typing import Dict, Any, Optional, Union, List
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, BackgroundTasks, Request
+from fastapi.responses import JSONResponse, FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from pathlib import Path
 
 # Import from existing modules
 from baseline import PaperToExam
+from pdf_extractor import parse_page_range
+from docling_pool import get_pool as get_docling_pool, urls_from_env as docling_urls_from_env
+from exam_validator import preload_validators
+from metrics import inflight, observe_stage, render_latest, track_sessions
+from profiling import RequestProfiler, new_request_id
+from llm_router import health_report
+from admission import admit, admission_slot, admission_report, thread_slot
+from singleflight import IdempotencyConflict, SingleFlight
+from exam_payload import Payload, PayloadCache, dumps, file_version, load_result_file
+from storage_sweeper import RetentionRule, StorageSweeper, hours_from_env
+from condenser import DEFAULT_CACHE_DIR as CONDENSE_CACHE_DIR
+from page_cache import DEFAULT_CACHE_DIR as PAGE_CACHE_DIR
+from usage_ledger import DEFAULT_USAGE_DIR, BudgetExceededError, get_ledger
+from exam_render import DEFAULT_CACHE_DIR as RENDER_CACHE_DIR, MEDIA_TYPES, ArtifactRenderer
+from question_bank import get_bank
 
 
 class ExamRequest(BaseModel):
@@ -24,17 +42,23 @@ class ExamRequest(BaseModel):
     difficulty: str
     passage_type: str
     output_format: str = "json"
+    repair: bool = False
+    wait_for_extraction: bool = False
+    # llm: always generate; bank: assemble from the question bank, generate only if it lacks material
+    mode: str = "llm"
 
 
 # Check if docling-serve is available
-def check_docling_serve(url: str = "http://localhost:5001/v1alpha/convert/file") -> bool:
-    """Check if docling-serve is running."""
-    try:
-        # Only perform HEAD request to check connection
-        response = requests.head(url, timeout=2)
-        return True
-    except requests.RequestException:
-        return False
+def check_docling_serve(url: Optional[str] = None) -> bool:
+    """Check if docling-serve is running (any instance of the pool if no URL is given)."""
+    for candidate in ([url] if url else docling_urls_from_env()):
+        try:
+            # Only perform HEAD request to check connection
+            requests.head(candidate, timeout=2)
+            return True
+        except requests.RequestException:
+            continue
+    return False
 
 
 # FastAPI App
@@ -66,13 +90,150 @@ UPLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
 if not os.path.exists(UPLOAD_DIR):
     os.makedirs(UPLOAD_DIR)
 
+# Default output directory of PaperToExam (extracted markdown and results)
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
+
 # Store session states
 sessions = {}
+track_sessions(lambda: len(sessions))
+
+# Compile exam schemas once at startup
+preload_validators()
+
+# Opt-in request profiling (PROFILE_ADMIN_TOKEN, PROFILE_SAMPLE_RATE, PROFILE_MAX_CONCURRENT)
+request_profiler = RequestProfiler()
+
+# Serialized exam payloads with gzip variants and ETags, rebuilt when a result changes
+exam_payloads = PayloadCache(max_entries=int(os.getenv("EXAM_PAYLOAD_CACHE_SIZE", "64")))
+# Coalesces duplicate /generate-exam submissions (double clicks, retries, second tabs)
+generation_flights = SingleFlight(ttl=float(os.getenv("IDEMPOTENCY_TTL", "600")))
+# Printable HTML/PDF exams and answer keys, rendered in the background after each save
+artifact_renderer = ArtifactRenderer(
+    os.getenv("RENDER_CACHE_DIR", RENDER_CACHE_DIR), workers=int(os.getenv("RENDER_WORKERS", "2"))
+)
+
+# Sessions idle for longer than this are dropped; their files then fall under retention
+SESSION_TTL = float(os.getenv("SESSION_TTL_MINUTES", "30")) * 60
+STORAGE_SWEEP_INTERVAL = float(os.getenv("STORAGE_SWEEP_INTERVAL", "300"))
+
+
+def _protected_files() -> set:
+    """Files used by live sessions or cached payloads, which the sweeper must keep."""
+    paths = set(exam_payloads.sources())
+    for session in list(sessions.values()):
+        paths.add(session.get("file_path"))
+        paths.add(session.get("result_file"))
+        paper_to_exam = session.get("paper_to_exam")
+        if paper_to_exam is not None:
+            paths.add(paper_to_exam.markdown_path)
+    paths.discard(None)
+    return paths
+
+
+storage_sweeper = StorageSweeper(
+    rules=[
+        RetentionRule("upload", UPLOAD_DIR, None, hours_from_env("RETENTION_UPLOAD_HOURS", 24)),
+        # Leftovers of interrupted atomic writes
+        RetentionRule("temp", OUTPUT_DIR, [".tmp"], 3600),
+        RetentionRule("markdown", OUTPUT_DIR, [".md"], hours_from_env("RETENTION_MARKDOWN_HOURS", 24 * 7)),
+        RetentionRule("result", OUTPUT_DIR, [".json", ".txt"], hours_from_env("RETENTION_RESULT_HOURS", 24 * 30)),
+        RetentionRule(
+            "condense_cache",
+            os.getenv("CONDENSE_CACHE_DIR", CONDENSE_CACHE_DIR),
+            [".json", ".tmp"],
+            hours_from_env("RETENTION_CACHE_HOURS", 24 * 7),
+        ),
+        RetentionRule(
+            "page_cache",
+            os.getenv("PAGE_CACHE_DIR", PAGE_CACHE_DIR),
+            [".json", ".tmp"],
+            hours_from_env("RETENTION_CACHE_HOURS", 24 * 7),
+        ),
+        RetentionRule(
+            "artifacts",
+            os.getenv("RENDER_CACHE_DIR", RENDER_CACHE_DIR),
+            [".html", ".pdf", ".tmp"],
+            hours_from_env("RETENTION_CACHE_HOURS", 24 * 7),
+        ),
+        RetentionRule(
+            "usage",
+            os.getenv("USAGE_DIR", DEFAULT_USAGE_DIR),
+            [".jsonl"],
+            hours_from_env("RETENTION_USAGE_HOURS", 24 * 90),
+        ),
+    ],
+    quota_bytes=int(float(os.getenv("STORAGE_QUOTA_MB", "0")) * 1024 * 1024) or None,
+    protected=_protected_files,
+)
+
+
+def _render_artifacts(result_file: str) -> None:
+    """Start rendering the printable documents of a saved JSON result."""
+    if not result_file.endswith(".json"):
+        return
+    try:
+        artifact_renderer.submit(result_file)
+    except Exception as e:
+        # Downloads render on demand if this fails
+        print(f"Failed to schedule rendering of {result_file}: {e}")
+
+
+def _touch_session(session_id: str) -> None:
+    if session_id in sessions:
+        sessions[session_id]["last_access"] = time.time()
+
+
+def expire_sessions() -> None:
+    """Drop sessions that have been idle for longer than SESSION_TTL."""
+    cutoff = time.time() - SESSION_TTL
+    for session_id in [sid for sid, session in list(sessions.items()) if session.get("last_access", 0) < cutoff]:
+        sessions.pop(session_id, None)
+        get_ledger().forget(session_id)
+        print(f"Expired session: {session_id}")
+
+
+async def sweep_storage():
+    """Expire idle sessions and apply retention and quota, every STORAGE_SWEEP_INTERVAL seconds."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            expire_sessions()
+            await loop.run_in_executor(None, storage_sweeper.sweep)
+        except Exception as e:
+            print(f"Storage sweep failed: {e}")
+        await asyncio.sleep(STORAGE_SWEEP_INTERVAL)
+
+
+@app.on_event("startup")
+async def start_storage_sweeper():
+    asyncio.create_task(sweep_storage())
+
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Profile a request when asked to by an admin header or by sampling."""
+    request_id = new_request_id(request.headers)
+    state = None
+    if request_profiler.should_profile(request.headers) and request_profiler.try_acquire():
+        state = request_profiler.start(request_id, request.method, request.url.path)
+    
+    status_code = None
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        if state is not None:
+            request_profiler.stop(state, status_code)
+    
+    response.headers["X-Request-ID"] = request_id
+    if state is not None:
+        response.headers["X-Profile-ID"] = request_id
+    return response
 
 # Check if docling-serve is available and print warning if not
 docling_serve_available = check_docling_serve()
 if not docling_serve_available:
-    print("\n*** WARNING: Docling-serve is not available at http://localhost:5001 ***")
+    print(f"\n*** WARNING: Docling-serve is not available at {', '.join(docling_urls_from_env())} ***")
     print("*** System will use fallback extraction method with lower quality ***")
     print("*** Please run docling-serve for best results ***\n")
 
@@ -83,7 +244,10 @@ async def read_root():
     status_info = {
         "status": "ok", 
         "message": "Paper To Exam API is running",
-        "docling_serve_available": docling_serve_available
+        "docling_serve_available": docling_serve_available,
+        "docling_pool": get_docling_pool().snapshot(),
+        "admission": admission_report(),
+        "generation_flights": generation_flights.snapshot()
     }
     
     if not docling_serve_available:
@@ -92,13 +256,62 @@ async def read_root():
     return status_info
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Expose pipeline metrics in Prometheus format."""
+    payload, content_type = render_latest()
+    return Response(content=payload, media_type=content_type)
+
+
+@app.get("/llm-providers")
+async def get_llm_providers():
+    """Health of the LLM providers used by the router backend."""
+    return {"providers": health_report()}
+
+
+@app.get("/profiles")
+async def list_profiles(request: Request):
+    """List stored request profiles (admin only)."""
+    if not request_profiler.is_admin(request.headers):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return {"profiles": request_profiler.list_profiles()}
+
+
+@app.get("/profiles/{request_id}")
+async def download_profile(request_id: str, request: Request, format: str = "txt"):
+    """Download a stored request profile (admin only)."""
+    if not request_profiler.is_admin(request.headers):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    
+    path = request_profiler.artifact_path(request_id, format)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile does not exist")
+    
+    return FileResponse(path=path, filename=os.path.basename(path), media_type="application/octet-stream")
+
+
 @app.post("/upload-pdf")
-async def upload_pdf(pdf_file: Optional[UploadFile] = File(None), url: Optional[str] = Form(None)):
-    """Upload PDF file or provide URL and extract content."""
+@admit("extract")
+@inflight("upload")
+async def upload_pdf(
+    pdf_file: Optional[UploadFile] = File(None),
+    url: Optional[str] = Form(None),
+    page_range: Optional[str] = Form(None),
+    max_pages: Optional[int] = Form(None),
+    progressive: Optional[bool] = Form(None)
+):
+    """Upload PDF file or provide URL and extract content, optionally only a page range (e.g. "3-12")."""
     # Validate input: either pdf_file or url must be provided
     if pdf_file is None and (url is None or url.strip() == ""):
         raise HTTPException(status_code=400, detail="Either a PDF file or a valid URL must be provided")
     
+    try:
+        pages = parse_page_range(page_range) if page_range else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if max_pages is not None and max_pages < 1:
+        raise HTTPException(status_code=400, detail="max_pages must be at least 1")
+    
     # Create new session
     session_id = str(uuid.uuid4())
     file_path = None
@@ -107,6 +320,7 @@ async def upload_pdf(pdf_file: Optional[UploadFile] = File(None), url: Optional[
     try:
         # Create PaperToExam instance
         paper_to_exam = PaperToExam()
+        paper_to_exam.llm.usage_session = session_id
         
         if pdf_file is not None:
             # Handle file upload
@@ -116,8 +330,9 @@ async def upload_pdf(pdf_file: Optional[UploadFile] = File(None), url: Optional[
             # Save file to temporary directory
             filename = pdf_file.filename
             file_path = os.path.join(UPLOAD_DIR, f"{session_id}_{filename}")
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(pdf_file.file, buffer)
+            with observe_stage("upload_write"):
+                with open(file_path, "wb") as buffer:
+                    shutil.copyfileobj(pdf_file.file, buffer)
             
             # Close uploaded file to avoid file lock
             await pdf_file.close()
@@ -127,23 +342,44 @@ async def upload_pdf(pdf_file: Optional[UploadFile] = File(None), url: Optional[
             
             # Download PDF from URL
             try:
-                response = requests.get(url, stream=True, timeout=30)
-                response.raise_for_status()  # Raise exception for 4XX/5XX responses
-                
-                # Extract filename from URL or use default
-                filename = url.split("/")[-1] if "/" in url else "document.pdf"
-                file_path = os.path.join(UPLOAD_DIR, f"{session_id}_{filename}")
-                
-                # Save downloaded file
-                with open(file_path, "wb") as buffer:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        buffer.write(chunk)
+                with observe_stage("url_download"):
+                    response = requests.get(url, stream=True, timeout=30)
+                    response.raise_for_status()  # Raise exception for 4XX/5XX responses
+                    
+                    # Extract filename from URL or use default
+                    filename = url.split("/")[-1] if "/" in url else "document.pdf"
+                    file_path = os.path.join(UPLOAD_DIR, f"{session_id}_{filename}")
+                    
+                    # Save downloaded file
+                    with open(file_path, "wb") as buffer:
+                        for chunk in response.iter_content(chunk_size=8192):
+                            buffer.write(chunk)
             except requests.RequestException as e:
                 raise HTTPException(status_code=400, detail=f"Error downloading PDF from URL: {str(e)}")
         
         # Extract content from PDF
         try:
-            markdown_content = paper_to_exam.extract_pdf(file_path)
+            if progressive is None:
+                progressive = os.getenv("PROGRESSIVE_EXTRACTION", "false").lower() == "true"
+            if progressive:
+                # Returns once PROGRESSIVE_READY_WORDS words are extracted; the rest continues in background
+                markdown_content = await run_in_threadpool(
+                    request_profiler.profile_worker(paper_to_exam.extract_pdf_progressive),
+                    file_path,
+                    page_range=pages,
+                    max_pages=max_pages,
+                    ready_words=int(os.getenv("PROGRESSIVE_READY_WORDS", "2500")),
+                    batch_pages=int(os.getenv("PROGRESSIVE_BATCH_PAGES", "10")),
+                    # Batches left after this request returns still count against the extract limit
+                    batch_slot=functools.partial(thread_slot, "extract", asyncio.get_running_loop())
+                )
+            else:
+                markdown_content = await run_in_threadpool(
+                    request_profiler.profile_worker(paper_to_exam.extract_pdf), file_path, page_range=pages, max_pages=max_pages
+                )
+        except ValueError as e:
+            # Page range outside the document
+            raise HTTPException(status_code=400, detail=str(e))
         except RuntimeError as e:
             if "Error connecting to docling-serve" in str(e):
                 # Handle error connecting to docling-serve
@@ -160,7 +396,8 @@ async def upload_pdf(pdf_file: Optional[UploadFile] = File(None), url: Optional[
             "file_path": file_path,
             "paper_to_exam": paper_to_exam,
             "filename": filename,
-            "source_type": source_type
+            "source_type": source_type,
+            "last_access": time.time()
         }
         
         if source_type == "url":
@@ -175,6 +412,10 @@ async def upload_pdf(pdf_file: Optional[UploadFile] = File(None), url: Optional[
             "session_id": session_id,
             "filename": filename,
             "word_count": word_count,
+            "pages": paper_to_exam.pdf_extractor.pages,
+            "routing": paper_to_exam.pdf_extractor.routing,
+            "extraction": paper_to_exam.extraction.state() if paper_to_exam.extraction else None,
+            "pruning": paper_to_exam.pruning_report,
             "status": "success",
             "message": f"Successfully extracted {word_count} words"
         }
@@ -194,33 +435,91 @@ async def upload_pdf(pdf_file: Optional[UploadFile] = File(None), url: Optional[
         print(f"Error: {str(e)}")
         print(traceback.format_exc())
         
+        # Keep the status of deliberate errors (invalid page range, docling unavailable)
+        if isinstance(e, HTTPException):
+            raise e
         raise HTTPException(status_code=500, detail=f"Error extracting PDF: {str(e)}")
 
 
 @app.post("/generate-exam/{session_id}")
+@inflight("generate")
 async def generate_exam(
     session_id: str, 
     request: ExamRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(None)
 ):
-    """Generate exam from extracted content."""
+    """
+    Generate exam from extracted content.
+    
+    Identical requests for a session that arrive while one is running share
+    its result. With an Idempotency-Key header, a retry with the same key also
+    gets the finished result for IDEMPOTENCY_TTL seconds instead of generating again.
+    """
     if session_id not in sessions:
         raise HTTPException(status_code=404, detail="Session does not exist or has expired")
+    _touch_session(session_id)
     
-    session = sessions[session_id]
-    paper_to_exam = session["paper_to_exam"]
+    fingerprint = dumps(request.dict()).decode("utf-8")
+    if idempotency_key:
+        key = f"{session_id}:key:{idempotency_key}"
+    else:
+        key = f"{session_id}:{fingerprint}"
     
     try:
+        body, shared = await generation_flights.do(
+            key, fingerprint, lambda: _run_generation(session_id, request), keep_result=bool(idempotency_key)
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    _touch_session(session_id)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"X-Coalesced": "true" if shared else "false"}
+    )
+
+
+async def _run_generation(session_id: str, request: ExamRequest) -> bytes:
+    """One generation run for /generate-exam; returns the serialized response body."""
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session does not exist or has expired")
+    paper_to_exam = session["paper_to_exam"]
+    if request.mode not in ("llm", "bank"):
+        raise HTTPException(status_code=400, detail="mode must be llm or bank")
+    
+    # Waiting for a progressive extraction does not hold a generation slot
+    if request.wait_for_extraction and not await run_in_threadpool(
+        paper_to_exam.wait_for_extraction, timeout=float(os.getenv("EXTRACTION_WAIT_TIMEOUT", "600"))
+    ):
+        raise HTTPException(status_code=504, detail="Extraction did not finish in time; retry or generate from the available content")
+    
+    async with admission_slot("generate"):
         # Before calling generate_exam, set output file name to session_id
         filename = f"{session_id}"
         
-        result = paper_to_exam.generate_exam(
-            exam_type=request.exam_type,
-            difficulty=request.difficulty,
-            passage_type=request.passage_type,
-            output_format=request.output_format,
-            output_filename=filename  # Pass file name to generate_exam
-        )
+        def generate() -> tuple:
+            # The lock keeps a concurrent generation or repair of this session
+            # from replacing last_validation before it is read
+            with paper_to_exam.generation_lock:
+                result = paper_to_exam.generate_exam(
+                    exam_type=request.exam_type,
+                    difficulty=request.difficulty,
+                    passage_type=request.passage_type,
+                    output_format=request.output_format,
+                    output_filename=filename,  # Pass file name to generate_exam
+                    repair=request.repair,
+                    from_bank=request.mode == "bank"
+                )
+                return result, paper_to_exam.last_validation, paper_to_exam.last_source
+        
+        try:
+            result, validation, source = await run_in_threadpool(request_profiler.profile_worker(generate))
+        except BudgetExceededError as e:
+            raise HTTPException(status_code=402, detail=f"LLM budget exceeded: {str(e)}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error generating exam: {str(e)}")
         
         # Create result file path
         if request.output_format == "json":
@@ -230,21 +529,109 @@ async def generate_exam(
         
         # Add result information to session
         session["result_file"] = result_file
+        session["validation"] = validation
+        exam_payloads.invalidate(session_id)
+        _render_artifacts(result_file)
         
         # Do not delete session to allow reviewing exam at any time
         
-        return {
+        return dumps({
             "session_id": session_id,
             "result": result,
+            "validation": validation,
+            "source": source,
+            "extraction": paper_to_exam.extraction.state() if paper_to_exam.extraction else None,
             "status": "success"
-        }
+        })
+
+
+@app.post("/repair-exam/{session_id}")
+@admit("generate")
+@inflight("repair")
+async def repair_exam(session_id: str, request: ExamRequest):
+    """Regenerate only the failing parts of an existing exam."""
+    if session_id not in sessions or "result_file" not in sessions[session_id]:
+        raise HTTPException(status_code=404, detail="Result does not exist or has expired")
+    
+    session = sessions[session_id]
+    paper_to_exam = session["paper_to_exam"]
+    result_file = session["result_file"]
+    _touch_session(session_id)
+    if not result_file.endswith(".json"):
+        raise HTTPException(status_code=400, detail="Only JSON results can be repaired")
+    
+    def repair() -> tuple:
+        # Read, repair and save under the session's lock so a concurrent
+        # generation is neither lost nor mixed into the repaired exam
+        with paper_to_exam.generation_lock:
+            with open(result_file, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            result = paper_to_exam.repair_exam(
+                result,
+                exam_type=request.exam_type,
+                difficulty=request.difficulty,
+                passage_type=request.passage_type,
+                report=session.get("validation")
+            )
+            paper_to_exam._save_result(
+                result, request.exam_type, request.difficulty, request.passage_type, "json", session_id
+            )
+            return result, paper_to_exam.last_validation
+    
+    try:
+        result, validation = await run_in_threadpool(request_profiler.profile_worker(repair))
+        session["validation"] = validation
+        exam_payloads.invalidate(session_id)
+        _render_artifacts(result_file)
+        _touch_session(session_id)
+        
+        return Response(content=dumps({
+            "session_id": session_id,
+            "result": result,
+            "validation": validation,
+            "status": "success"
+        }), media_type="application/json")
+    except BudgetExceededError as e:
+        raise HTTPException(status_code=402, detail=f"LLM budget exceeded: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating exam: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error repairing exam: {str(e)}")
+
+
+@app.get("/question-bank")
+async def get_question_bank():
+    """Reusable exams and questions in the question bank per exam type, passage type and difficulty."""
+    return await run_in_threadpool(get_bank().stats)
+
+
+@app.get("/usage/daily")
+async def get_daily_usage(days: int = 7):
+    """LLM tokens and cost per UTC day for the last ``days`` days, most recent first."""
+    ledger = get_ledger()
+    today = time.time()
+    return {
+        "days": [
+            ledger.daily(time.strftime("%Y-%m-%d", time.gmtime(today - 86400 * offset)))
+            for offset in range(max(1, min(days, 90)))
+        ]
+    }
+
+
+@app.get("/usage/{session_id}")
+async def get_session_usage(session_id: str):
+    """Every LLM call of a session with its tokens, latency, retry attempt and cost."""
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session does not exist or has expired")
+    return get_ledger().session(session_id)
 
 
 @app.get("/download-result/{session_id}")
-async def download_result(session_id: str):
-    """Download result file."""
+async def download_result(session_id: str, format: Optional[str] = None, document: str = "exam"):
+    """
+    Download result file.
+
+    Without ``format`` the saved JSON/TXT result is returned. ``format=html`` or
+    ``format=pdf`` returns the printable ``document`` (exam or answer_key).
+    """
     if session_id not in sessions or "result_file" not in sessions[session_id]:
         raise HTTPException(status_code=404, detail="Result does not exist or has expired")
     
@@ -252,6 +639,25 @@ async def download_result(session_id: str):
     if not os.path.exists(result_file):
         raise HTTPException(status_code=404, detail="Result file does not exist")
     
+    _touch_session(session_id)
+    storage_sweeper.touch(result_file)
+    
+    if format is not None:
+        if not result_file.endswith(".json"):
+            raise HTTPException(status_code=400, detail="Only JSON results can be rendered")
+        try:
+            # Normally already rendered after generation; otherwise waits for the render
+            path = await run_in_threadpool(
+                artifact_renderer.get, result_file, document, format, float(os.getenv("RENDER_TIMEOUT", "60"))
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return FileResponse(
+            path=path,
+            filename=f"{session_id}_{document}.{format}",
+            media_type=MEDIA_TYPES[format]
+        )
+    
     filename = os.path.basename(result_file)
     return FileResponse(
         path=result_file, 
@@ -260,78 +666,23 @@ async def download_result(session_id: str):
     )
 
 
-@app.get("/session-info/{session_id}")
-async def get_session_info(session_id: str):
-    """Get session information."""
-    print(f"Accessing session-info with session_id: {session_id}")
-    
-    # Default output directory
-    output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
-    has_result = False
-    filename = "unknown.pdf"
-    
-    # If session exists in sessions
-    if session_id in sessions:
-        session = sessions[session_id]
-        filename = session.get("filename", "unknown.pdf")
-        has_result = "result_file" in session
-        
-        if not has_result and "paper_to_exam" in session:
-            # Try to find result file
-            paper_to_exam = session["paper_to_exam"]
-            result_file = os.path.join(paper_to_exam.output_dir, f"{session_id}.json")
-            has_result = os.path.exists(result_file)
-    else:
-        print(f"Session does not exist in sessions. Searching for result file directly.")
-        # Search for result file directly in output directory
-        potential_result_file = os.path.join(output_dir, f"{session_id}.json")
-        has_result = os.path.exists(potential_result_file)
-        
-        if not has_result:
-            # Search for files containing session_id in name
-            for file in os.listdir(output_dir):
-                if file.endswith(".json") and session_id in file:
-                    has_result = True
-                    break
-    
-    return {
-        "session_id": session_id,
-        "filename": filename,
-        "has_result": has_result,
-        "status": "active" if session_id in sessions else "expired",
-        "exam_type": "IELTS",  # Default value
-        "difficulty": "7.0",    # Default value
-        "passage_type": "Academic"  # Default value
-    }
-
-
-@app.get("/exam-data/{session_id}")
-async def get_exam_data(session_id: str):
-    """Get exam data without generating new exam."""
-    print(f"Accessing exam-data with session_id: {session_id}")
-    
-    # Default output directory
-    output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
+def _find_result_file(session_id: str) -> Optional[str]:
+    """Locate the JSON result of a session, also after the session has expired."""
+    output_dir = OUTPUT_DIR
     result_file = None
     
     # If session exists in sessions
     if session_id in sessions:
         session = sessions[session_id]
-        print(f"Session information: {list(session.keys())}")
         
         # Check if exam result exists
         if "result_file" in session:
             result_file = session["result_file"]
         else:
-            print(f"Result file not found in session")
-            
             # Try to recreate result file path
             paper_to_exam = session.get("paper_to_exam")
             if paper_to_exam:
-                filename = f"{session_id}"
-                result_file = os.path.join(paper_to_exam.output_dir, f"{filename}.json")
-    else:
-        print(f"Session does not exist in sessions. Searching for result file directly.")
+                result_file = os.path.join(paper_to_exam.output_dir, f"{session_id}.json")
     
     # If result file not found in session, try searching directly
     if not result_file or not os.path.exists(result_file):
@@ -339,75 +690,105 @@ async def get_exam_data(session_id: str):
         potential_result_file = os.path.join(output_dir, f"{session_id}.json")
         
         if os.path.exists(potential_result_file):
-            print(f"Found result file directly: {potential_result_file}")
             result_file = potential_result_file
-        else:
+        elif os.path.isdir(output_dir):
             # Search for files containing session_id in name
-            found_files = []
-            for file in os.listdir(output_dir):
-                if file.endswith(".json") and session_id in file:
-                    found_files.append(os.path.join(output_dir, file))
-            
+            found_files = [
+                os.path.join(output_dir, file)
+                for file in sorted(os.listdir(output_dir))
+                if file.endswith(".json") and session_id in file
+            ]
             if found_files:
                 print(f"Found files containing session_id: {found_files}")
                 result_file = found_files[0]  # Take first found file
     
-    # If result file not found
     if not result_file or not os.path.exists(result_file):
+        return None
+    _touch_session(session_id)
+    storage_sweeper.touch(result_file)
+    return result_file
+
+
+def _session_info(session_id: str, result_file: Optional[str]) -> Dict[str, Any]:
+    filename = "unknown.pdf"
+    extraction = None
+    if session_id in sessions:
+        filename = sessions[session_id].get("filename", "unknown.pdf")
+        paper_to_exam = sessions[session_id].get("paper_to_exam")
+        if paper_to_exam is not None and paper_to_exam.extraction is not None:
+            extraction = paper_to_exam.extraction.state()
+    
+    return {
+        "session_id": session_id,
+        "filename": filename,
+        "has_result": result_file is not None,
+        "status": "active" if session_id in sessions else "expired",
+        "exam_type": "IELTS",  # Default value
+        "difficulty": "7.0",    # Default value
+        "passage_type": "Academic",  # Default value
+        "extraction": extraction
+    }
+
+
+def _exam_data(session_id: str, result_file: str) -> Dict[str, Any]:
+    return {
+        "session_id": session_id,
+        "result": load_result_file(result_file),
+        "validation": sessions.get(session_id, {}).get("validation"),
+        "status": "success"
+    }
+
+
+def _payload_response(payload: Payload, request: Request) -> Response:
+    """Answer with 304, the gzip variant or the plain body, as the client allows."""
+    body, headers = payload.select(request.headers.get("accept-encoding"))
+    if payload.not_modified(request.headers.get("if-none-match")):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/session-info/{session_id}")
+async def get_session_info(session_id: str):
+    """Get session information."""
+    return _session_info(session_id, _find_result_file(session_id))
+
+
+@app.get("/exam-data/{session_id}")
+async def get_exam_data(session_id: str, request: Request):
+    """Get exam data without generating new exam."""
+    result_file = _find_result_file(session_id)
+    if not result_file:
         print(f"Result file not found for session_id: {session_id}")
         raise HTTPException(status_code=404, detail="Exam result does not exist. Please generate exam first.")
     
-    print(f"Result file path: {result_file}")
-    
     try:
-        # Read data from result file
-        with open(result_file, "r", encoding="utf-8") as f:
-            result_data = json.load(f)
-        
-        print(f"Successfully read data from result file")
-        return {
-            "session_id": session_id,
-            "result": result_data,
-            "status": "success"
-        }
+        payload = exam_payloads.get(
+            "exam-data", session_id, (result_file, file_version(result_file)),
+            lambda: _exam_data(session_id, result_file),
+            source=result_file
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading exam data: {str(e)}")
+    return _payload_response(payload, request)
 
 
-async def cleanup_session(session_id: str, delay_minutes: int = 30):
-    """Clean up session resources after a certain time."""
-    # Wait for a certain time
-    await asyncio.sleep(delay_minutes * 60)
+@app.get("/exam-bundle/{session_id}")
+async def get_exam_bundle(session_id: str, request: Request):
+    """Session information and exam data in one response; exam is null until generated."""
+    result_file = _find_result_file(session_id)
+    info = _session_info(session_id, result_file)
+    version = (tuple(info.items()), result_file, file_version(result_file) if result_file else None)
     
-    # Check if session still exists
-    if session_id in sessions:
-        session = sessions[session_id]
-        
-        # Delete uploaded PDF file
-        if "file_path" in session and os.path.exists(session["file_path"]):
-            try:
-                # Try to close all handles before deleting on Windows
-                import gc
-                gc.collect()  # Suggest garbage collection
-                
-                # Try up to 3 times
-                for _ in range(3):
-                    try:
-                        os.remove(session["file_path"])
-                        print(f"Deleted temporary file: {session['file_path']}")
-                        break
-                    except PermissionError:
-                        # If file is in use, wait and try again
-                        await asyncio.sleep(2)
-                    except Exception as e:
-                        print(f"Cannot delete temporary file: {str(e)}")
-                        break
-            except Exception as e:
-                print(f"Error deleting file: {str(e)}")
-        
-        # Delete session
-        del sessions[session_id]
-        print(f"Deleted session: {session_id}")
+    try:
+        payload = exam_payloads.get(
+            "exam-bundle", session_id, version,
+            lambda: {"session": info, "exam": _exam_data(session_id, result_file) if result_file else None},
+            source=result_file
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading exam data: {str(e)}")
+    return _payload_response(payload, request)
 
 
 def start_server(host: str = "0.0.0.0", port: int = 8000, reload: bool = False):
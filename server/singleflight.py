@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Single-flight execution of identical requests.
+
+A double click, a retry after a proxy timeout or a second tab submits the
+same generation again while the first is still running. Calls with the same
+key attach to the running execution and share its result instead of
+starting another LLM call. Results of calls made with an idempotency key are
+kept for ``ttl`` seconds, so a retry after the first call finished gets the
+same result as well.
+"""
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused for a different request."""
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key onto one execution.
+
+    Only used from the event loop, so the tables need no lock.
+
+    Args:
+        ttl: Seconds a finished result stays attached to its idempotency key
+        max_results: Finished results kept at most (oldest dropped first)
+    """
+
+    def __init__(self, ttl: float = 600, max_results: int = 256):
+        self.ttl = ttl
+        self.max_results = max_results
+        self._running: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._results: "OrderedDict[str, Tuple[str, float, Any]]" = OrderedDict()
+        self.executions = 0
+        self.coalesced = 0
+
+    def _cached(self, key: str, fingerprint: str) -> Optional[Any]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        entry_fingerprint, finished, result = entry
+        if time.time() - finished > self.ttl:
+            del self._results[key]
+            return None
+        if entry_fingerprint != fingerprint:
+            raise IdempotencyConflict("Idempotency key was already used for a different request")
+        return result
+
+    async def do(
+        self,
+        key: str,
+        fingerprint: str,
+        func: Callable[[], Awaitable[Any]],
+        keep_result: bool = False,
+    ) -> Tuple[Any, bool]:
+        """
+        Run ``func`` unless a call with the same key is running or, with keep_result, recently finished.
+
+        Args:
+            key: Identity of the call (request parameters or idempotency key)
+            fingerprint: Request parameters; reusing a key with other parameters is a conflict
+            func: Coroutine function doing the work
+            keep_result: Keep the result for ``ttl`` seconds (idempotency keys)
+
+        Returns:
+            (result, shared), shared being True if another call did the work
+
+        Raises:
+            IdempotencyConflict: The key is bound to a different fingerprint
+        """
+        cached = self._cached(key, fingerprint)
+        if cached is not None:
+            self.coalesced += 1
+            return cached, True
+
+        if key in self._running:
+            running_fingerprint, future = self._running[key]
+            if running_fingerprint != fingerprint:
+                raise IdempotencyConflict("Idempotency key is in use by a different request")
+            self.coalesced += 1
+            # shield: a caller that disconnects must not cancel the shared execution
+            return await asyncio.shield(future), True
+
+        self.executions += 1
+        future = asyncio.ensure_future(func())
+        self._running[key] = (fingerprint, future)
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._running.pop(key, None)
+            else:
+                # This caller was cancelled; drop the entry once the work finishes
+                future.add_done_callback(lambda _: self._running.pop(key, None))
+        # Failures are not kept, so a retry runs again
+        if keep_result:
+            self._results[key] = (fingerprint, time.time(), result)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return result, False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._running),
+            "kept_results": len(self._results),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Retention and disk quota for uploads/ and output/.
+
+One ``StorageSweeper`` periodically deletes files older than the retention
+of their artifact type, then evicts the least recently used files until the
+managed directories fit the quota. Files returned by the ``protected``
+callback (live sessions, cached payloads) are never deleted.
+"""
+import os
+import time
+import tempfile
+import threading
+from typing import Callable, Dict, Any, Iterable, List, Optional, Set, Union
+
+
+class RetentionRule:
+    """
+    Maximum age for one artifact type.
+
+    Args:
+        name: Artifact type, used in reports
+        directory: Directory the files live in
+        suffixes: File suffixes the rule applies to; None matches every file
+        max_age: Seconds since last use after which a file is deleted; None keeps files forever
+    """
+
+    def __init__(self, name: str, directory: str, suffixes: Optional[Iterable[str]], max_age: Optional[float]):
+        self.name = name
+        # Compared with absolute file paths, so a relative or ../ directory from the environment still matches
+        self.directory = os.path.abspath(directory)
+        self.suffixes = tuple(suffixes) if suffixes else None
+        self.max_age = max_age
+
+    def matches(self, path: str) -> bool:
+        if os.path.dirname(path) != self.directory:
+            return False
+        return self.suffixes is None or path.endswith(self.suffixes)
+
+
+def hours_from_env(name: str, default: float) -> Optional[float]:
+    """Read a retention in hours from the environment; 0 or less disables it."""
+    hours = float(os.getenv(name, str(default)))
+    return hours * 3600 if hours > 0 else None
+
+
+def atomic_write(path: str, data: Union[str, bytes], encoding: str = "utf-8") -> None:
+    """Write a file so readers see either the old or the new content, never a partial one."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with (os.fdopen(fd, "wb") if isinstance(data, bytes) else os.fdopen(fd, "w", encoding=encoding)) as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class StorageSweeper:
+    """
+    Delete expired files and enforce a total size quota with LRU eviction.
+
+    Args:
+        rules: Retention rules; the first matching rule applies to a file
+        quota_bytes: Total size allowed for all files covered by the rules; None disables the quota
+        protected: Returns absolute paths that must not be deleted
+    """
+
+    def __init__(
+        self,
+        rules: List[RetentionRule],
+        quota_bytes: Optional[int] = None,
+        protected: Optional[Callable[[], Set[str]]] = None,
+    ):
+        self.rules = rules
+        self.quota_bytes = quota_bytes
+        self.protected = protected or (lambda: set())
+        self._last_access: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, path: str) -> None:
+        """Record that a file was read, for LRU eviction (atime is unreliable on most mounts)."""
+        with self._lock:
+            self._last_access[os.path.abspath(path)] = time.time()
+
+    def _scan(self) -> List[Dict[str, Any]]:
+        files = []
+        directories = {rule.directory for rule in self.rules}
+        with self._lock:
+            last_access = dict(self._last_access)
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                path = os.path.abspath(entry.path)
+                rule = next((r for r in self.rules if r.matches(path)), None)
+                if rule is None:
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                files.append({
+                    "path": path,
+                    "rule": rule,
+                    "size": stat.st_size,
+                    "last_used": max(stat.st_mtime, last_access.get(path, 0.0)),
+                })
+        return files
+
+    def _delete(self, path: str) -> bool:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"storage_sweeper: Cannot delete {path}: {e}")
+            return False
+        with self._lock:
+            self._last_access.pop(path, None)
+        return True
+
+    def sweep(self) -> Dict[str, Any]:
+        """Run one retention and quota pass; returns counts per artifact type."""
+        now = time.time()
+        protected = {os.path.abspath(path) for path in self.protected() if path}
+        files = self._scan()
+        report = {"expired": {}, "evicted": {}, "freed_bytes": 0, "total_bytes": 0}
+
+        remaining = []
+        for file in files:
+            rule = file["rule"]
+            expired = rule.max_age is not None and now - file["last_used"] > rule.max_age
+            if expired and file["path"] not in protected and self._delete(file["path"]):
+                report["expired"][rule.name] = report["expired"].get(rule.name, 0) + 1
+                report["freed_bytes"] += file["size"]
+            else:
+                remaining.append(file)
+
+        total = sum(file["size"] for file in remaining)
+        if self.quota_bytes is not None and total > self.quota_bytes:
+            candidates = sorted(
+                (file for file in remaining if file["path"] not in protected),
+                key=lambda file: file["last_used"],
+            )
+            for file in candidates:
+                if total <= self.quota_bytes:
+                    break
+                if self._delete(file["path"]):
+                    name = file["rule"].name
+                    report["evicted"][name] = report["evicted"].get(name, 0) + 1
+                    report["freed_bytes"] += file["size"]
+                    total -= file["size"]
+            if total > self.quota_bytes:
+                print(f"storage_sweeper: {total} bytes still in use, over quota of {self.quota_bytes}; "
+                      f"the rest is protected")
+
+        report["total_bytes"] = total
+        if report["expired"] or report["evicted"]:
+            print(f"storage_sweeper: Expired {report['expired']}, evicted {report['evicted']}, "
+                  f"freed {report['freed_bytes'] / 1024 / 1024:.1f} MB")
+        return report
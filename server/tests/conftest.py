@@ -0,0 +1,22 @@
+import os
+import sys
+import random
+
+import pytest
+
+# Server modules are imported flat, as server.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_llm import fake_ielts_exam, fake_toeic_exam  # noqa: E402
+
+
+@pytest.fixture
+def ielts_exam():
+    """Schema- and rule-valid IELTS exam (14 questions, 5-4-5) from the fake LLM."""
+    return fake_ielts_exam(random.Random(1))
+
+
+@pytest.fixture
+def toeic_exam():
+    """Builds a valid TOEIC part (5, 6 or 7) from the fake LLM."""
+    return lambda part: fake_toeic_exam(part, random.Random(part))
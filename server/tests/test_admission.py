@@ -0,0 +1,101 @@
+import time
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+import admission
+from admission import AdmissionController, Overloaded, admission_slot, thread_slot
+
+
+def controller(**overrides):
+    settings = dict(max_concurrent=2, max_queue=1, max_wait=1.0, service_seconds=10.0)
+    settings.update(overrides)
+    return AdmissionController("test", **settings)
+
+
+async def hold(slot_owner, release):
+    async with slot_owner.slot():
+        await release.wait()
+
+
+def test_queue_full_is_rejected_with_retry_after():
+    async def main():
+        stage, release = controller(), asyncio.Event()
+        holders = [asyncio.ensure_future(hold(stage, release)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        state = (stage.running, stage.queued)
+        with pytest.raises(Overloaded) as rejected:
+            await stage.acquire()
+        release.set()
+        await asyncio.gather(*holders)
+        return stage, state, rejected.value
+
+    stage, state, rejected = asyncio.run(main())
+    assert state == (2, 1)
+    assert rejected.reason == "queue_full"
+    # One request queued ahead plus this one, spread over two slots
+    assert rejected.retry_after == 10
+    snapshot = stage.snapshot()
+    assert (snapshot["running"], snapshot["queued"], snapshot["admitted"], snapshot["rejected"]) == (0, 0, 3, 1)
+    assert snapshot["service_seconds"] < 10.0
+
+
+def test_wait_timeout_is_rejected():
+    async def main():
+        stage, release = controller(max_concurrent=1, max_wait=0.01), asyncio.Event()
+        holder = asyncio.ensure_future(hold(stage, release))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded) as rejected:
+            await stage.acquire()
+        release.set()
+        await holder
+        return stage, rejected.value
+
+    stage, rejected = asyncio.run(main())
+    assert rejected.reason == "wait_timeout"
+    assert stage.queued == 0
+
+
+def test_admission_slot_raises_429(monkeypatch):
+    monkeypatch.setitem(admission.controllers, "test", controller(max_concurrent=1, max_queue=0))
+
+    async def main():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(hold(admission.controllers["test"], release))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as busy:
+            async with admission_slot("test"):
+                pass
+        release.set()
+        await holder
+        return busy.value
+
+    busy = asyncio.run(main())
+    assert busy.status_code == 429
+    assert busy.headers["Retry-After"] == "10"
+
+
+def test_thread_slot_bounds_worker_threads(monkeypatch):
+    monkeypatch.setitem(admission.controllers, "test", controller(max_concurrent=2, max_queue=8))
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def work(loop):
+        with thread_slot("test", loop):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(None, work, loop) for _ in range(6)))
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    stage = admission.controllers["test"]
+    assert peak[0] == 2
+    assert (stage.running, stage.admitted) == (0, 6)
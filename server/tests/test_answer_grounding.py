@@ -0,0 +1,78 @@
+from answer_grounding import PassageIndex, normalize_word, verify_answers
+
+
+PASSAGE = (
+    "Early mesh networks relied on flooding to find routes. "
+    "Flooding wastes bandwidth because every node repeats every message. "
+    "Modern protocols therefore keep a routing table on each node. "
+    "The table is refreshed when a neighbour stops answering."
+)
+
+
+def exam(*questions):
+    return {
+        "reading_passages": [{"passage_number": 1, "content": PASSAGE}],
+        "questions": [dict(question, question_number=number, passage_reference=1)
+                      for number, question in enumerate(questions, start=1)],
+    }
+
+
+def suspects(result):
+    return {(s["question_number"], s["check"]) for s in verify_answers(result)["suspects"]}
+
+
+def test_normalize_word():
+    assert normalize_word("networks") == "network"
+    assert normalize_word("neighbour's") == "neighbour"
+    assert normalize_word("strategies") == "strategy"
+    assert normalize_word("class") == "class"
+
+
+def test_find_span():
+    index = PassageIndex(PASSAGE)
+    assert index.find_span("routing table") == "exact"
+    assert index.find_span("routing tabel") == "fuzzy"
+    assert index.find_span("spanning tree") is None
+
+
+def test_fake_exam_is_grounded(ielts_exam):
+    report = verify_answers(ielts_exam)
+    assert report["checked"] == len(ielts_exam["questions"])
+    assert report["suspects"] == []
+
+
+def test_completion_answer_must_occur_in_passage():
+    result = exam(
+        {"question_type": "Sentence completion", "correct_answer": "routing table"},
+        {"question_type": "Sentence completion", "correct_answer": "flooding / broadcast"},
+        {"question_type": "Summary completion", "correct_answer": "spanning tree"},
+    )
+    assert suspects(result) == {(3, "completion")}
+
+
+def test_verdict_answers():
+    result = exam(
+        {"question_type": "True/False/Not Given", "question_text": "Flooding wastes bandwidth.", "correct_answer": "True"},
+        {"question_type": "True/False/Not Given", "question_text": "Satellites carry the traffic of rural villages.",
+         "correct_answer": "False"},
+        {"question_type": "True/False/Not Given", "question_text": "Modern protocols keep a routing table on each node.",
+         "correct_answer": "Not Given"},
+        {"question_type": "Yes/No/Not Given", "question_text": "Flooding is cheap.", "correct_answer": "Maybe"},
+    )
+    assert suspects(result) == {(2, "verdict"), (3, "verdict"), (4, "verdict")}
+
+
+def test_option_letter_must_exist():
+    options = ["A. flooding", "B. routing tables", "C. beacons"]
+    result = exam(
+        {"question_type": "Multiple Choice", "options": options, "correct_answer": "B"},
+        {"question_type": "Multiple Choice", "options": options, "correct_answer": "D"},
+    )
+    assert suspects(result) == {(2, "option")}
+
+
+def test_toeic_option_dict(toeic_exam):
+    result = toeic_exam(7)
+    result["questions"][0]["correct_answer"] = "E"
+    report = verify_answers(result)
+    assert [s["question_number"] for s in report["suspects"]] == [147]
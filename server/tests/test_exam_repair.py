@@ -0,0 +1,103 @@
+from exam_repair import apply_repair, finalize_questions, plan_repairs
+from exam_validator import validate_exam
+
+
+def kinds(tasks):
+    return [task["kind"] for task in tasks]
+
+
+def test_valid_exam_needs_no_repair(ielts_exam):
+    assert plan_repairs(ielts_exam, validate_exam(ielts_exam, "IELTS", "1")) == []
+
+
+def test_short_passage_is_extended(ielts_exam):
+    passage = ielts_exam["reading_passages"][0]
+    passage["content"] = " ".join(passage["content"].split()[:300])
+    tasks = plan_repairs(ielts_exam, validate_exam(ielts_exam, "IELTS", "1"))
+    assert tasks == [{"kind": "extend_passage", "passage_index": 0, "min_words": 700}]
+
+
+def test_missing_ielts_questions_are_added_per_category(ielts_exam):
+    ielts_exam["questions"] = [q for q in ielts_exam["questions"] if q["question_category"] != 2]
+    tasks = plan_repairs(ielts_exam, validate_exam(ielts_exam, "IELTS", "1"))
+    assert kinds(tasks) == ["add_questions"]
+    assert tasks[0]["category"] == 2
+    assert tasks[0]["count"] == 4
+
+
+def test_string_categories_count_as_their_number(ielts_exam):
+    for q in ielts_exam["questions"]:
+        q["question_category"] = str(q["question_category"])
+    ielts_exam["questions"] = ielts_exam["questions"][:12]
+    tasks = plan_repairs(ielts_exam, validate_exam(ielts_exam, "IELTS", "1"))
+    assert [(t["category"], t["count"]) for t in tasks] == [(3, 2)]
+
+
+def test_missing_toeic_part7_questions_are_grouped_per_passage(toeic_exam):
+    exam = toeic_exam(7)
+    exam["questions"] = [q for q in exam["questions"] if q["question_number"] not in (148, 162)]
+    tasks = plan_repairs(exam, validate_exam(exam, "TOEIC"))
+    assert {t["passage_number"]: t["numbers"] for t in tasks} == {1: [148], "6a": [162]}
+
+
+def test_ungrounded_answers_are_reviewed(ielts_exam):
+    completion = next(q for q in ielts_exam["questions"] if q["question_category"] == 3)
+    completion["correct_answer"] = "photosynthesis"
+    tasks = plan_repairs(ielts_exam, validate_exam(ielts_exam, "IELTS", "1"))
+    assert kinds(tasks) == ["review_questions"]
+    assert tasks[0]["questions"][0]["question_number"] == completion["question_number"]
+
+
+def test_review_keeps_question_position(ielts_exam):
+    task = {"kind": "review_questions", "passage_number": 1, "questions": [{"question_number": 12, "reason": "x"}]}
+    response = {"questions": [{"question_number": 12, "question_category": 1, "correct_answer": "network"}]}
+    apply_repair(ielts_exam, task, response)
+    question = ielts_exam["questions"][11]
+    assert question["correct_answer"] == "network"
+    assert question["question_category"] == 3
+
+
+def test_added_questions_are_merged_and_renumbered(ielts_exam):
+    ielts_exam["questions"] = [q for q in ielts_exam["questions"] if q["question_number"] != 3]
+    task = {"kind": "add_questions", "count": 1, "category": 1}
+    apply_repair(ielts_exam, task, {"questions": [{"question_number": 99, "question_text": "new"}, {"extra": True}]})
+    finalize_questions(ielts_exam, "IELTS")
+    numbers = [q["question_number"] for q in ielts_exam["questions"]]
+    categories = [q["question_category"] for q in ielts_exam["questions"]]
+    assert numbers == list(range(1, 15))
+    assert categories == [1] * 5 + [2] * 4 + [3] * 5
+
+
+def test_finalize_keeps_exams_within_the_accepted_range(ielts_exam):
+    questions = ielts_exam["questions"]
+    questions.append(dict(questions[0], question_number=15))
+    questions.append(dict(questions[5], question_number=16))
+    finalize_questions(ielts_exam, "IELTS")
+    assert len(ielts_exam["questions"]) == 16
+
+
+def test_finalize_trims_surplus_from_over_full_categories(ielts_exam):
+    questions = ielts_exam["questions"]
+    for number in range(15, 19):
+        questions.append(dict(questions[0], question_number=number))
+    finalize_questions(ielts_exam, "IELTS")
+    categories = [q["question_category"] for q in ielts_exam["questions"]]
+    assert len(categories) == 16
+    assert categories.count(2) == 4 and categories.count(3) == 5
+
+
+def test_finalize_tolerates_mixed_number_types(ielts_exam):
+    for q in ielts_exam["questions"][::2]:
+        q["question_category"] = str(q["question_category"])
+        q["question_number"] = str(q["question_number"])
+    ielts_exam["questions"][0]["question_category"] = None
+    finalize_questions(ielts_exam, "IELTS")
+    assert [q["question_number"] for q in ielts_exam["questions"]] == list(range(1, 15))
+
+
+def test_finalize_cuts_toeic_parts_to_their_size(toeic_exam):
+    exam = toeic_exam(6)
+    exam["questions"].append(dict(exam["questions"][0], question_number=147))
+    exam["questions"].reverse()
+    finalize_questions(exam, "TOEIC")
+    assert [q["question_number"] for q in exam["questions"]] == list(range(131, 147))
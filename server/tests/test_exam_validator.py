@@ -0,0 +1,77 @@
+import pytest
+
+from exam_validator import validate_exam
+
+
+def codes(issues):
+    return [issue["code"] for issue in issues]
+
+
+def test_fake_ielts_exam_is_valid(ielts_exam):
+    report = validate_exam(ielts_exam, "IELTS", "1")
+    assert report["valid"]
+    assert report["errors"] == []
+    assert report["stats"]["question_count"] == 14
+
+
+@pytest.mark.parametrize("part", [5, 6, 7])
+def test_fake_toeic_parts_are_valid(toeic_exam, part):
+    report = validate_exam(toeic_exam(part), "TOEIC")
+    assert report["valid"], report["errors"]
+
+
+def test_exam_type_is_detected_from_result(toeic_exam):
+    assert validate_exam(toeic_exam(6))["exam_type"] == "TOEIC"
+
+
+def test_non_object_result_is_invalid():
+    report = validate_exam(["not", "an", "exam"])
+    assert not report["valid"]
+    assert codes(report["errors"]) == ["type"]
+
+
+def test_missing_required_field_is_reported(ielts_exam):
+    del ielts_exam["questions"]
+    report = validate_exam(ielts_exam, "IELTS", "1")
+    assert not report["valid"]
+    assert report["errors"][0]["severity"] == "error"
+
+
+def test_partial_result_skips_missing_fields_and_counts(ielts_exam):
+    del ielts_exam["questions"]
+    assert validate_exam(ielts_exam, "IELTS", "1", partial=True)["valid"]
+
+
+def test_short_passage(ielts_exam):
+    passage = ielts_exam["reading_passages"][0]
+    passage["content"] = " ".join(passage["content"].split()[:300])
+    report = validate_exam(ielts_exam, "IELTS", "1")
+    error = next(e for e in report["errors"] if e["code"] == "passage_too_short")
+    assert error["details"] == {"passage_index": 0, "word_count": 300, "min_words": 700}
+
+
+@pytest.mark.parametrize("count, valid", [(13, False), (14, True), (15, True), (16, True), (17, False)])
+def test_ielts_question_range(ielts_exam, count, valid):
+    questions = ielts_exam["questions"]
+    while len(questions) < count:
+        questions.append(dict(questions[-1], question_number=len(questions) + 1))
+    del questions[count:]
+    report = validate_exam(ielts_exam, "IELTS", "1")
+    assert ("question_count" not in codes(report["errors"])) == valid
+
+
+def test_toeic_question_count(toeic_exam):
+    exam = toeic_exam(5)
+    exam["questions"].pop()
+    report = validate_exam(exam, "TOEIC")
+    error = next(e for e in report["errors"] if e["code"] == "question_count")
+    assert error["details"]["found"] == 29
+
+
+def test_ungrounded_answer_is_a_warning(ielts_exam):
+    completion = next(q for q in ielts_exam["questions"] if q["question_category"] == 3)
+    completion["correct_answer"] = "photosynthesis"
+    report = validate_exam(ielts_exam, "IELTS", "1")
+    assert report["valid"]
+    assert "answer_not_grounded" in codes(report["warnings"])
+    assert report["stats"]["grounding_suspects"] == 1
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+# llm.py builds its Gemini client with LangChain
+pytest.importorskip("langchain_google_genai")
+
+import usage_ledger  # noqa: E402
+from llm import LLM, strip_json_response  # noqa: E402
+from usage_ledger import UsageLedger  # noqa: E402
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    ledger = UsageLedger(str(tmp_path))
+    monkeypatch.setattr(usage_ledger, "_ledger", ledger)
+    return ledger
+
+
+def test_batch_predict_goes_through_invoke(ledger):
+    llm = LLM(backend="fake", system_prompt="System prompt")
+    llm.usage_session = "session-1"
+    outputs = llm.batch_predict(
+        [{"exam": "IELTS", "part": ""}, {"exam": "TOEIC", "part": "6"}],
+        "Exam type: {exam}\nPart: {part}",
+    )
+
+    assert json.loads(strip_json_response(outputs[0]))["questions"]
+    assert json.loads(strip_json_response(outputs[1]))["part_number"] == 6
+    calls = ledger.session("session-1")["calls"]
+    assert [call["job"] for call in calls] == ["batch_predict", "batch_predict"]
+
+
+def test_batch_predict_reports_missing_fields(ledger):
+    assert LLM(backend="fake").batch_predict([{}], "Exam type: {exam}")[0].startswith("Error: ")
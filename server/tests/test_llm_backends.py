@@ -0,0 +1,62 @@
+import pytest
+
+from llm_backends import RecordingBackend, RecordStore, ReplayBackend, ReplayMissError, prompt_hash
+
+
+class EchoBackend:
+    structured_output = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, prompt, stop=None, **kwargs):
+        self.calls += 1
+        return f"{prompt} #{self.calls}"
+
+
+def test_prompt_hash_covers_system_schema_and_mode():
+    base = prompt_hash("p")
+    assert prompt_hash("p", system=None, response_schema=None, mode=None) == base
+    variants = {
+        prompt_hash("p", ["\n"]),
+        prompt_hash("p", system="s", mode="native"),
+        prompt_hash("p", system="t", mode="native"),
+        prompt_hash("p", response_schema={"type": "OBJECT"}, mode="native"),
+        prompt_hash("p", mode="compact"),
+    }
+    assert base not in variants and len(variants) == 5
+
+
+def test_replay_serves_recorded_sequence(tmp_path):
+    store = RecordStore(str(tmp_path))
+    recorder = RecordingBackend(EchoBackend(), store, model_name="echo")
+    recorder.invoke("prompt", system="sys")
+    recorder.invoke("prompt", system="sys")
+
+    replay = ReplayBackend(RecordStore(str(tmp_path)))
+    assert (replay.mode, replay.structured_output) == ("native", True)
+    assert [replay.invoke("prompt", system="sys") for _ in range(3)] == ["prompt #1", "prompt #2", "prompt #2"]
+    replay.reset()
+    assert replay.invoke("prompt", system="sys") == "prompt #1"
+    with pytest.raises(ReplayMissError):
+        replay.invoke("prompt", system="other")
+
+
+def test_replay_uses_the_recorded_mode(tmp_path):
+    class PlainBackend(EchoBackend):
+        structured_output = False
+
+    store = RecordStore(str(tmp_path))
+    # The LLM falls back to the compact schema for backends without native support
+    RecordingBackend(PlainBackend(), store, mode="native").invoke("prompt")
+    replay = ReplayBackend(RecordStore(str(tmp_path)))
+    assert (replay.mode, replay.structured_output) == ("compact", False)
+    assert replay.invoke("prompt") == "prompt #1"
+
+
+def test_replay_miss_falls_back(tmp_path):
+    fallback = EchoBackend()
+    replay = ReplayBackend(RecordStore(str(tmp_path)), fallback=fallback)
+    assert replay.mode is None
+    assert replay.invoke("unrecorded") == "unrecorded #1"
+    assert fallback.calls == 1
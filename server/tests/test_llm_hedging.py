@@ -0,0 +1,61 @@
+import time
+import threading
+
+import usage_ledger
+from llm_hedging import HedgedBackend, LatencyTracker
+from usage_ledger import UsageLedger, report_usage, start_call
+
+
+class SlowThenFastBackend:
+    """First request hangs for ``slow`` seconds, later ones answer at once."""
+
+    def __init__(self, slow: float):
+        self.slow = slow
+        self.calls = 0
+        self.finished = threading.Event()
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt, stop=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            first = self.calls == 1
+        time.sleep(self.slow if first else 0.01)
+        report_usage("model-x", 100, 10 if first else 20)
+        if first:
+            self.finished.set()
+        return "slow" if first else "fast"
+
+
+def test_tracker_threshold_and_budget():
+    tracker = LatencyTracker(budget=0.5, initial_delay=30, min_delay=1, min_samples=4)
+    assert tracker.threshold() == 30
+    for latency in (0.5, 2, 3, 10):
+        tracker.record(latency)
+    assert tracker.threshold() == 10
+    assert tracker.try_spend()
+    assert not tracker.try_spend()
+    tracker.earn()
+    tracker.earn()
+    assert tracker.try_spend()
+
+
+def test_hedge_wins_and_loser_usage_is_recorded(tmp_path, monkeypatch):
+    ledger = UsageLedger(str(tmp_path))
+    monkeypatch.setattr(usage_ledger, "_ledger", ledger)
+    inner = SlowThenFastBackend(slow=0.3)
+    backend = HedgedBackend(inner, "hedge-test")
+    backend.tracker = LatencyTracker(initial_delay=0.05, min_delay=0)
+
+    call = start_call("session-1", attempt=0, job="generate")
+    assert backend.invoke("prompt") == "fast"
+    # Only the winning request was paid for by the time the call is recorded
+    assert [usage["output_tokens"] for usage in call.close()] == [20]
+
+    assert inner.finished.wait(2)
+    for _ in range(100):
+        if ledger.session("session-1")["calls"]:
+            break
+        time.sleep(0.01)
+    late = ledger.session("session-1")["calls"]
+    assert [(entry["job"], entry["late"], entry["output_tokens"]) for entry in late] == [("generate", True, 10)]
+    assert ledger.session("session-1")["jobs"]["generate"]["output_tokens"] == 10
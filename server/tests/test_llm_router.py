@@ -0,0 +1,109 @@
+import pytest
+
+import llm_router
+from llm_router import AllProvidersFailedError, LLMRouter, Provider, ProviderHealth
+
+
+class StubBackend:
+    """Answers with its name, or raises while ``failing``."""
+
+    def __init__(self, name, failing=False, structured_output=True):
+        self.name = name
+        self.failing = failing
+        self.structured_output = structured_output
+        self.calls = 0
+
+    def invoke(self, prompt, stop=None, **kwargs):
+        self.calls += 1
+        if self.failing:
+            raise RuntimeError(f"{self.name} is down")
+        return self.name
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_router.time, "monotonic", lambda: now[0])
+    return now
+
+
+def provider(name, priority, **backend_options):
+    # A private health per test instead of the process-wide one
+    entry = Provider(name, StubBackend(name, **backend_options), priority=priority)
+    entry.health = ProviderHealth(failure_threshold=2, cooldown=30, min_samples=4)
+    return entry
+
+
+def test_circuit_opens_after_threshold_and_lets_one_probe_through(clock):
+    health = ProviderHealth(failure_threshold=3, cooldown=30)
+    for _ in range(2):
+        health.record(1.0, ok=False)
+    assert health.available()
+    health.record(1.0, ok=False)
+    assert not health.available()
+    assert health.snapshot()["circuit_open"]
+
+    clock[0] += 31
+    assert health.available()
+    assert not health.available()  # only one probe at a time
+    health.record(1.0, ok=False)
+    assert not health.available()  # failed probe opens the circuit again
+
+    clock[0] += 31
+    assert health.available()
+    health.record(1.0, ok=True)
+    assert health.available() and health.available()
+    assert health.snapshot()["consecutive_failures"] == 0
+
+
+def test_fails_over_and_skips_open_circuit(clock):
+    primary, secondary = provider("primary", 0, failing=True), provider("secondary", 1)
+    router = LLMRouter([primary, secondary])
+
+    assert [router.invoke("prompt") for _ in range(4)] == ["secondary"] * 4
+    # Two failures open the primary's circuit; the later calls skip it
+    assert primary.backend.calls == 2
+
+    clock[0] += 31
+    primary.backend.failing = False
+    assert router.invoke("prompt") == "primary"
+    assert router.invoke("prompt") == "primary"
+
+
+def test_slow_and_degraded_providers_are_tried_last(clock):
+    fast, slow, flaky = provider("fast", 2), provider("slow", 0), provider("flaky", 1)
+    for _ in range(4):
+        fast.health.record(1.0, ok=True)
+        slow.health.record(5.0, ok=True)
+    for ok in (True, False, False, False):
+        flaky.health.record(0.5, ok=ok)
+    router = LLMRouter([slow, flaky, fast], slow_factor=3)
+
+    assert [p.name for p in router.ranked_providers()] == ["fast", "slow", "flaky"]
+    assert router.invoke("prompt") == "fast"
+
+
+def test_all_circuits_open_falls_back_to_preferred_provider(clock):
+    first, second = provider("first", 0, failing=True), provider("second", 1, failing=True)
+    router = LLMRouter([first, second])
+    with pytest.raises(AllProvidersFailedError):
+        router.invoke("prompt")
+    with pytest.raises(AllProvidersFailedError):
+        router.invoke("prompt")
+    assert (first.backend.calls, second.backend.calls) == (2, 2)
+
+    # Both circuits are open: the preferred provider is still tried rather than failing outright
+    first.backend.failing = False
+    assert router.invoke("prompt") == "first"
+    assert (first.backend.calls, second.backend.calls) == (3, 2)
+
+    first.backend.failing = True
+    with pytest.raises(AllProvidersFailedError, match="first is down"):
+        router.invoke("prompt")
+
+
+def test_structured_output_needs_every_provider():
+    assert LLMRouter([provider("a", 0), provider("b", 1)]).structured_output
+    assert not LLMRouter([provider("a", 0), provider("b", 1, structured_output=False)]).structured_output
+    with pytest.raises(ValueError):
+        LLMRouter([])
@@ -0,0 +1,67 @@
+import json
+
+from exam_validator import load_schema
+from llm_structured import compact_schema, to_response_schema
+
+
+def test_exam_schemas_convert():
+    for exam_type in ("IELTS", "TOEIC"):
+        converted = to_response_schema(load_schema(exam_type))
+        assert converted["type"] == "OBJECT"
+        assert "questions" in converted["properties"]
+
+
+def test_toeic_passage_numbers_become_strings():
+    properties = to_response_schema(load_schema("TOEIC"))["properties"]
+    passage_number = properties["reading_passages"]["items"]["properties"]["passage_number"]
+    passage_reference = properties["questions"]["items"]["properties"]["passage_reference"]
+    # Both 6 and "6a" have to fit, so the union is a string rather than its first type
+    assert passage_number["type"] == "STRING"
+    assert passage_reference["type"] == "STRING"
+    assert passage_reference["nullable"] is True
+
+
+def test_unions_refs_and_enums():
+    schema = {
+        "type": "object",
+        "definitions": {"level": {"type": "string", "enum": ["Easy", "Hard"]}},
+        "properties": {
+            "level": {"$ref": "#/definitions/level"},
+            "score": {"type": ["number", "null"], "minimum": 0},
+            "count": {"type": ["integer", "boolean"]},
+            "kind": {"const": "exam"},
+            "part": {"type": "integer", "enum": [5, 6, 7]},
+            "tags": {"type": "array", "items": {"anyOf": [{"type": "string"}, {"type": "integer"}]}},
+        },
+        "required": ["level", "missing"],
+    }
+    converted = to_response_schema(schema)
+    properties = converted["properties"]
+    assert properties["level"] == {"enum": ["Easy", "Hard"], "type": "STRING"}
+    assert properties["score"] == {"nullable": True, "type": "NUMBER"}
+    assert properties["count"] == {"type": "INTEGER"}
+    assert properties["kind"] == {"enum": ["exam"], "type": "STRING"}
+    assert properties["part"] == {"type": "INTEGER"}
+    assert properties["tags"] == {"type": "ARRAY", "items": {"type": "STRING"}}
+    assert converted["required"] == ["level"]
+
+
+def test_unsupported_schemas():
+    assert to_response_schema({"type": "object", "properties": {"extra": {"type": "object"}}}) is None
+    assert to_response_schema({"type": "object", "properties": {"x": {"$ref": "#/definitions/unknown"}}}) is None
+    recursive = {
+        "definitions": {"node": {"type": "object", "properties": {"child": {"$ref": "#/definitions/node"}}}},
+        "$ref": "#/definitions/node",
+    }
+    assert to_response_schema(recursive) is None
+
+
+def test_compact_schema_keeps_fields_named_like_annotations():
+    schema = {
+        "$schema": "http://json-schema.org/draft-07/schema#",
+        "title": "Exam",
+        "type": "object",
+        "properties": {"title": {"type": "string", "examples": ["Mesh networks"]}},
+    }
+    assert json.loads(compact_schema(schema)) == {"type": "object", "properties": {"title": {"type": "string"}}}
+    assert len(compact_schema(load_schema("TOEIC"))) < len(json.dumps(load_schema("TOEIC"), indent=2))
@@ -0,0 +1,92 @@
+import random
+
+from benchmarks.fake_llm import make_text
+from markdown_pruner import classify_block, parse_markdown, policy_from_env, prune_markdown
+
+
+BODY = make_text(random.Random(3), 400)
+
+PAPER = f"""# Secure Routing in Mesh Networks
+
+Jane Doe, Department of Computer Science, University of Somewhere, jane@cs.example.edu
+
+## Abstract
+
+{BODY}
+
+<!-- image -->
+
+$$
+E = mc^2
+$$
+
+| Model | Accuracy | F1 |
+|---|---|---|
+| A | 91.2 | 0.88 |
+| B | 93.4 | 0.90 |
+
+## 1. Introduction
+
+{BODY}
+
+## References
+
+[1] A. Author. Some paper. 2020.
+
+[2] B. Author. Another paper. 2021.
+
+## Appendix A
+
+Extra proofs and tables.
+"""
+
+
+def test_classify_block():
+    assert classify_block("## Introduction") == "heading"
+    assert classify_block("<!-- image -->") == "image"
+    assert classify_block("$$\nx = y\n$$") == "equation"
+    assert classify_block("| a | 1 |\n|---|---|\n| b | 2 |") == "numeric_table"
+    assert classify_block("| Name | Role |\n|---|---|\n| Ann | Editor |") == "table"
+    assert classify_block("```python\nprint(1)\n```") == "code"
+    assert classify_block("- one\n- two") == "list"
+    assert classify_block("Figure 3: Throughput per node.") == "caption"
+    assert classify_block("Plain prose sentence.") == "text"
+
+
+def test_sections_and_affiliation():
+    blocks = parse_markdown(PAPER)
+    categories = {block["text"].split("\n")[0][:20]: block["category"] for block in blocks}
+    assert categories["Jane Doe, Department"] == "affiliation"
+    assert categories["[1] A. Author. Some "] == "references"
+    assert categories["Extra proofs and tab"] == "appendix"
+    assert {block["section"] for block in blocks} >= {"front_matter", "body", "references", "appendix"}
+
+
+def test_prune_drops_non_exam_blocks():
+    pruned, report = prune_markdown(PAPER)
+    assert report["applied"]
+    for removed in ("jane@cs.example.edu", "<!-- image -->", "E = mc^2", "91.2", "Some paper", "Extra proofs"):
+        assert removed not in pruned
+    assert "## 1. Introduction" in pruned
+    assert report["words_after"] < report["words_before"]
+    assert report["categories"]["references"]["dropped"] == 3
+
+
+def test_prune_with_no_policy_keeps_everything():
+    pruned, report = prune_markdown(PAPER, drop=None)
+    assert not report["applied"]
+    assert pruned.split() == PAPER.split()
+
+
+def test_prune_falls_back_when_too_little_is_left():
+    markdown = "## References\n\n" + BODY
+    pruned, report = prune_markdown(markdown)
+    assert pruned == markdown
+    assert not report["applied"]
+
+
+def test_policy_from_env(monkeypatch):
+    monkeypatch.setenv("MARKDOWN_PRUNE_DROP", "references, image")
+    assert policy_from_env() == {"references", "image"}
+    monkeypatch.setenv("MARKDOWN_PRUNE", "false")
+    assert policy_from_env() is None
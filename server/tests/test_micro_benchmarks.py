@@ -0,0 +1,20 @@
+import pytest
+
+from benchmarks import micro
+
+
+def test_every_case_runs():
+    # The cases reach into baseline.py and llm.py, which need the server and LLM SDKs
+    for module in ("uvicorn", "langchain_google_genai"):
+        pytest.importorskip(module)
+    cases = micro.build_cases(micro.build_fixtures())
+    assert len({name for name, _ in cases}) == len(cases)
+    for name, func in cases:
+        assert func() is not None, name
+
+
+def test_check_reports_regressions_past_the_threshold():
+    baseline = {"results": {"fast": {"best": 0.010}, "slow": {"best": 0.010}}}
+    results = {"fast": {"best": 0.012}, "slow": {"best": 0.013}, "new": {"best": 1.0}}
+    regressions = micro.check(results, baseline, threshold=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith("slow:")
@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from pdf_extractor import PAGE_BREAK, PDFExtractor, count_pdf_pages  # noqa: E402
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = str(tmp_path / "paper.pdf")
+    with fitz.open() as doc:
+        for number in range(1, 7):
+            doc.new_page().insert_text((72, 72), f"Page {number} of the paper.")
+        doc.save(path)
+    return path
+
+
+class RecordingExtractor(PDFExtractor):
+    """Answers docling requests locally: one markdown paragraph per page uploaded."""
+
+    def __init__(self):
+        super().__init__(docling_url="http://docling.invalid/v1alpha/convert/file")
+        self.requests = []
+
+    def _send_request(self, files, page_range=None, options=None):
+        upload = files["files"][1].name
+        self.requests.append({
+            "upload": os.path.basename(upload), "pages": count_pdf_pages(upload),
+            "page_range": page_range, "options": options,
+        })
+        with fitz.open(upload) as doc:
+            pages = [page.get_text().strip() for page in doc]
+        separator = (options or {}).get("md_page_break_placeholder", "\n\n")
+        return separator.join(pages)
+
+
+@pytest.fixture(autouse=True)
+def docling_route(monkeypatch, tmp_path):
+    monkeypatch.setenv("FAST_PATH", "off")
+    monkeypatch.setenv("PAGE_CACHE_DIR", str(tmp_path / "cache"))
+
+
+def test_page_range_is_sliced_and_the_slice_removed(pdf, tmp_path, monkeypatch):
+    monkeypatch.setenv("PAGE_CACHE", "false")
+    extractor = RecordingExtractor()
+    extractor.set_page_range((2, 3))
+
+    markdown = extractor.extract_from_file(pdf)
+    assert markdown.split() == "Page 2 of the paper. Page 3 of the paper.".split()
+    assert extractor.requests == [{"upload": "paper.pdf.pages-2-3.pdf", "pages": 2, "page_range": None, "options": None}]
+    assert extractor.pages == {"first": 2, "last": 3, "total": 6}
+    assert sorted(os.listdir(tmp_path)) == ["paper.pdf"]
+
+
+def test_whole_document_is_sent_unsliced(pdf, monkeypatch):
+    monkeypatch.setenv("PAGE_CACHE", "false")
+    extractor = RecordingExtractor()
+    extractor.extract_from_file(pdf)
+    assert [(r["upload"], r["pages"]) for r in extractor.requests] == [("paper.pdf", 6)]
+
+
+def test_page_cache_converts_missing_runs_in_one_request(pdf):
+    cold = RecordingExtractor()
+    cold.set_page_range((2, 4))
+    cold.extract_from_file(pdf)
+    assert [(r["pages"], r["options"]) for r in cold.requests] == [(3, {"md_page_break_placeholder": PAGE_BREAK})]
+
+    warm = RecordingExtractor()
+    markdown = warm.extract_from_file(pdf)
+    # Pages 2-4 are cached; pages 1 and 5-6 are two runs, one request each
+    assert sorted(r["upload"] for r in warm.requests) == ["paper.pdf.pages-1-1.pdf", "paper.pdf.pages-5-6.pdf"]
+    assert warm.routing["page_cache"] == {"pages": 6, "reused": 3, "extracted": 3}
+    assert [line for line in markdown.split("\n") if line.strip()] == [f"Page {n} of the paper." for n in range(1, 7)]
+
+    again = RecordingExtractor()
+    assert again.extract_from_file(pdf) == markdown
+    assert again.requests == []
+
+
+DATA_PDF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "2404.03820v1.pdf")
+IMAGE = "![figure](data:image/png;base64," + "iVBORw0KGgo" * 20 + ")"
+
+
+class ImageExtractor(RecordingExtractor):
+    """Docling stand-in whose markdown embeds a base64 image after the first page."""
+
+    def _send_request(self, files, page_range=None, options=None):
+        markdown = super()._send_request(files, page_range, options)
+        head, separator, tail = markdown.partition((options or {}).get("md_page_break_placeholder", "\n\n"))
+        return f"{head}\n\n{IMAGE}\n\n{separator}{tail}"
+
+
+@pytest.mark.parametrize("page_cache", ["true", "false"])
+def test_process_writes_cleaned_markdown(tmp_path, monkeypatch, page_cache):
+    monkeypatch.setenv("PAGE_CACHE", page_cache)
+    monkeypatch.chdir(tmp_path)
+    extractor = ImageExtractor()
+    extractor.set_page_range((1, 3))
+
+    output_path = extractor.process(DATA_PDF)
+    assert output_path == "2404.03820v1.md"
+    markdown = open(tmp_path / output_path, encoding="utf-8").read()
+    assert "base64" not in markdown
+    assert "![Image removed to reduce file size]" in markdown
+    assert len(markdown.split()) > 500
+
+    kept = ImageExtractor().process(DATA_PDF, output_path=str(tmp_path / "kept.md"), clean_images=False)
+    assert "base64" in open(kept, encoding="utf-8").read()
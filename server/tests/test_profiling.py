@@ -0,0 +1,54 @@
+import os
+import threading
+import tracemalloc
+
+from profiling import RequestProfiler, new_request_id
+
+
+def test_admin_token(tmp_path):
+    profiler = RequestProfiler(admin_token="secret", profile_dir=str(tmp_path), trace_memory=False)
+    assert profiler.is_admin({"x-profile-token": "secret"})
+    assert not profiler.is_admin({"x-profile-token": "secret2"})
+    assert not profiler.is_admin({})
+    assert not RequestProfiler(profile_dir=str(tmp_path)).is_admin({"x-profile-token": ""})
+
+
+def test_request_ids_are_generated_by_the_server():
+    first, second = new_request_id({}), new_request_id({"x-request-id": "trace-42"})
+    assert len(first) == 32 and first != second[:32]
+    assert second.endswith("-trace-42")
+    assert "/" not in new_request_id({"x-request-id": "../../etc/passwd"})
+    assert len(new_request_id({"x-request-id": "x" * 64})) == 64
+
+
+def test_profile_includes_worker_threads(tmp_path):
+    profiler = RequestProfiler(profile_dir=str(tmp_path))
+    was_tracing = tracemalloc.is_tracing()
+    assert profiler.try_acquire()
+    state = profiler.start("req-1", "POST", "/generate-exam")
+
+    def blocking_work():
+        return sum(i * i for i in range(10000))
+
+    worker = profiler.profile_worker(blocking_work)
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    profiler.stop(state, 200)
+
+    text = open(profiler.artifact_path("req-1"), encoding="utf-8").read()
+    assert "Request: POST /generate-exam" in text
+    assert "== Worker thread: test_profile_includes_worker_threads.<locals>.blocking_work" in text
+    assert tracemalloc.is_tracing() == was_tracing
+    # The slot was released
+    assert profiler.try_acquire()
+    assert profiler.profile_worker(blocking_work) is blocking_work
+
+
+def test_artifact_path_rejects_unsafe_ids(tmp_path):
+    profiler = RequestProfiler(profile_dir=str(tmp_path))
+    (tmp_path / "req-1.txt").write_text("profile")
+    assert profiler.artifact_path("req-1") == os.path.join(str(tmp_path), "req-1.txt")
+    assert profiler.artifact_path("../req-1") is None
+    assert profiler.artifact_path("req-1", "py") is None
+    assert profiler.artifact_path("req-2") is None
@@ -0,0 +1,56 @@
+from contextlib import contextmanager
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+import progressive_extraction  # noqa: E402
+from pdf_extractor import PDFExtractor  # noqa: E402
+from progressive_extraction import ProgressiveExtraction  # noqa: E402
+
+
+class PageTextExtractor(PDFExtractor):
+    """The real extractor with the docling conversion replaced by one sentence and image per page."""
+
+    def _convert_pages(self, file_path, pages, total, options=None):
+        first, last = pages
+        return "\n\n".join(
+            f"Words of page {page}.\n\n![fig](data:image/png;base64,{'A' * 120})" for page in range(first, last + 1)
+        )
+
+
+@pytest.fixture
+def pdf(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAST_PATH", "off")
+    monkeypatch.setenv("PAGE_CACHE", "false")
+    monkeypatch.setattr(progressive_extraction, "PDFExtractor", PageTextExtractor)
+    path = str(tmp_path / "paper.pdf")
+    with fitz.open() as doc:
+        for _ in range(7):
+            doc.new_page()
+        doc.save(path)
+    return path
+
+
+def test_batches_after_ready_hold_a_slot(pdf):
+    slots, updates = [], []
+
+    @contextmanager
+    def batch_slot():
+        slots.append(extraction.pages_done)
+        yield
+
+    extraction = ProgressiveExtraction(
+        pdf, (1, 7), lambda content, complete: updates.append((content, complete)),
+        batch_pages=3, ready_words=8, batch_slot=batch_slot,
+    )
+    extraction.start()
+    assert extraction.done.wait(5)
+
+    assert extraction.state()["status"] == "complete", extraction.error
+    assert [(content.count("Words of page"), complete) for content, complete in updates] == [
+        (3, False), (6, False), (7, True)
+    ]
+    assert "base64" not in updates[-1][0]
+    # The first batch runs in the admitting request's slot; later ones take their own
+    assert slots == [3, 6]
@@ -0,0 +1,84 @@
+import copy
+
+from exam_validator import validate_exam
+from question_bank import QuestionBank
+
+
+def ingest(bank, result, source, paper="paper-1", exam_type="IELTS", passage_type="1", report=None):
+    report = report or validate_exam(result, exam_type, passage_type)
+    bank.ingest(result, source, paper, exam_type, "medium", passage_type, report=report)
+
+
+def test_assembles_valid_exam_of_the_same_paper(tmp_path, ielts_exam):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    ingest(bank, ielts_exam, "session-1")
+
+    result = bank.assemble("ielts", "medium", "1", paper="paper-1")
+    assert result == ielts_exam
+    assert validate_exam(result, "IELTS", "1")["valid"]
+    assert bank.assemble("IELTS", "medium", "1", paper="paper-2") is None
+    assert bank.assemble("IELTS", "hard", "1", paper="paper-1") is None
+    assert bank.assemble("IELTS", "medium", "1", paper="paper-1", exclude_source="session-1") is None
+
+
+def test_topic_scope_reuses_other_papers(tmp_path, ielts_exam):
+    bank = QuestionBank(str(tmp_path / "bank.db"), scope="topic")
+    ingest(bank, ielts_exam, "session-1")
+    markdown = ielts_exam["reading_passages"][0]["content"]
+
+    assert bank.assemble("IELTS", "medium", "1", paper="paper-2", markdown=markdown) == ielts_exam
+    assert bank.assemble("IELTS", "medium", "1", paper="paper-2", markdown="Medieval tapestry weaving guilds") is None
+
+
+def test_invalid_and_ungrounded_material_is_not_reused(tmp_path, ielts_exam):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    ingest(bank, ielts_exam, "invalid", report={"valid": False, "warnings": []})
+    assert bank.assemble("IELTS", "medium", "1", paper="paper-1") is None
+
+    report = validate_exam(ielts_exam, "IELTS", "1")
+    report["warnings"].append({
+        "code": "answer_not_grounded", "severity": "warning", "details": {"question_number": 11},
+    })
+    ingest(bank, ielts_exam, "suspect", report=report)
+    # Question 11 is one of the five completion questions the exam needs
+    assert bank.assemble("IELTS", "medium", "1", paper="paper-1") is None
+
+
+def test_reingesting_a_source_replaces_it(tmp_path, ielts_exam):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    ingest(bank, ielts_exam, "session-1")
+    repaired = copy.deepcopy(ielts_exam)
+    repaired["reading_passages"][0]["title"] = "Repaired title"
+    ingest(bank, repaired, "session-1")
+
+    assert bank.assemble("IELTS", "medium", "1", paper="paper-1") == repaired
+    assert bank.stats()["groups"] == [{
+        "exam_type": "IELTS", "passage_type": "1", "difficulty": "medium",
+        "exams": 1, "questions": len(ielts_exam["questions"]),
+    }]
+
+
+def test_combines_toeic_parts_from_several_exams(tmp_path, toeic_exam):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    for part in (5, 6):
+        first, second = toeic_exam(part), toeic_exam(part)
+        rules = {5: 15, 6: 8}[part]
+        # Each exam alone is too short; the bank joins the two halves
+        first["questions"] = first["questions"][:rules]
+        second["questions"] = second["questions"][rules:]
+        for index, half in enumerate((first, second)):
+            if part == 6:
+                kept = {q["passage_reference"] for q in half["questions"]}
+                half["reading_passages"] = [p for p in half["reading_passages"] if p["passage_number"] in kept]
+            report = {"valid": True, "warnings": []}
+            ingest(bank, half, f"part{part}-{index}", exam_type="TOEIC", passage_type=str(part), report=report)
+
+        result = bank.assemble("TOEIC", "medium", str(part), paper="paper-1")
+        first_number = {5: 101, 6: 131}[part]
+        assert [q["question_number"] for q in result["questions"]] == list(
+            range(first_number, first_number + 2 * rules)
+        )
+        assert validate_exam(result, "TOEIC")["valid"]
+        if part == 6:
+            assert [p["passage_number"] for p in result["reading_passages"]] == [1, 2, 3, 4]
+            assert [q["passage_reference"] for q in result["questions"]] == [n for n in (1, 2, 3, 4) for _ in range(4)]
@@ -0,0 +1,110 @@
+import time
+import asyncio
+
+import pytest
+
+from singleflight import IdempotencyConflict, SingleFlight
+
+
+def counting_job(calls, result="exam", delay=0.01, error=None):
+    async def job():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return result
+    return job
+
+
+def test_concurrent_calls_share_one_execution():
+    async def main():
+        flight, calls = SingleFlight(), []
+        results = await asyncio.gather(*(flight.do("k", "fp", counting_job(calls)) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ["exam"] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert flight.snapshot() == {"running": 0, "kept_results": 0, "executions": 1, "coalesced": 4}
+
+
+def test_finished_results_are_only_kept_with_keep_result():
+    async def main():
+        flight, calls = SingleFlight(), []
+        await flight.do("plain", "fp", counting_job(calls))
+        await flight.do("plain", "fp", counting_job(calls))
+        await flight.do("idem", "fp", counting_job(calls), keep_result=True)
+        second = await flight.do("idem", "fp", counting_job(calls), keep_result=True)
+        return calls, second
+
+    calls, second = asyncio.run(main())
+    assert len(calls) == 3
+    assert second == ("exam", True)
+
+
+def test_kept_results_expire_and_are_bounded(monkeypatch):
+    async def main():
+        flight, calls = SingleFlight(ttl=60, max_results=2), []
+        for key in ("a", "b", "c"):
+            await flight.do(key, "fp", counting_job(calls, delay=0), keep_result=True)
+        assert list(flight._results) == ["b", "c"]
+        now = time.time()
+        monkeypatch.setattr("singleflight.time.time", lambda: now + 61)
+        _, shared = await flight.do("c", "fp", counting_job(calls, delay=0), keep_result=True)
+        return calls, shared
+
+    calls, shared = asyncio.run(main())
+    assert len(calls) == 4
+    assert not shared
+
+
+def test_reusing_a_key_for_another_request_conflicts():
+    async def main():
+        flight, calls = SingleFlight(), []
+        running = asyncio.ensure_future(flight.do("k", "fp-1", counting_job(calls)))
+        await asyncio.sleep(0)
+        with pytest.raises(IdempotencyConflict):
+            await flight.do("k", "fp-2", counting_job(calls))
+        await running
+        await flight.do("kept", "fp-1", counting_job(calls), keep_result=True)
+        with pytest.raises(IdempotencyConflict):
+            await flight.do("kept", "fp-2", counting_job(calls), keep_result=True)
+
+    asyncio.run(main())
+
+
+def test_failures_are_shared_but_not_kept():
+    async def main():
+        flight, calls = SingleFlight(), []
+        job = counting_job(calls, error=RuntimeError("quota"))
+        results = await asyncio.gather(
+            flight.do("k", "fp", job, keep_result=True),
+            flight.do("k", "fp", job, keep_result=True),
+            return_exceptions=True,
+        )
+        retry = await flight.do("k", "fp", counting_job(calls), keep_result=True)
+        return calls, results, retry
+
+    calls, results, retry = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retry == ("exam", False)
+    assert len(calls) == 2
+
+
+def test_cancelled_caller_does_not_cancel_shared_execution():
+    async def main():
+        flight, calls = SingleFlight(), []
+        first = asyncio.ensure_future(flight.do("k", "fp", counting_job(calls, delay=0.05)))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(flight.do("k", "fp", counting_job(calls)))
+        await asyncio.sleep(0)
+        first.cancel()
+        result = await second
+        await asyncio.sleep(0)
+        return flight, calls, result
+
+    flight, calls, result = asyncio.run(main())
+    assert result == ("exam", True)
+    assert len(calls) == 1
+    assert flight.snapshot()["running"] == 0
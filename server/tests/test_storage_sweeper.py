@@ -0,0 +1,42 @@
+import os
+import time
+
+from storage_sweeper import RetentionRule, StorageSweeper
+
+
+def write(path, size, age):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+
+
+def test_relative_directories_are_swept(tmp_path, monkeypatch):
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "server").mkdir()
+    monkeypatch.chdir(tmp_path / "server")
+    write(tmp_path / "uploads" / "old.pdf", 10, age=7200)
+    write(tmp_path / "uploads" / "new.pdf", 10, age=0)
+    write(tmp_path / "uploads" / "notes.txt", 10, age=7200)
+
+    rule = RetentionRule("uploads", "../uploads", [".pdf"], max_age=3600)
+    assert rule.matches(str(tmp_path / "uploads" / "old.pdf"))
+    report = StorageSweeper([rule]).sweep()
+
+    assert report["expired"] == {"uploads": 1}
+    assert sorted(os.listdir(tmp_path / "uploads")) == ["new.pdf", "notes.txt"]
+
+
+def test_quota_evicts_least_recently_used_unprotected_files(tmp_path):
+    for name, age in (("a.json", 300), ("b.json", 200), ("c.json", 100)):
+        write(tmp_path / name, 100, age)
+    sweeper = StorageSweeper(
+        [RetentionRule("output", str(tmp_path), [".json"], max_age=None)],
+        quota_bytes=200,
+        protected=lambda: {str(tmp_path / "a.json")},
+    )
+    sweeper.touch(str(tmp_path / "b.json"))
+
+    report = sweeper.sweep()
+    assert report["evicted"] == {"output": 1}
+    assert sorted(os.listdir(tmp_path)) == ["a.json", "b.json"]
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Token and cost ledger for LLM calls.
+
+Every call made through LLM.invoke is recorded with its model, input and
+output tokens, latency, retry attempt, session and job. Backends that know
+the exact token counts report them with report_usage(); otherwise they are
+estimated from the text. The losing request of a hedged call reports after
+its call was recorded; it is recorded on its own under the same job, marked
+``late``. Calls are appended to one JSONL file per day in USAGE_DIR, kept
+per session in memory, and checked against the per-session and daily
+budgets before each call.
+"""
+import os
+import json
+import time
+import threading
+import contextvars
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+from metrics import LLM_TOKENS, LLM_COST_USD
+
+
+DEFAULT_USAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "usage")
+
+# USD per million input / output tokens; override or extend with LLM_PRICES
+DEFAULT_PRICES = {
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-flash-8b": (0.0375, 0.15),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+}
+
+class BudgetExceededError(RuntimeError):
+    """A session or the daily LLM budget is used up."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token) for backends that report none."""
+    return max(1, len(text) // 4) if text else 0
+
+
+class CallUsage(list):
+    """
+    Token counts reported by the backends during one LLM.invoke call.
+
+    Reports that arrive after the call was recorded (close()), such as the
+    abandoned request of a hedged call, go straight to the ledger.
+    """
+
+    def __init__(self, session_id: Optional[str] = None, attempt: int = 0, job: str = "llm"):
+        super().__init__()
+        self.session_id = session_id
+        self.attempt = attempt
+        self.job = job
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def add(self, call: Dict[str, Any]) -> None:
+        with self._lock:
+            if not self.closed:
+                self.append(call)
+                return
+        get_ledger().record(
+            self.session_id,
+            self.job,
+            call["model"],
+            call["input_tokens"],
+            call["output_tokens"],
+            call.get("latency", 0.0),
+            attempt=self.attempt,
+            estimated=call.get("estimated", False),
+            late=True,
+        )
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Reports so far; later ones are recorded by add()."""
+        with self._lock:
+            self.closed = True
+            return list(self)
+
+
+# Usage of the LLM.invoke call running in the current context
+_reported: contextvars.ContextVar[Optional[CallUsage]] = contextvars.ContextVar("usage_reported", default=None)
+
+
+def report_usage(
+    model: str, input_tokens: int, output_tokens: int, estimated: bool = False, latency: float = 0.0
+) -> None:
+    """Called by backends with the token counts of one API request."""
+    calls = _reported.get()
+    if calls is not None:
+        calls.add({
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "estimated": estimated,
+            "latency": latency,
+        })
+
+
+def start_call(session_id: Optional[str] = None, attempt: int = 0, job: str = "llm") -> CallUsage:
+    """Collect the report_usage() calls of the current context into the returned list."""
+    calls = CallUsage(session_id, attempt, job)
+    _reported.set(calls)
+    return calls
+
+
+def current_call() -> Optional[CallUsage]:
+    return _reported.get()
+
+
+def estimated_usage(model: str, prompt: str, text: str, system: Optional[str] = None) -> Dict[str, Any]:
+    """Usage report estimated from the text, for backends that report none."""
+    return {
+        "model": model,
+        "input_tokens": estimate_tokens(prompt + (system or "")),
+        "output_tokens": estimate_tokens(text),
+        "estimated": True,
+    }
+
+
+def _prices() -> Dict[str, tuple]:
+    prices = dict(DEFAULT_PRICES)
+    if os.getenv("LLM_PRICES"):
+        prices.update({model: tuple(price) for model, price in json.loads(os.getenv("LLM_PRICES")).items()})
+    return prices
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+class UsageLedger:
+    """
+    Recorded LLM calls with per-session and daily totals.
+
+    Budgets (environment, unset means unlimited):
+        LLM_SESSION_BUDGET_USD / LLM_SESSION_BUDGET_TOKENS: per session
+        LLM_DAILY_BUDGET_USD / LLM_DAILY_BUDGET_TOKENS: all sessions, per UTC day
+    """
+
+    def __init__(self, directory: str = DEFAULT_USAGE_DIR):
+        self.directory = directory
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        self.prices = _prices()
+        self.session_budget_usd = _env_float("LLM_SESSION_BUDGET_USD")
+        self.session_budget_tokens = _env_float("LLM_SESSION_BUDGET_TOKENS")
+        self.daily_budget_usd = _env_float("LLM_DAILY_BUDGET_USD")
+        self.daily_budget_tokens = _env_float("LLM_DAILY_BUDGET_TOKENS")
+        self._sessions: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._day = None
+        self._day_totals = self._empty_totals()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _empty_totals() -> Dict[str, Any]:
+        return {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0, "retries": 0}
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.directory, f"{day}.jsonl")
+
+    def _today(self) -> Dict[str, Any]:
+        """Totals of the current UTC day, loaded from its file after a restart."""
+        day = time.strftime("%Y-%m-%d", time.gmtime())
+        if day != self._day:
+            self._day = day
+            self._day_totals = self.daily(day)["total"]
+        return self._day_totals
+
+    def cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        price_in, price_out = self.prices.get(model, (0.0, 0.0))
+        return (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+    def record(
+        self,
+        session_id: Optional[str],
+        job: str,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        latency: float,
+        attempt: int = 0,
+        estimated: bool = False,
+        late: bool = False,
+    ) -> Dict[str, Any]:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "session_id": session_id,
+            "job": job,
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "latency": round(latency, 3),
+            "attempt": attempt,
+            "estimated": estimated,
+            "late": late,
+            "cost_usd": round(self.cost(model, input_tokens, output_tokens), 6),
+        }
+        LLM_TOKENS.labels(model, "input").inc(input_tokens)
+        LLM_TOKENS.labels(model, "output").inc(output_tokens)
+        LLM_COST_USD.labels(model).inc(entry["cost_usd"])
+        with self._lock:
+            totals = self._today()
+            totals["calls"] += 1
+            totals["input_tokens"] += input_tokens
+            totals["output_tokens"] += output_tokens
+            totals["cost_usd"] += entry["cost_usd"]
+            totals["retries"] += attempt > 0
+            if session_id:
+                self._sessions[session_id].append(entry)
+            with open(self._path(self._day), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return entry
+
+    def check(self, session_id: Optional[str]) -> Optional[str]:
+        """Reason the next call is over budget, or None if it may proceed."""
+        with self._lock:
+            today = self._today()
+            session = self._summarize(self._sessions.get(session_id, []))
+        limits = [
+            ("daily", today["cost_usd"], self.daily_budget_usd, "USD"),
+            ("daily", today["input_tokens"] + today["output_tokens"], self.daily_budget_tokens, "tokens"),
+            ("session", session["cost_usd"], self.session_budget_usd, "USD"),
+            ("session", session["input_tokens"] + session["output_tokens"], self.session_budget_tokens, "tokens"),
+        ]
+        for scope, used, budget, unit in limits:
+            if budget is not None and used >= budget:
+                return f"{scope} LLM budget of {budget:g} {unit} used up ({used:g})"
+        return None
+
+    def _summarize(self, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        totals = self._empty_totals()
+        for entry in entries:
+            totals["calls"] += 1
+            totals["input_tokens"] += entry["input_tokens"]
+            totals["output_tokens"] += entry["output_tokens"]
+            totals["cost_usd"] += entry["cost_usd"]
+            totals["retries"] += entry["attempt"] > 0
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        return totals
+
+    def session(self, session_id: str) -> Dict[str, Any]:
+        """Calls of one session with totals per job and overall."""
+        with self._lock:
+            entries = list(self._sessions.get(session_id, []))
+        by_job = defaultdict(list)
+        for entry in entries:
+            by_job[entry["job"]].append(entry)
+        return {
+            "session_id": session_id,
+            "total": self._summarize(entries),
+            "jobs": {job: self._summarize(items) for job, items in by_job.items()},
+            "calls": entries,
+        }
+
+    def daily(self, day: str) -> Dict[str, Any]:
+        """Totals of one UTC day (YYYY-MM-DD) overall, per model and per job, read from its file."""
+        entries = []
+        try:
+            with open(self._path(day), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue  # torn last line after a crash
+        except OSError:
+            pass
+        by_model, by_job = defaultdict(list), defaultdict(list)
+        for entry in entries:
+            by_model[entry["model"]].append(entry)
+            by_job[entry["job"]].append(entry)
+        return {
+            "day": day,
+            "total": self._summarize(entries),
+            "sessions": len({entry["session_id"] for entry in entries if entry.get("session_id")}),
+            "models": {model: self._summarize(items) for model, items in by_model.items()},
+            "jobs": {job: self._summarize(items) for job, items in by_job.items()},
+        }
+
+    def forget(self, session_id: str) -> None:
+        """Drop a session's in-memory calls; the day files keep them."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+_ledger: Optional[UsageLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> UsageLedger:
+    """Process-wide ledger in USAGE_DIR."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UsageLedger(os.getenv("USAGE_DIR", DEFAULT_USAGE_DIR))
+        return _ledger